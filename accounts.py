@@ -0,0 +1,151 @@
+# accounts.py
+"""Multi-account, tax-aware retirement projections.
+
+UserProfile holds one current_savings figure and the summary treats it as
+an untaxed pot. Here each profile holds several accounts, and the three
+kinds of account are handled differently:
+
+- pretax (401(k)/traditional IRA): grows untaxed; withdrawals are taxed as
+  income.
+- roth: grows untaxed; withdrawals are tax-free.
+- taxable (brokerage): loses `tax_drag` a year to tax on dividends and
+  realised gains; withdrawals pay capital gains tax on the gain share.
+
+Each year monthly_savings * 12 fills the accounts in the order given, up to
+each account's annual limit, and whatever is left goes to the next. In
+retirement the after-tax spend (retirement_goal / 12 a month) is drawn from
+one account at a time in withdrawal_order, grossed up for that account's
+tax, while the untouched accounts keep growing.
+
+Everything works on (profiles x accounts) arrays with formulas_np, so a
+client book is projected in a handful of array operations. The only Python
+loop is over withdrawal_order (one step per account type), because each
+account's turn starts when the previous one runs dry.
+
+Simplifications: pretax contributions are not grossed up for the tax they
+save, and the taxable account's gain share is fixed at its value at
+retirement.
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+import formulas_np
+
+WITHDRAWAL_RATE = 0.04  # same 4% rule as AdvisorAgent
+DEFAULT_INCOME_TAX_RATE = 0.22
+DEFAULT_CAPITAL_GAINS_RATE = 0.15
+
+
+class AccountType(NamedTuple):
+    name: str
+    annual_limit: float     # most that can be contributed a year
+    tax_drag: float         # annual return lost to tax while invested
+    withdrawal_tax: str     # 'income', 'gains' or 'none'
+
+
+ACCOUNTS = (
+    AccountType('pretax', 23_000, 0.0, 'income'),
+    AccountType('roth', 7_000, 0.0, 'none'),
+    AccountType('taxable', math.inf, 0.005, 'gains'),
+)
+WITHDRAWAL_ORDER = ('taxable', 'pretax', 'roth')
+
+
+def _f(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def allocate_contributions(monthly_savings, accounts=ACCOUNTS):
+    """Monthly contribution to each account, filling them in order up to their annual limits"""
+    annual = _f(monthly_savings)[..., None] * 12
+    limits = np.array([account.annual_limit for account in accounts])
+    filled_before = np.concatenate(([0.0], np.cumsum(limits)[:-1]))
+    return np.clip(annual - filled_before, 0, limits) / 12
+
+
+def project_accounts(age, retirement_age, balances, monthly_savings, expected_return, retirement_goal,
+                     income_tax_rate=DEFAULT_INCOME_TAX_RATE, capital_gains_rate=DEFAULT_CAPITAL_GAINS_RATE,
+                     taxable_basis=None, accounts=ACCOUNTS, withdrawal_order=WITHDRAWAL_ORDER):
+    """Project every account of every profile to retirement and through withdrawals.
+
+    balances is (profiles x accounts), in the order of `accounts`; the other
+    inputs are scalars or one value per profile. taxable_basis is the cost
+    basis of the taxable account (default: its whole balance). Returns a
+    dict of arrays:
+
+    - contributions, balance_at_retirement: per profile and account
+    - after_tax_at_retirement: what the accounts are worth once taxed
+    - needed_amount, surplus_deficit: as in the summary, but after tax
+    - years_lasting, depletion_age: how long the after-tax spend lasts
+      (inf when the accounts outgrow it)
+    """
+    names = [account.name for account in accounts]
+    balances = np.atleast_2d(_f(balances))
+    age, retirement_age, expected_return, retirement_goal, income_tax_rate, capital_gains_rate = (
+        _f(x) for x in (age, retirement_age, expected_return, retirement_goal, income_tax_rate, capital_gains_rate))
+
+    months = ((retirement_age - age) * 12)[..., None]
+    drag = np.array([account.tax_drag for account in accounts])
+    monthly_rate = (expected_return[..., None] - drag) / 12
+    contributions = allocate_contributions(monthly_savings, accounts)
+    at_retirement = (formulas_np.future_value(balances, monthly_rate, months)
+                     + formulas_np.fv_annuity(contributions, monthly_rate, months))
+    at_retirement, monthly_rate, contributions = np.broadcast_arrays(at_retirement, monthly_rate, contributions)
+
+    # Share of each withdrawal lost to tax, per profile and account
+    withdrawal_tax = np.zeros(at_retirement.shape)
+    for k, account in enumerate(accounts):
+        if account.withdrawal_tax == 'income':
+            withdrawal_tax[..., k] = income_tax_rate
+        elif account.withdrawal_tax == 'gains':
+            basis = balances[..., k] if taxable_basis is None else _f(taxable_basis)
+            basis = basis + contributions[..., k] * months[..., 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gain_share = np.clip(1 - basis / at_retirement[..., k], 0, 1)
+            withdrawal_tax[..., k] = capital_gains_rate * np.nan_to_num(gain_share)
+
+    after_tax = (at_retirement * (1 - withdrawal_tax)).sum(axis=-1)
+    needed_amount = retirement_goal / WITHDRAWAL_RATE
+
+    monthly_spend = retirement_goal / 12
+    elapsed = np.zeros(np.broadcast_shapes(at_retirement.shape[:-1], monthly_spend.shape))
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for name in withdrawal_order:
+            k = names.index(name)
+            rate = monthly_rate[..., k]
+            start_balance = at_retirement[..., k] * (1 + rate) ** elapsed
+            gross = monthly_spend / (1 - withdrawal_tax[..., k])
+            turn = np.where(start_balance > 0, formulas_np.nper(rate, gross, -start_balance), 0.0)
+            elapsed = np.where(np.isinf(elapsed), np.inf, elapsed + turn)
+
+    years_lasting = elapsed / 12
+    return {
+        'contributions': contributions,
+        'balance_at_retirement': at_retirement,
+        'after_tax_at_retirement': after_tax,
+        'needed_amount': needed_amount,
+        'surplus_deficit': after_tax - needed_amount,
+        'years_lasting': years_lasting,
+        'depletion_age': retirement_age + years_lasting,
+    }
+
+
+def profile_accounts(profile, balances=None, accounts=ACCOUNTS, **kwargs):
+    """project_accounts for one UserProfile, with plain floats per figure.
+
+    balances maps account names to current balances; by default all of
+    current_savings is taxable.
+    """
+    balances = balances or {'taxable': profile.current_savings}
+    row = [balances.get(account.name, 0.0) for account in accounts]
+    result = project_accounts(profile.age, profile.retirement_age, [row], profile.monthly_savings,
+                              profile.expected_return, profile.retirement_goal, accounts=accounts, **kwargs)
+    figures = {}
+    for name, values in result.items():
+        if np.ndim(values) == 2:
+            figures[name] = {account.name: float(value) for account, value in zip(accounts, values[0])}
+        else:
+            figures[name] = float(np.ravel(values)[0])
+    return figures
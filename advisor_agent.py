@@ -1,39 +1,37 @@
-from langchain_community.chat_models import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
+import time
+from contextlib import nullcontext
 from typing import Dict, Any
 import formulas
-
-
-class UserProfile:
-    def __init__(self):
-        self.age = None
-        self.income = None
-        self.current_savings = None
-        self.monthly_savings = None
-        self.retirement_age = None
-        self.expected_return = 0.07  # 7% default
-        self.inflation_rate = 0.03
-        self.risk_tolerance = "moderate"
-        self.retirement_goal = None
-        self.is_complete = False
-
-    def to_dict(self):
-        return {
-            'age': self.age,
-            'income': self.income,
-            'current_savings': self.current_savings,
-            'monthly_savings': self.monthly_savings,
-            'retirement_age': self.retirement_age,
-            'expected_return': self.expected_return,
-            'inflation_rate': self.inflation_rate,
-            'risk_tolerance': self.risk_tolerance,
-            'retirement_goal': self.retirement_goal
-        }
+import llm_pool
+from response_cache import ResponseCache, shared_cache
+from intent_router import IntentRouter, default_router
+from instrumentation import Tracer, default_tracer, llm_usage
+from user_profile import EXPECTED_RETURNS, UserProfile
+from conversation_memory import ConversationMemory, estimate_tokens
+from derived_metrics import DerivedMetrics
 
 
 class AdvisorAgent:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, response_cache: ResponseCache = None, llm=None,
+                 router: IntentRouter = None, tracer: Tracer = None, memory: ConversationMemory = None,
+                 precompute: bool = False, faq=None):
         self.profile = UserProfile()
+        self.router = router if router is not None else default_router
+        # None: faq_index.default_index(), built the first time a question gets past the router
+        self._faq = faq
+        self.tracer = tracer if tracer is not None else default_tracer
+        self.memory = memory if memory is not None else ConversationMemory()
+        self._system_prompt_key = None
+        self._system_prompt_text = None
+        # precompute=True answers the advertised questions in the background
+        # as soon as the questionnaire is complete (see precompute.py)
+        self.precompute_on_complete = precompute
+        self._precompute = None
+        # False for precompute snapshots, so speculative answers don't count
+        # toward the router, FAQ and response cache statistics
+        self.count_stats = True
+        self._metrics = None
+        self.response_cache = response_cache if response_cache is not None else shared_cache()
         self.question_index = 0
         self.questions = [
             "What's your current age?",
@@ -45,12 +43,33 @@ class AdvisorAgent:
             "How much annual income do you want in retirement (in dollars)?"
         ]
 
-        # Initialize the LLM without complex agent setup for now
-        try:
-            self.llm = ChatOllama(model="mistral")
-        except Exception as e:
-            print(f"Error initializing ChatOllama: {e}")
-            raise
+        # None: the process-wide client from llm_pool, fetched on the first LLM call
+        self._llm = llm
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = llm_pool.shared_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm):
+        self._llm = llm
+
+    @property
+    def faq(self):
+        if self._faq is None:
+            import faq_index  # the index is only built once a question gets past the router
+
+            self._faq = faq_index.default_index()
+        return self._faq
+
+    @property
+    def metrics(self) -> DerivedMetrics:
+        """Memoized plan figures for the current profile (see derived_metrics.py)"""
+        if self._metrics is None or self._metrics.profile is not self.profile:
+            self._metrics = DerivedMetrics(self.profile)
+        return self._metrics
 
     def _calculate_with_tools(self, calculation_type: str, **kwargs):
         """Handle financial calculations directly"""
@@ -84,11 +103,53 @@ class AdvisorAgent:
     def ask_next_question(self) -> tuple[str, bool]:
         if self.question_index >= len(self.questions):
             self.profile.is_complete = True
+            if self.precompute_on_complete and self._precomputed_for() is None:
+                self.start_precompute()
             return self._generate_summary(), True
         question = self.questions[self.question_index]
         return f"📝 Question {self.question_index + 1}/{len(self.questions)}: {question}", False
 
     def process_answer(self, answer: str) -> str:
+        with self.tracer.stage("process_answer", question=self.question_index):
+            try:
+                return self._apply_answer(answer)
+            finally:
+                self._precomputed_for()  # cancels answers for the old profile
+
+    def start_precompute(self, questions=None, executor=None):
+        """Start answering `questions` (default: the app's advertised ones) in the background"""
+        from precompute import Precompute
+
+        if self._precompute is not None:
+            self._precompute.cancel()
+        kwargs = {} if questions is None else {'questions': questions}
+        self._precompute = Precompute(self, executor=executor, **kwargs)
+        return self._precompute
+
+    def _precomputed_for(self):
+        """The Precompute for the current profile, cancelling and dropping a stale one"""
+        if self._precompute is not None and not self._precompute.valid_for(self.profile):
+            self._precompute.cancel()
+            self._precompute = None
+        return self._precompute
+
+    def _precomputed_answer(self, message, wait=True):
+        precompute = self._precomputed_for()
+        if precompute is None:
+            return None
+        # Model answers were written for an empty conversation
+        return precompute.get(message, wait, context=self.memory.digest())
+
+    def _snapshot(self):
+        """A copy of this agent with a frozen profile and no conversation, for background answers"""
+        clone = AdvisorAgent(None, response_cache=self.response_cache, llm=self._llm, router=self.router,
+                             tracer=Tracer(), faq=self._faq)
+        clone.count_stats = False
+        clone.profile = UserProfile.from_bytes(self.profile.to_bytes())
+        clone.question_index = self.question_index
+        return clone
+
+    def _apply_answer(self, answer: str) -> str:
         try:
             if self.question_index == 0:
                 self.profile.age = int(answer)
@@ -104,13 +165,11 @@ class AdvisorAgent:
                 risk = answer.lower()
                 if 'conservative' in risk:
                     self.profile.risk_tolerance = 'conservative'
-                    self.profile.expected_return = 0.05
                 elif 'aggressive' in risk:
                     self.profile.risk_tolerance = 'aggressive'
-                    self.profile.expected_return = 0.09
                 else:
                     self.profile.risk_tolerance = 'moderate'
-                    self.profile.expected_return = 0.07
+                self.profile.expected_return = EXPECTED_RETURNS[self.profile.risk_tolerance]
             elif self.question_index == 6:
                 self.profile.retirement_goal = float(answer.replace('$', '').replace(',', ''))
 
@@ -120,18 +179,15 @@ class AdvisorAgent:
             return "❌ Please enter a valid number."
 
     def _generate_summary(self) -> str:
-        years_to_retirement = self.profile.retirement_age - self.profile.age
-        months_to_retirement = years_to_retirement * 12
-        monthly_rate = self.profile.expected_return / 12
-
-        future_current = formulas.future_value(self.profile.current_savings, monthly_rate, months_to_retirement)
-        future_monthly = formulas.fv_annuity(self.profile.monthly_savings, monthly_rate, months_to_retirement)
-        total_at_retirement = future_current + future_monthly
+        with self.tracer.stage("summary.math"):
+            years_to_retirement, needed_amount, total_at_retirement, surplus_deficit = self._summary_figures()
+        with self.tracer.stage("summary.format"):
+            return self._format_summary(years_to_retirement, needed_amount, total_at_retirement, surplus_deficit)
 
-        retirement_rate = 0.04
-        needed_amount = self.profile.retirement_goal / retirement_rate
-        surplus_deficit = total_at_retirement - needed_amount
+    def _summary_figures(self):
+        return self.metrics.get('years_to_retirement', 'needed_amount', 'total_at_retirement', 'surplus_deficit')
 
+    def _format_summary(self, years_to_retirement, needed_amount, total_at_retirement, surplus_deficit):
         summary = f"""
 **Your Retirement Plan Summary**
 
@@ -156,80 +212,473 @@ You can now ask me questions like:
         """
         return summary
 
-    def chat(self, message: str) -> str:
-        """Simple chat function that handles common financial questions"""
-        try:
-            if not self.profile.is_complete:
-                return "Please complete the questionnaire first!"
+    def _answer_directly(self, message: str):
+        """Answer from the calculators or the FAQ index, or return None if the LLM is needed"""
+        if not self.profile.is_complete:
+            return "Please complete the questionnaire first!"
 
-            message_lower = message.lower()
-            
-            # Handle specific financial calculations
-            if "when can i retire" in message_lower:
-                result = self._calculate_with_tools("retirement_age",
-                    current_age=self.profile.age,
-                    current_savings=self.profile.current_savings,
-                    monthly_savings=self.profile.monthly_savings,
-                    target_amount=self.profile.retirement_goal / 0.04,
-                    annual_return=self.profile.expected_return
-                )
-                if result:
-                    return f"Based on your current savings plan, you can retire at age {result:.1f}"
-                else:
-                    return "You may need to save more or adjust your retirement goals to reach your target."
-            
-            elif "how long will" in message_lower and ("last" in message_lower or "money" in message_lower):
-                # Assume 4% withdrawal rule
-                annual_withdrawal = self.profile.retirement_goal
-                monthly_withdrawal = annual_withdrawal / 12
-                retirement_savings = self.profile.retirement_goal / 0.04
-                
-                result = self._calculate_with_tools("savings_longevity",
-                    initial_amount=retirement_savings,
-                    monthly_withdrawal=monthly_withdrawal,
-                    annual_return=self.profile.expected_return
-                )
-                
-                if result == float('inf'):
-                    return "Your savings should last indefinitely with proper management!"
-                else:
-                    return f"Your savings would last approximately {result:.1f} years in retirement."
-            
-            elif "rule of 72" in message_lower:
-                rate_percent = self.profile.expected_return * 100
-                result = self._calculate_with_tools("rule_of_72", rate_percent=rate_percent)
-                return f"With a {rate_percent:.1f}% return, your investment will double in approximately {result:.1f} years."
-            
-            elif "monthly" in message_lower and "save" in message_lower:
-                years_to_retirement = self.profile.retirement_age - self.profile.age
-                target_amount = self.profile.retirement_goal / 0.04
-                result = self._calculate_with_tools("monthly_savings_needed",
-                    target_amount=target_amount,
-                    years=years_to_retirement,
-                    annual_return=self.profile.expected_return
-                )
-                return f"To reach your retirement goal, you should save approximately ${result:,.2f} per month."
+        # Handle specific financial calculations, using any numbers given in
+        # the question in place of the profile's
+        with self.tracer.stage("chat.route") as stage:
+            intent = self.router.route(message, count=self.count_stats)
+            stage.fields['intent'] = intent.name if intent is not None else None
+        if intent is None:
+            # Explanations the FAQ index is confident about, with the profile's
+            # figures; a question with figures of its own ("how much do I need
+            # to retire at 50?") is about those, not the general explanation
+            if self.router.has_figures(message):
+                return None
+            with self.tracer.stage("chat.faq") as stage:
+                answer = self.faq.answer(message, self.metrics, count=self.count_stats)
+                stage.fields['hit'] = answer is not None
+            return answer
+        with self.tracer.stage("chat.calculate", intent=intent.name):
+            return getattr(self, f"_answer_{intent.name}")(**intent.params)
+
+    def _answer_retirement_age(self, monthly_amount=None, amount=None, rate=None, **_):
+        metrics = self.metrics.what_if(monthly_savings=monthly_amount, expected_return=rate)
+        monthly_savings = metrics.profile.monthly_savings
+        annual_return = metrics.profile.expected_return
+        if amount is None:
+            target_amount = metrics.needed_amount
+            result = metrics.projected_retirement_age
+        else:
+            target_amount = amount
+            result = self._calculate_with_tools("retirement_age",
+                current_age=self.profile.age,
+                current_savings=self.profile.current_savings,
+                monthly_savings=monthly_savings,
+                target_amount=target_amount,
+                annual_return=annual_return
+            )
+
+        basis = "your current savings plan"
+        if monthly_amount is not None or amount is not None or rate is not None:
+            basis = (f"saving ${monthly_savings:,.2f} per month at a {annual_return*100:.1f}% return"
+                     f" toward ${target_amount:,.2f}")
+        if isinstance(result, (int, float)) and result <= formulas.HORIZON_AGE:
+            return f"Based on {basis}, you can retire at age {result:.1f}"
+        if isinstance(result, (int, float)):
+            return (f"Based on {basis}, you wouldn't reach ${target_amount:,.2f} before age "
+                    f"{formulas.HORIZON_AGE}, so that goal isn't reachable without saving more.")
+        if result is None:
+            return "You may need to save more or adjust your retirement goals to reach your target."
+        return None  # a calculation error: let the model answer
+
+    def _answer_savings_longevity(self, amount=None, monthly_amount=None, annual_amount=None, rate=None,
+                                  withdrawal_rate=None, **_):
+        # Assume 4% withdrawal rule unless the question gives the figures
+        metrics = self.metrics.what_if(expected_return=rate)
+        retirement_savings = metrics.needed_amount if amount is None else amount
+        if monthly_amount is not None:
+            monthly_withdrawal = monthly_amount
+        elif annual_amount is not None:
+            monthly_withdrawal = annual_amount / 12
+        elif withdrawal_rate is not None:
+            monthly_withdrawal = retirement_savings * withdrawal_rate / 12
+        else:
+            monthly_withdrawal = metrics.monthly_withdrawal
+        annual_return = metrics.profile.expected_return
+
+        given = (amount, monthly_amount, annual_amount, withdrawal_rate)
+        if all(value is None for value in given):
+            result = metrics.savings_longevity
+        else:
+            result = self._calculate_with_tools("savings_longevity",
+                initial_amount=retirement_savings,
+                monthly_withdrawal=monthly_withdrawal,
+                annual_return=annual_return
+            )
+
+        subject = "Your savings"
+        if any(value is not None for value in given + (rate,)):
+            subject = (f"${retirement_savings:,.2f} withdrawn at ${monthly_withdrawal:,.2f} per month"
+                       f" with a {annual_return*100:.1f}% return")
+        if not isinstance(result, (int, float)):
+            return None  # a calculation error: let the model answer
+        if result == float('inf'):
+            return f"{subject} should last indefinitely with proper management!"
+        else:
+            return f"{subject} would last approximately {result:.1f} years in retirement."
+
+    def _answer_rule_of_72(self, rate=None, **_):
+        metrics = self.metrics.what_if(expected_return=rate)
+        rate_percent = metrics.profile.expected_return * 100
+        result = metrics.doubling_time
+        return f"With a {rate_percent:.1f}% return, your investment will double in approximately {result:.1f} years."
+
+    def _answer_monthly_savings_needed(self, amount=None, years=None, age=None, rate=None, **_):
+        overridden = any(value is not None for value in (amount, years, age, rate))
+        metrics = self.metrics.what_if(retirement_age=age, expected_return=rate)
+        target_amount = metrics.needed_amount if amount is None else amount
+        annual_return = metrics.profile.expected_return
+        if amount is None and years is None:
+            years = metrics.years_to_retirement
+            result = metrics.monthly_savings_needed
+        else:
+            years = metrics.years_to_retirement if years is None else years
+            result = self._calculate_with_tools("monthly_savings_needed",
+                target_amount=target_amount,
+                years=years,
+                annual_return=annual_return
+            )
+
+        goal = "your retirement goal"
+        if overridden:
+            goal = f"${target_amount:,.2f} in {years:g} years at a {annual_return*100:.1f}% return"
+        if result is None:
+            return f"There are no months left to save toward {goal}; try a later retirement age."
+        return f"To reach {goal}, you should save approximately ${result:,.2f} per month."
+
+    def _answer_inflation(self, inflation=None, **_):
+        # Only the inflation-dependent figures are recomputed for a new rate
+        metrics = self.metrics.what_if(inflation_rate=inflation)
+        inflation = metrics.profile.inflation_rate
+        total_at_retirement = metrics.total_at_retirement
+        future_goal = metrics.future_goal
+        needed_amount = metrics.inflated_needed_amount
+        surplus_deficit = metrics.inflated_surplus_deficit
+        real_return = metrics.real_return
+
+        return (
+            f"At {inflation*100:.1f}% inflation, your ${self.profile.retirement_goal:,.2f}/year goal will cost "
+            f"about ${future_goal:,.2f}/year by age {self.profile.retirement_age}, so you'd need "
+            f"${needed_amount:,.2f} saved. You're projected to have ${total_at_retirement:,.2f}, "
+            f"a {'surplus' if surplus_deficit >= 0 else 'shortfall'} of ${abs(surplus_deficit):,.2f}. "
+            f"Your real (after-inflation) return is {real_return*100:.1f}%."
+        )
+
+    def _answer_required_return(self, amount=None, monthly_amount=None, age=None, years=None, inflation=None, **_):
+        import goal_seek  # NumPy is only loaded for goal-seek questions
+
+        monthly_savings = self.profile.monthly_savings if monthly_amount is None else monthly_amount
+        if years is None:
+            years = (self.profile.retirement_age if age is None else age) - self.profile.age
+        retire_at = self.profile.age + years
+        if amount is None:
+            # The retirement goal in the dollars of the day you retire
+            metrics = self.metrics.what_if(retirement_age=retire_at, inflation_rate=inflation)
+            target_amount = metrics.inflated_needed_amount
+            goal = (f"${target_amount:,.2f} by age {retire_at:g} (your ${self.profile.retirement_goal:,.2f}/year goal "
+                    f"at {metrics.profile.inflation_rate*100:.1f}% inflation and a 4% withdrawal rate)")
+        else:
+            target_amount = amount
+            goal = f"${target_amount:,.2f} by age {retire_at:g}"
+
+        result = goal_seek.required_return(self.profile.current_savings, monthly_savings, years * 12, target_amount)
+        if not result.converged:
+            return (f"No return between -50% and 100% a year gets you to {goal} saving "
+                    f"${monthly_savings:,.2f} per month; you'll need to save more or retire later.")
+        return (f"To reach {goal} saving ${monthly_savings:,.2f} per month, you'd need about a "
+                f"{result.root*100:.2f}% annual return (you're assuming {self.profile.expected_return*100:.1f}%).")
+
+    def _answer_sustainable_withdrawal(self, amount=None, years=None, rate=None, inflation=None, **_):
+        import goal_seek
+
+        if amount is None:
+            amount = self.metrics.total_at_retirement
+        years = 30 if years is None else years
+        annual_return = self.profile.expected_return if rate is None else rate
+        inflation = self.profile.inflation_rate if inflation is None else inflation
+
+        result = goal_seek.sustainable_withdrawal(amount, years, annual_return, inflation)
+        if not result.converged:
+            return f"I couldn't find a withdrawal that makes ${amount:,.2f} last {years:g} years."
+        return (f"You could withdraw up to ${result.root:,.2f} per month (${result.root*12:,.2f} in the first year), "
+                f"rising {inflation*100:.1f}% a year with inflation, and make ${amount:,.2f} last {years:g} years "
+                f"at a {annual_return*100:.1f}% return.")
+
+    def _answer_retirement_spend(self, age=None, rate=None, inflation=None, **_):
+        import goal_seek
+
+        retire_at = self.profile.retirement_age if age is None else age
+        annual_return = self.profile.expected_return if rate is None else rate
+        inflation = self.profile.inflation_rate if inflation is None else inflation
+        if retire_at >= goal_seek.HORIZON_AGE:
+            return (f"Retiring at {retire_at} is beyond the age-{goal_seek.HORIZON_AGE} planning horizon, "
+                    f"so there's nothing left to spend down.")
+
+        result = goal_seek.retirement_spend(
+            self.profile.age, retire_at, self.profile.current_savings, self.profile.monthly_savings,
+            annual_return, inflation,
+        )
+        if not result.converged:
+            return f"I couldn't work out a sustainable spend for retiring at {retire_at}."
+        comparison = "above" if result.root >= self.profile.retirement_goal else "below"
+        return (f"Retiring at {retire_at}, your savings could support about ${result.root:,.2f}/year in today's "
+                f"dollars until age {goal_seek.HORIZON_AGE}, rising with {inflation*100:.1f}% "
+                f"inflation at a {annual_return*100:.1f}% return. That's {comparison} your "
+                f"${self.profile.retirement_goal:,.2f}/year goal.")
+
+    def _system_prompt(self) -> str:
+        """Profile system prompt, rendered once per profile version"""
+        key = tuple(self.profile.to_dict().values())
+        if key != self._system_prompt_key:
+            self._system_prompt_key = key
+            self._system_prompt_text = f"""You are a financial advisor. The user has provided this profile:
+            Age: {self.profile.age}
+            Income: ${self.profile.income:,.2f}
+            Current Savings: ${self.profile.current_savings:,.2f}
+            Monthly Savings: ${self.profile.monthly_savings:,.2f}
+            Retirement Age Goal: {self.profile.retirement_age}
+            Expected Return: {self.profile.expected_return*100:.1f}%
+            Risk Tolerance: {self.profile.risk_tolerance}
+            Retirement Income Goal: ${self.profile.retirement_goal:,.2f}/year
             
-            else:
+            Provide helpful, personalized financial advice based on this information."""
+        return self._system_prompt_text
+
+    def _llm_messages(self, message: str):
+        """System prompt, summary of earlier turns, the recent turns verbatim, then the question"""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        with self.tracer.stage("chat.prompt") as stage:
+            system = self._system_prompt()
+            summary = self.memory.summary
+            if summary:
+                system += "\n\nEarlier in this conversation:\n" + summary
+            messages = [SystemMessage(content=system)]
+            for role, text in self.memory.messages():
+                messages.append(HumanMessage(content=text) if role == "user" else AIMessage(content=text))
+            messages.append(HumanMessage(content=message))
+            stage.fields['prompt_tokens_est'] = sum(estimate_tokens(m.content) for m in messages)
+            return messages
+
+    def _cache_key(self, message: str) -> str:
+        # Follow-ups depend on the conversation so far, not just the profile
+        return ResponseCache.make_key(message, self.profile, context=self.memory.digest())
+
+    def _remember(self, message: str, answer: str):
+        if self.profile.is_complete:
+            self.memory.add_turn(message, answer)
+
+    def _cached_answer(self, cache_key, bypass_cache):
+        if bypass_cache:
+            return None
+        with self.tracer.stage("chat.cache") as stage:
+            cached = self.response_cache.get(cache_key)
+            stage.fields['hit'] = cached is not None
+        return cached
+
+    def _llm_stream(self, messages):
+        """Yield reply chunks from the model, recording time to first token and token counts"""
+        with self.tracer.stage("chat.llm", streamed=True) as stage:
+            start = time.perf_counter()
+            chunks = 0
+            last = None
+            for chunk in self.llm.stream(messages):
+                if last is None:
+                    stage.fields['ttft_s'] = time.perf_counter() - start
+                chunks += 1
+                last = chunk
+                yield chunk
+            stage.fields.update(self._usage(last, chunks))
+
+    async def _llm_astream(self, messages):
+        with self.tracer.stage("chat.llm", streamed=True) as stage:
+            start = time.perf_counter()
+            chunks = 0
+            last = None
+            async for chunk in self.llm.astream(messages):
+                if last is None:
+                    stage.fields['ttft_s'] = time.perf_counter() - start
+                chunks += 1
+                last = chunk
+                yield chunk
+            stage.fields.update(self._usage(last, chunks))
+
+    @staticmethod
+    def _usage(message, chunks=None):
+        # Ollama reports token counts on the final message; fall back to the
+        # number of streamed chunks for the completion
+        usage = llm_usage(message)
+        if usage['completion_tokens'] is None and chunks:
+            usage['completion_tokens'] = chunks
+        return usage
+
+    def _error_reply(self, error: Exception) -> str:
+        return f"I'm sorry, I encountered an error: {str(error)}. Please try rephrasing your question."
+
+    def chat(self, message: str, bypass_cache: bool = False, raise_errors: bool = False) -> str:
+        """Simple chat function that handles common financial questions
+
+        LLM answers are served from and stored in self.response_cache unless
+        bypass_cache is set. Each stage is timed through self.tracer. Errors
+        become an apology in the reply unless raise_errors is set.
+        """
+        with self.tracer.stage("chat") as request:
+            try:
+                answer = self._precomputed_answer(message)
+                if answer is not None:
+                    request.fields['branch'] = 'precomputed'
+                    self._remember(message, answer)
+                    return answer
+
+                answer = self._answer_directly(message)
+                if answer is not None:
+                    request.fields['branch'] = 'calculator'
+                    self._remember(message, answer)
+                    return answer
+
                 # For other questions, provide general advice
-                prompt = ChatPromptTemplate.from_messages([
-                    ("system", f"""You are a financial advisor. The user has provided this profile:
-                    Age: {self.profile.age}
-                    Income: ${self.profile.income:,.2f}
-                    Current Savings: ${self.profile.current_savings:,.2f}
-                    Monthly Savings: ${self.profile.monthly_savings:,.2f}
-                    Retirement Age Goal: {self.profile.retirement_age}
-                    Expected Return: {self.profile.expected_return*100:.1f}%
-                    Risk Tolerance: {self.profile.risk_tolerance}
-                    Retirement Income Goal: ${self.profile.retirement_goal:,.2f}/year
-                    
-                    Provide helpful, personalized financial advice based on this information."""),
-                    ("user", "{message}")
-                ])
-                
-                chain = prompt | self.llm
-                response = chain.invoke({"message": message})
+                cache_key = self._cache_key(message)
+                cached = self._cached_answer(cache_key, bypass_cache)
+                if cached is not None:
+                    request.fields['branch'] = 'cache'
+                    self._remember(message, cached)
+                    return cached
+
+                messages = self._llm_messages(message)
+                request.fields['branch'] = 'llm'
+                with self.tracer.stage("chat.llm", streamed=False) as stage:
+                    response = self.llm.invoke(messages)
+                    stage.fields.update(self._usage(response))
+                if not bypass_cache:
+                    self.response_cache.put(cache_key, response.content)
+                self._remember(message, response.content)
                 return response.content
 
-        except Exception as e:
-            return f"I'm sorry, I encountered an error: {str(e)}. Please try rephrasing your question."
\ No newline at end of file
+            except Exception as e:
+                request.fields['branch'] = 'error'
+                if raise_errors:
+                    raise
+                return self._error_reply(e)
+
+    def chat_stream(self, message: str, bypass_cache: bool = False):
+        """Streaming version of chat that yields the answer as it is generated
+
+        Calculator answers and cache hits are yielded whole, straight away;
+        LLM answers are yielded token by token from the model and cached
+        once complete.
+        """
+        with self.tracer.stage("chat") as request:
+            try:
+                answer = self._precomputed_answer(message)
+                if answer is not None:
+                    request.fields['branch'] = 'precomputed'
+                    self._remember(message, answer)
+                    yield answer
+                    return
+
+                answer = self._answer_directly(message)
+                if answer is not None:
+                    request.fields['branch'] = 'calculator'
+                    self._remember(message, answer)
+                    yield answer
+                    return
+
+                cache_key = self._cache_key(message)
+                cached = self._cached_answer(cache_key, bypass_cache)
+                if cached is not None:
+                    request.fields['branch'] = 'cache'
+                    self._remember(message, cached)
+                    yield cached
+                    return
+
+                messages = self._llm_messages(message)
+                request.fields['branch'] = 'llm'
+                parts = []
+                for chunk in self._llm_stream(messages):
+                    parts.append(chunk.content)
+                    yield chunk.content
+                if not bypass_cache:
+                    self.response_cache.put(cache_key, "".join(parts))
+                self._remember(message, "".join(parts))
+
+            except Exception as e:
+                request.fields['branch'] = 'error'
+                yield self._error_reply(e)
+
+    # Async versions for serving many sessions from one event loop. The
+    # questionnaire and calculator steps are pure CPU and finish in
+    # microseconds; only the model call is awaited. llm_slot is an optional
+    # async context manager factory (e.g. a concurrency limiter) entered
+    # around each model call; errors raised while entering it propagate so
+    # the caller can apply backpressure.
+
+    async def aask_next_question(self) -> tuple[str, bool]:
+        return self.ask_next_question()
+
+    async def aprocess_answer(self, answer: str) -> str:
+        return self.process_answer(answer)
+
+    async def achat(self, message: str, bypass_cache: bool = False, llm_slot=None) -> str:
+        with self.tracer.stage("chat") as request:
+            try:
+                # Never block the event loop on an answer still being computed
+                answer = self._precomputed_answer(message, wait=False)
+                if answer is not None:
+                    request.fields['branch'] = 'precomputed'
+                    self._remember(message, answer)
+                    return answer
+
+                answer = self._answer_directly(message)
+                if answer is not None:
+                    request.fields['branch'] = 'calculator'
+                    self._remember(message, answer)
+                    return answer
+
+                cache_key = self._cache_key(message)
+                cached = self._cached_answer(cache_key, bypass_cache)
+                if cached is not None:
+                    request.fields['branch'] = 'cache'
+                    self._remember(message, cached)
+                    return cached
+                messages = self._llm_messages(message)
+            except Exception as e:
+                request.fields['branch'] = 'error'
+                return self._error_reply(e)
+
+            request.fields['branch'] = 'llm'
+            async with (llm_slot() if llm_slot else nullcontext()):
+                try:
+                    with self.tracer.stage("chat.llm", streamed=False) as stage:
+                        response = await self.llm.ainvoke(messages)
+                        stage.fields.update(self._usage(response))
+                except Exception as e:
+                    request.fields['branch'] = 'error'
+                    return self._error_reply(e)
+
+            if not bypass_cache:
+                self.response_cache.put(cache_key, response.content)
+            self._remember(message, response.content)
+            return response.content
+
+    async def achat_stream(self, message: str, bypass_cache: bool = False, llm_slot=None):
+        with self.tracer.stage("chat") as request:
+            try:
+                answer = self._precomputed_answer(message, wait=False)
+                request.fields['branch'] = 'precomputed'
+                if answer is None:
+                    answer = self._answer_directly(message)
+                    request.fields['branch'] = 'calculator'
+                if answer is None:
+                    cache_key = self._cache_key(message)
+                    answer = self._cached_answer(cache_key, bypass_cache)
+                    request.fields['branch'] = 'cache'
+                if answer is None:
+                    messages = self._llm_messages(message)
+                    request.fields['branch'] = 'llm'
+                if answer is not None:
+                    self._remember(message, answer)
+            except Exception as e:
+                answer = self._error_reply(e)
+                request.fields['branch'] = 'error'
+            if answer is not None:
+                yield answer
+                return
+
+            async with (llm_slot() if llm_slot else nullcontext()):
+                parts = []
+                try:
+                    async for chunk in self._llm_astream(messages):
+                        parts.append(chunk.content)
+                        yield chunk.content
+                except Exception as e:
+                    request.fields['branch'] = 'error'
+                    yield self._error_reply(e)
+                    return
+
+            if not bypass_cache:
+                self.response_cache.put(cache_key, "".join(parts))
+            self._remember(message, "".join(parts))
@@ -1,7 +1,15 @@
 import streamlit as st
 import os
 import traceback
+import uuid
+from types import SimpleNamespace
 from advisor_agent import AdvisorAgent
+from chat_window import ChatWindow
+from response_cache import profile_fingerprint
+import instrumentation
+import llm_pool
+from precompute import QUICK_ACTIONS, SAMPLE_QUESTIONS
+from session_store import shared_store
 
 # Configure the page
 st.set_page_config(
@@ -47,17 +55,142 @@ st.markdown("""
 def initialize_session_state():
     if 'agent' not in st.session_state:
         st.session_state.agent = None
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
     if 'questionnaire_complete' not in st.session_state:
         st.session_state.questionnaire_complete = False
     if 'current_question' not in st.session_state:
         st.session_state.current_question = ""
     if 'waiting_for_answer' not in st.session_state:
         st.session_state.waiting_for_answer = False
+    if 'pending_message' not in st.session_state:
+        st.session_state.pending_message = None
+    if 'session_id' not in st.session_state:
+        # Kept in the URL so a reload or a restart resumes the same session
+        st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.session_id
+    if 'chat' not in st.session_state:
+        # Only the latest messages stay in session state; the rest are read back from the store
+        st.session_state.chat = ChatWindow(st.session_state.session_id, shared_store())
+
+def add_message(sender, message):
+    st.session_state.chat.append(sender, message)
+
+def save_progress():
+    """Store the questionnaire position and commit the turn's writes"""
+    agent = st.session_state.agent
+    store = shared_store()
+    store.save(st.session_state.session_id, agent.profile, agent.question_index)
+    store.flush()
+
+def restore_session(agent):
+    """Load a stored profile, questionnaire position and chat history into a new agent"""
+    stored = shared_store().load(st.session_state.session_id)
+    if stored is None:
+        return
+    agent.profile, agent.question_index = stored
+    st.session_state.chat = ChatWindow.restore(st.session_state.session_id, shared_store())
+
+def ask_advisor(message):
+    """Queue a question; its answer is streamed into the chat on the next run"""
+    add_message("You", message)
+    st.session_state.pending_message = message
+    st.rerun()
+
+def stream_reply(message):
+    """Render the advisor's answer as it streams in and return the full text"""
+    placeholder = st.empty()
+    text = ""
+    for token in st.session_state.agent.chat_stream(message):
+        text += token
+        placeholder.markdown(f"""
+        <div class="chat-message bot-message">
+            <strong>🤖 Advisor:</strong><br>
+            {text}▌
+        </div>
+        """, unsafe_allow_html=True)
+    placeholder.empty()
+    return text
+
+@st.cache_data(show_spinner=False)
+def retirement_outlook(profile_items):
+    """Seeded Monte Carlo outlook, cached per profile across reruns"""
+    import monte_carlo
+
+    return monte_carlo.simulate_profile(SimpleNamespace(**dict(profile_items)), seed=0)
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def what_if_heatmap(fingerprint, retirement_age, _grid):
+    """Surplus heatmap over return x monthly savings for one retirement age, cached per profile"""
+    import altair as alt
+    import numpy as np
+    import pandas as pd
+
+    age, surplus = _grid.at_age(retirement_age)
+    returns, savings = np.meshgrid(_grid.returns * 100, _grid.savings, indexing='ij')
+    data = pd.DataFrame({
+        'Expected return (%)': returns.ravel().round(2),
+        'Monthly savings ($)': savings.ravel().round(0),
+        'Surplus/Deficit ($)': surplus.ravel().round(0),
+    })
+    return alt.Chart(data, title=f"Retiring at {age:.0f}").mark_rect().encode(
+        x=alt.X('Expected return (%):O', axis=alt.Axis(labelOverlap=True)),
+        y=alt.Y('Monthly savings ($):O', sort='descending', axis=alt.Axis(labelOverlap=True)),
+        color=alt.Color('Surplus/Deficit ($):Q', scale=alt.Scale(scheme='redblue', domainMid=0)),
+        tooltip=list(data.columns),
+    )
+
+@st.cache_resource(show_spinner=False)
+def llm_warmup():
+    """Load the model in Ollama once per process, while the first user is still on the questionnaire"""
+    return llm_pool.start_warmup()
+
+@st.cache_resource(show_spinner=False)
+def latency_histogram():
+    """Process-wide histogram of the agent's stage timings"""
+    return instrumentation.default_tracer.add_sink(instrumentation.HistogramSink())
+
+def latency_panel():
+    """p50/p95 per stage for this process, in milliseconds"""
+    import pandas as pd
+
+    summary = latency_histogram().summary()
+    if not summary:
+        st.caption("No requests timed yet.")
+        return
+    rows = [{'Stage': stage, 'Count': row['count'],
+             'p50 (ms)': round(row['p50'] * 1000, 2), 'p95 (ms)': round(row['p95'] * 1000, 2)}
+            for stage, row in summary.items()]
+    st.dataframe(pd.DataFrame(rows).set_index('Stage'), use_container_width=True)
+
+def balance_path(profile):
+    """Year-end balances to retirement, nominal and in today's dollars"""
+    import pandas as pd
+    import projection
+
+    schedule = projection.profile_schedule(profile, every=12, columns=('balance', 'real_balance'))
+    return pd.DataFrame(
+        {'Balance': schedule['balance'], "In today's dollars": schedule['real_balance']},
+        index=pd.Index(profile.age + schedule['month'] / 12, name='Age'),
+    )
+
+def describe_smallest_change(profile):
+    import sensitivity
+
+    options = sensitivity.smallest_change(profile)
+    best = options['best']
+    if best is None:
+        return "No single change gets this plan on track; try combining more savings with a later retirement."
+    if options[best]['change'] == 0:
+        return "✅ You're on track as planned."
+    value = options[best]['value']
+    if best == 'monthly_savings':
+        return f"Smallest single fix: save ${value:,.0f}/month (+${options[best]['change']:,.0f})."
+    if best == 'retirement_age':
+        return f"Smallest single fix: retire at {value:.1f} (+{options[best]['change']:.1f} years)."
+    return f"Smallest single fix: earn a {value*100:.1f}% return (+{options[best]['change']*100:.1f} pts)."
 
 def main():
     initialize_session_state()
+    llm_warmup()
 
     st.markdown("""
     <div class="main-header">
@@ -71,7 +204,8 @@ def main():
         st.header("🔧 Local Setup")
         if not st.session_state.agent:
             try:
-                st.session_state.agent = AdvisorAgent(openai_api_key=None)
+                st.session_state.agent = AdvisorAgent(openai_api_key=None, precompute=True)
+                restore_session(st.session_state.agent)
                 if not st.session_state.questionnaire_complete:
                     question, is_complete = st.session_state.agent.ask_next_question()
                     st.session_state.current_question = question
@@ -86,17 +220,13 @@ def main():
 
         if st.session_state.agent and st.session_state.questionnaire_complete:
             st.header("📊 Quick Actions")
-            if st.button("📈 Retirement Forecast"):
-                response = st.session_state.agent.chat("Show me my retirement forecast")
-                st.session_state.chat_history.append(("You", "Show me my retirement forecast"))
-                st.session_state.chat_history.append(("Advisor", response))
-                st.rerun()
+            for label, message in QUICK_ACTIONS:
+                if st.button(label):
+                    ask_advisor(message)
 
-            if st.button("💰 Savings Analysis"):
-                response = st.session_state.agent.chat("Analyze my current savings plan")
-                st.session_state.chat_history.append(("You", "Analyze my current savings plan"))
-                st.session_state.chat_history.append(("Advisor", response))
-                st.rerun()
+        if st.toggle("⏱️ Show latency", key="show_latency"):
+            latency_histogram()
+            latency_panel()
 
     if not st.session_state.agent:
         st.info("Initializing your financial advisor...")
@@ -117,38 +247,42 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
 
-            for sender, message in st.session_state.chat_history:
-                class_name = "user-message" if sender == "You" else "bot-message"
-                icon = "👤 You" if sender == "You" else "🤖 Advisor"
-                st.markdown(f"""
-                <div class="chat-message {class_name}">
-                    <strong>{icon}:</strong><br>
-                    {message}
-                </div>
-                """, unsafe_allow_html=True)
+            chat = st.session_state.chat
+            if chat.hidden and st.button(f"⬆️ Load older messages ({chat.hidden})", key="load_older"):
+                chat.load_older()
+            with instrumentation.default_tracer.stage("ui.render_chat") as stage:
+                visible = chat.visible()
+                for html in visible:
+                    st.markdown(html, unsafe_allow_html=True)
+                stage.fields.update(messages=len(visible), total=len(chat))
+
+            if st.session_state.pending_message:
+                response = stream_reply(st.session_state.pending_message)
+                add_message("Advisor", response)
+                shared_store().flush()  # the question and its answer survive a restart
+                st.session_state.pending_message = None
+                st.rerun()
 
         user_input = st.text_input("Your message:", key="user_input", placeholder="Ask me anything about retirement planning...")
 
         if st.button("Send") and user_input:
-            st.session_state.chat_history.append(("You", user_input))
-
             if st.session_state.waiting_for_answer:
+                add_message("You", user_input)
                 feedback = st.session_state.agent.process_answer(user_input)
-                st.session_state.chat_history.append(("Advisor", feedback))
+                add_message("Advisor", feedback)
 
                 question, is_complete = st.session_state.agent.ask_next_question()
                 if not is_complete:
                     st.session_state.current_question = question
-                    st.session_state.chat_history.append(("Advisor", question))
+                    add_message("Advisor", question)
                 else:
                     st.session_state.questionnaire_complete = True
                     st.session_state.waiting_for_answer = False
-                    st.session_state.chat_history.append(("Advisor", question))
+                    add_message("Advisor", question)
+                save_progress()
+                st.rerun()
             else:
-                response = st.session_state.agent.chat(user_input)
-                st.session_state.chat_history.append(("Advisor", response))
-
-            st.rerun()
+                ask_advisor(user_input)
 
     with col2:
         st.header("📊 Your Profile")
@@ -168,35 +302,44 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-            years_to_retirement = profile.retirement_age - profile.age
+            metrics = st.session_state.agent.metrics
+            years_to_retirement = metrics.years_to_retirement
             if years_to_retirement > 0:
                 st.metric("Years to Retirement", years_to_retirement)
                 if profile.expected_return > 0:
-                    doubling_time = 72 / (profile.expected_return * 100)
-                    st.metric("Investment Doubling Time", f"{doubling_time:.1f} years")
+                    st.metric("Investment Doubling Time", f"{metrics.doubling_time:.1f} years")
+
+                outlook = retirement_outlook(tuple(sorted(profile.to_dict().items())))
+                st.metric("Chance of Reaching Goal", f"{outlook['success_probability']*100:.0f}%")
+                st.caption(
+                    f"Balance at retirement across {outlook['paths']:,} simulated markets: "
+                    f"${outlook['percentiles'][5]:,.0f} (5th pct) – ${outlook['percentiles'][95]:,.0f} (95th pct)"
+                )
+
+                st.subheader("📈 Balance Path")
+                st.line_chart(balance_path(profile))
+
+                st.subheader("🔀 What If")
+                import sensitivity
+
+                grid = sensitivity.default_engine.grid(profile)
+                what_if_age = st.slider("Retirement age", int(grid.ages[0]), int(grid.ages[-1]),
+                                        int(profile.retirement_age), key="what_if_age")
+                st.altair_chart(what_if_heatmap(profile_fingerprint(profile), what_if_age, grid),
+                                use_container_width=True)
+                st.caption(describe_smallest_change(profile))
         else:
             st.info("Complete the questionnaire to see your financial profile.")
 
         st.header("💡 Try These Questions")
-        sample_questions = [
-            "When can I retire?",
-            "How much should I save monthly?",
-            "What if inflation is 4%?",
-            "How long will $500k last in retirement?",
-            "Should I pay off my mortgage early?",
-            "What's the rule of 72?",
-            "Explain the calculations you used"
-        ]
-
-        for question in sample_questions:
+        for question in SAMPLE_QUESTIONS:
             if st.button(question, key=f"sample_{question}"):
-                st.session_state.chat_history.append(("You", question))
                 if st.session_state.questionnaire_complete:
-                    response = st.session_state.agent.chat(question)
-                    st.session_state.chat_history.append(("Advisor", response))
+                    ask_advisor(question)
                 else:
-                    st.session_state.chat_history.append(("Advisor", "Please complete the questionnaire first!"))
-                st.rerun()
+                    add_message("You", question)
+                    add_message("Advisor", "Please complete the questionnaire first!")
+                    st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
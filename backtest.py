@@ -0,0 +1,164 @@
+# backtest.py
+"""Historical sequence-of-returns backtester.
+
+A constant expected_return hides what a bad decade early in retirement does
+to a plan. This replays a local series of historical monthly returns: every
+window that starts in a January of the series is tested at once, for both
+saving up to retirement and drawing down afterwards (as in
+calculate_savings_longevity), and the worst, median and best windows are
+reported.
+
+No window is simulated month by month. With C_t the cumulative growth of the
+series up to month t and S_t the running sum of 1/C, the balance after
+saving `pmt` a month from month s to month e is
+
+    C_e * (B_0 / C_s + pmt * (S_e - S_s))
+
+and savings drawn down by w a month run out at the first month e where
+S_e - S_s >= B_0 / (w * C_s). S only increases, so np.searchsorted finds
+that month for every window in one call. A 100-year series takes well under
+a millisecond once loaded.
+
+Return files are a .npy array of monthly returns (0.01 = 1%), opened
+memory-mapped, or a CSV with one `date,return` row per month (date as
+YYYY-MM), which is converted to a .npy cache next to it on first use.
+"""
+import csv
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+WITHDRAWAL_RATE = 0.04
+DEFAULT_WITHDRAWAL_YEARS = 30
+
+
+class ReturnSeries(NamedTuple):
+    returns: np.ndarray  # monthly returns, memory-mapped when loaded from disk
+    start_year: int
+    start_month: int = 1
+
+    def label(self, month_index):
+        """'YYYY-MM' for a month offset into the series"""
+        year, month = divmod(self.start_month - 1 + int(month_index), 12)
+        return f"{self.start_year + year}-{month + 1:02d}"
+
+
+def write_returns(path, returns):
+    """Save monthly returns as .npy for load_returns"""
+    np.save(path, np.asarray(returns, dtype=np.float64))
+
+
+def _data_rows(path):
+    """CSV rows, skipping a header row if there is one"""
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if row and _is_number(row[-1]):
+                yield row
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def load_returns(path, start_year=None, start_month=1) -> ReturnSeries:
+    """Memory-map a return series from .npy, or from a CSV via a .npy cache.
+
+    For .npy files pass start_year; CSVs take it from their first date.
+    """
+    if path.endswith('.npy'):
+        return ReturnSeries(np.load(path, mmap_mode='r'), start_year or 0, start_month)
+
+    year, month = (int(part) for part in next(_data_rows(path))[0].split('-')[:2])
+    cache = path + '.npy'
+    if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+        write_returns(cache, [float(row[-1]) for row in _data_rows(path)])
+    return ReturnSeries(np.load(cache, mmap_mode='r'), year, month)
+
+
+def _prefixes(returns):
+    """C_t (growth through month t, C_0 = 1) and S_t = sum of 1/C_1..1/C_t (S_0 = 0)"""
+    growth = np.empty(len(returns) + 1)
+    growth[0] = 1.0
+    np.add(returns, 1.0, out=growth[1:])
+    np.cumprod(growth, out=growth)
+    inverse_sum = np.empty_like(growth)
+    inverse_sum[0] = 0.0
+    np.cumsum(1.0 / growth[1:], out=inverse_sum[1:])
+    return growth, inverse_sum
+
+
+def window_starts(n_months, window_months, step=12, offset=0):
+    """Start months of every full window, `step` months apart"""
+    return np.arange(offset, n_months - window_months + 1, step)
+
+
+def accumulation_windows(returns, current_savings, monthly_savings, months, step=12, offset=0):
+    """(starts, balances): balance after `months` of saving, for every window"""
+    growth, inverse_sum = _prefixes(returns)
+    starts = window_starts(len(returns), months, step, offset)
+    ends = starts + months
+    balances = growth[ends] * (current_savings / growth[starts] + monthly_savings * (inverse_sum[ends] - inverse_sum[starts]))
+    return starts, balances
+
+
+def withdrawal_windows(returns, initial_amount, monthly_withdrawal, months, step=12, offset=0):
+    """(starts, years): how long savings last for every window of `months`.
+
+    Years are whole months / 12, and inf where the money outlasts the window,
+    as calculate_savings_longevity gives inf when it never runs out.
+    """
+    growth, inverse_sum = _prefixes(returns)
+    starts = window_starts(len(returns), months, step, offset)
+    with np.errstate(divide='ignore'):
+        needed = inverse_sum[starts] + initial_amount / (monthly_withdrawal * growth[starts])
+    depleted = np.searchsorted(inverse_sum, needed, side='left')
+    lasted = (depleted - starts).astype(np.float64)
+    lasted[lasted > months] = np.inf
+    return starts, lasted / 12
+
+
+def _outcomes(series, starts, values, key):
+    order = np.argsort(values, kind='stable')
+    picks = {'worst': order[0], 'median': order[len(order) // 2], 'best': order[-1]}
+    return {name: {key: float(values[i]), 'start': series.label(starts[i])} for name, i in picks.items()}
+
+
+def backtest_profile(profile, series: ReturnSeries, withdrawal_years=DEFAULT_WITHDRAWAL_YEARS, step=12):
+    """Worst, median and best historical windows for a profile.
+
+    Accumulation saves monthly_savings from age to retirement_age and is
+    compared with retirement_goal / 4%. The withdrawal phase starts from that
+    needed amount and draws retirement_goal / 12 a month, as the chat's
+    savings longevity answer does, for `withdrawal_years`. Windows start
+    every `step` months from the first January in the series.
+    """
+    returns = series.returns
+    offset = (13 - series.start_month) % 12 if step % 12 == 0 else 0
+    months = int(round((profile.retirement_age - profile.age) * 12))
+    needed_amount = profile.retirement_goal / WITHDRAWAL_RATE
+    result = {'needed_amount': needed_amount}
+
+    if 0 < months <= len(returns) - offset:
+        starts, balances = accumulation_windows(returns, profile.current_savings, profile.monthly_savings,
+                                                months, step, offset)
+        result['accumulation'] = {
+            'windows': len(starts),
+            'success_rate': float(np.mean(balances >= needed_amount)),
+            **_outcomes(series, starts, balances, 'balance'),
+        }
+
+    withdrawal_months = withdrawal_years * 12
+    if withdrawal_months <= len(returns) - offset:
+        starts, years = withdrawal_windows(returns, needed_amount, profile.retirement_goal / 12,
+                                           withdrawal_months, step, offset)
+        result['withdrawal'] = {
+            'windows': len(starts),
+            'success_rate': float(np.mean(np.isinf(years))),
+            **_outcomes(series, starts, years, 'years'),
+        }
+    return result
@@ -0,0 +1,215 @@
+# batch_plan.py
+"""Headless batch retirement-plan engine.
+
+Reads profiles (the fields of UserProfile.to_dict()) from CSV or Parquet in
+fixed-size chunks, computes the same figures as AdvisorAgent's summary for
+every row with formulas_np, and writes results as each chunk finishes.
+Chunks are spread across a process pool with a bounded number in flight, so
+memory stays flat however large the input file is.
+
+    python batch_plan.py profiles.csv plans.csv --chunk-rows 200000
+"""
+import argparse
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import formulas_np
+
+PROFILE_FIELDS = (
+    'age', 'income', 'current_savings', 'monthly_savings', 'retirement_age',
+    'expected_return', 'inflation_rate', 'risk_tolerance', 'retirement_goal',
+)
+NUMERIC_FIELDS = (
+    'age', 'current_savings', 'monthly_savings', 'retirement_age',
+    'expected_return', 'retirement_goal',
+)
+RESULT_FIELDS = (
+    'row', 'total_at_retirement', 'needed_amount', 'surplus_deficit',
+    'projected_retirement_age', 'monthly_savings_needed',
+)
+
+WITHDRAWAL_RATE = 0.04  # same 4% rule as AdvisorAgent
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def plan_metrics(age, current_savings, monthly_savings, retirement_age, expected_return, retirement_goal):
+    """Summary figures for one or many profiles (arrays broadcast)"""
+    age = np.asarray(age, dtype=np.float64)
+    years_to_retirement = np.asarray(retirement_age, dtype=np.float64) - age
+    months_to_retirement = years_to_retirement * 12
+    monthly_rate = np.asarray(expected_return, dtype=np.float64) / 12
+
+    total_at_retirement = (
+        formulas_np.future_value(current_savings, monthly_rate, months_to_retirement)
+        + formulas_np.fv_annuity(monthly_savings, monthly_rate, months_to_retirement)
+    )
+    needed_amount = np.asarray(retirement_goal, dtype=np.float64) / WITHDRAWAL_RATE
+
+    return {
+        'total_at_retirement': total_at_retirement,
+        'needed_amount': needed_amount,
+        'surplus_deficit': total_at_retirement - needed_amount,
+        'projected_retirement_age': formulas_np.calculate_retirement_age(
+            age, current_savings, monthly_savings, needed_amount, expected_return
+        ),
+        'monthly_savings_needed': formulas_np.monthly_savings_needed(
+            needed_amount, years_to_retirement, expected_return
+        ),
+    }
+
+
+def _to_float(value):
+    try:
+        return float(value.replace('$', '').replace(',', ''))
+    except (AttributeError, ValueError):
+        return float('nan')
+
+
+def _parse_csv_lines(header, lines):
+    columns = {name: [] for name in NUMERIC_FIELDS}
+    positions = [(header.index(name), columns[name]) for name in NUMERIC_FIELDS]
+    for record in csv.reader(lines):
+        for position, column in positions:
+            column.append(_to_float(record[position]) if position < len(record) else float('nan'))
+    return {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def _process_chunk(start, header, payload, as_text):
+    """Worker entry point: parse (if needed), compute and encode one chunk"""
+    columns = _parse_csv_lines(header, payload) if header is not None else payload
+    results = plan_metrics(*(columns[name] for name in NUMERIC_FIELDS))
+    results['row'] = np.arange(start, start + len(columns['age']))
+    if not as_text:
+        return results
+
+    rows = [results['row'].tolist()]
+    for name in RESULT_FIELDS[1:]:
+        values = np.round(results[name], 2).tolist()
+        # Unreachable/undefined figures are written as empty cells
+        rows.append([None if v != v else v for v in values])
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(zip(*rows))
+    return buffer.getvalue()
+
+
+def _iter_csv_chunks(path, chunk_rows):
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]))
+        missing = [name for name in NUMERIC_FIELDS if name not in header]
+        if missing:
+            raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+        start = 0
+        while True:
+            lines = [line for _, line in zip(range(chunk_rows), f) if line.strip()]
+            if not lines:
+                return
+            yield start, header, lines
+            start += len(lines)
+
+
+def _iter_parquet_chunks(path, chunk_rows):
+    import pyarrow.parquet as pq
+
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(NUMERIC_FIELDS)):
+        columns = {
+            name: batch.column(name).to_numpy(zero_copy_only=False).astype(np.float64)
+            for name in NUMERIC_FIELDS
+        }
+        yield start, None, columns
+        start += batch.num_rows
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.file.write(','.join(RESULT_FIELDS) + '\n')
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [('row', pa.int64())] + [(name, pa.float64()) for name in RESULT_FIELDS[1:]]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, chunk):
+        self.writer.write_table(self.pa.table({name: chunk[name] for name in RESULT_FIELDS}, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _is_parquet(path):
+    return str(path).lower().endswith(('.parquet', '.pq'))
+
+
+def run_batch(input_path, output_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=None, max_in_flight=None):
+    """Compute plans for every profile in input_path and stream them to output_path.
+
+    workers=0 runs everything in this process. At most max_in_flight chunks
+    (default: two per worker) are read ahead of the writer. Returns the number
+    of rows written.
+    """
+    chunks = (_iter_parquet_chunks if _is_parquet(input_path) else _iter_csv_chunks)(input_path, chunk_rows)
+    as_text = not _is_parquet(output_path)
+    sink = _CsvSink(output_path) if as_text else _ParquetSink(output_path)
+    rows = 0
+
+    try:
+        if workers == 0:
+            for start, header, payload in chunks:
+                result = _process_chunk(start, header, payload, as_text)
+                sink.write(result)
+                rows += _chunk_len(header, payload)
+            return rows
+
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or 2 * workers
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, header, payload in chunks:
+                if len(pending) >= max_in_flight:
+                    sink.write(pending.popleft().result())
+                pending.append(pool.submit(_process_chunk, start, header, payload, as_text))
+                rows += _chunk_len(header, payload)
+            while pending:
+                sink.write(pending.popleft().result())
+        return rows
+    finally:
+        sink.close()
+
+
+def _chunk_len(header, payload):
+    return len(payload) if header is not None else len(payload['age'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch retirement plans for a file of profiles")
+    parser.add_argument('input', help="CSV or Parquet file with UserProfile fields")
+    parser.add_argument('output', help="CSV or Parquet file to write results to")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None, help="0 runs in-process")
+    args = parser.parse_args(argv)
+
+    rows = run_batch(args.input, args.output, chunk_rows=args.chunk_rows, workers=args.workers)
+    print(f"Wrote {rows:,} plans to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# benchmarks.py
+"""Offline benchmark suite for the formulas and the advisor request path.
+
+Covers the scalar formulas, the vectorized formulas at several input sizes,
+AdvisorAgent._generate_summary, every deterministic chat branch, building and
+querying the FAQ index, and the LLM branch against a stubbed model (so
+nothing touches Ollama or the network). The startup benchmarks time a cold
+`import advisor_agent` and a `cli.py summary` run in a fresh interpreter,
+and the first response from a local fake_ollama with the model unloaded
+(cold) and after llm_pool's warm-up (warm).
+
+Results are written as JSON and can be compared against a stored baseline;
+the run exits non-zero if any benchmark's median is slower than the baseline
+by more than the threshold. benchmarks_baseline.json is the checked-in
+baseline for every benchmark here.
+
+    python benchmarks.py --save-baseline benchmarks_baseline.json
+    python benchmarks.py --baseline benchmarks_baseline.json --threshold 0.25 --output results.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+import numpy as np
+
+import formulas
+import formulas_np
+
+BATCH_SIZES = (1_000, 100_000, 1_000_000)
+PROFILE_ANSWERS = ("35", "90000", "50000", "1000", "65", "moderate", "70000")
+CHAT_BRANCHES = {
+    'retirement_age': "When can I retire?",
+    'savings_longevity': "How long will $500k last in retirement?",
+    'rule_of_72': "What's the rule of 72?",
+    'monthly_savings_needed': "How much should I save monthly?",
+    'inflation': "What if inflation is 4%?",
+    'required_return': "What return do I need to retire at 60?",
+    'sustainable_withdrawal': "What's the most I can withdraw for 30 years?",
+    'retirement_spend': "What annual spend supports retiring at 60?",
+}
+
+_registry = {}
+
+
+def benchmark(name):
+    """Register a setup function that returns the callable to time.
+
+    A setup that needs cleaning up is a generator instead: it yields the
+    callable, and the code after the yield runs once timing is done.
+    """
+    def register(setup):
+        _registry[name] = setup
+        return setup
+    return register
+
+
+def _scalar_cases():
+    return {
+        'future_value': (formulas.future_value, (50000, 0.07 / 12, 360)),
+        'fv_annuity': (formulas.fv_annuity, (1000, 0.07 / 12, 360)),
+        'pv_annuity': (formulas.pv_annuity, (1000, 0.07 / 12, 360)),
+        'nper': (formulas.nper, (0.07 / 12, -1000, -50000, 1750000)),
+        'calculate_retirement_age': (formulas.calculate_retirement_age, (35, 50000, 1000, 1750000, 0.07)),
+        'calculate_savings_longevity': (formulas.calculate_savings_longevity, (1750000, 5833, 0.07)),
+        'monthly_savings_needed': (formulas.monthly_savings_needed, (1750000, 30, 0.07)),
+    }
+
+
+def _batch_inputs(size):
+    rng = np.random.default_rng(0)
+    return {
+        'rate': rng.uniform(0.02, 0.10, size) / 12,
+        'annual': rng.uniform(0.02, 0.10, size),
+        'months': rng.integers(12, 480, size).astype(np.float64),
+        'savings': rng.uniform(0, 1e6, size),
+        'monthly': rng.uniform(100, 3000, size),
+        'target': rng.uniform(5e5, 3e6, size),
+    }
+
+
+def _register_scalar(name, func, args):
+    @benchmark(f"scalar.{name}")
+    def setup():
+        return lambda: func(*args)
+
+
+def _register_batch(size):
+    @benchmark(f"batch.future_value[{size}]")
+    def future_value():
+        x = _batch_inputs(size)
+        return lambda: formulas_np.future_value(x['savings'], x['rate'], x['months'])
+
+    @benchmark(f"batch.fv_annuity[{size}]")
+    def fv_annuity():
+        x = _batch_inputs(size)
+        return lambda: formulas_np.fv_annuity(x['monthly'], x['rate'], x['months'])
+
+    @benchmark(f"batch.pv_annuity[{size}]")
+    def pv_annuity():
+        x = _batch_inputs(size)
+        return lambda: formulas_np.pv_annuity(x['monthly'], x['rate'], x['months'])
+
+    @benchmark(f"batch.nper[{size}]")
+    def nper():
+        x = _batch_inputs(size)
+        return lambda: formulas_np.nper(x['rate'], -x['monthly'], -x['savings'], x['target'])
+
+    @benchmark(f"batch.calculate_retirement_age[{size}]")
+    def retirement_age():
+        x = _batch_inputs(size)
+        return lambda: formulas_np.calculate_retirement_age(35, x['savings'], x['monthly'], x['target'], x['annual'])
+
+    @benchmark(f"batch.calculate_savings_longevity[{size}]")
+    def savings_longevity():
+        x = _batch_inputs(size)
+        withdrawal = x['monthly'] * 4
+        return lambda: formulas_np.calculate_savings_longevity(x['target'], withdrawal, x['annual'])
+
+    @benchmark(f"batch.monthly_savings_needed[{size}]")
+    def monthly_savings_needed():
+        x = _batch_inputs(size)
+        years = x['months'] / 12
+        return lambda: formulas_np.monthly_savings_needed(x['target'], years, x['annual'])
+
+    @benchmark(f"batch.plan_metrics[{size}]")
+    def plan_metrics():
+        from batch_plan import plan_metrics
+
+        x = _batch_inputs(size)
+        return lambda: plan_metrics(35, x['savings'], x['monthly'], 65, x['annual'], x['target'] * 0.04)
+
+
+for _name, (_func, _args) in _scalar_cases().items():
+    _register_scalar(_name, _func, _args)
+for _size in BATCH_SIZES:
+    _register_batch(_size)
+
+
+def _stub_agent(reply="Keep building your emergency fund and stay diversified."):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    from advisor_agent import AdvisorAgent
+    from response_cache import ResponseCache
+
+    llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content=reply)))
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache(), llm=llm)
+    for answer in PROFILE_ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+    return agent
+
+
+@benchmark("agent.generate_summary")
+def _generate_summary():
+    agent = _stub_agent()
+    return agent._generate_summary
+
+
+@benchmark("agent.summary_figures.what_if")
+def _summary_figures_what_if():
+    agent = _stub_agent()
+    agent._summary_figures()
+    savings = itertools.cycle((1000.0, 1500.0))
+
+    def what_if():
+        agent.profile.monthly_savings = next(savings)
+        return agent._summary_figures()
+    return what_if
+
+
+def _register_chat_branch(branch, message):
+    @benchmark(f"agent.chat.{branch}")
+    def setup():
+        agent = _stub_agent()
+        return lambda: agent.chat(message)
+
+
+for _branch, _message in CHAT_BRANCHES.items():
+    _register_chat_branch(_branch, _message)
+
+
+@benchmark("faq.build")
+def _faq_build():
+    import faq_index
+
+    return faq_index.FaqIndex
+
+
+def _register_faq_lookup(kind, message):
+    @benchmark(f"faq.lookup[{kind}]")
+    def setup():
+        import faq_index
+
+        index = faq_index.FaqIndex()
+        return lambda: index.lookup(message)
+
+
+_register_faq_lookup('hit', "How long does it take for money to double?")
+_register_faq_lookup('miss', "Should I pay off my mortgage early?")
+
+
+@benchmark("agent.chat.faq")
+def _chat_faq():
+    agent = _stub_agent()
+    return lambda: agent.chat("Explain the calculations you used")
+
+
+@benchmark("agent.chat.llm_stub")
+def _chat_llm_stub():
+    agent = _stub_agent()
+    return lambda: agent.chat("Should I pay off my mortgage early?", bypass_cache=True)
+
+
+@benchmark("agent.chat.precomputed")
+def _chat_precomputed():
+    agent = _stub_agent()
+    agent.start_precompute().get("Should I pay off my mortgage early?")
+    return lambda: agent.chat("Should I pay off my mortgage early?")
+
+
+@benchmark("startup.import_advisor_agent")
+def _import_advisor_agent():
+    command = [sys.executable, '-c', 'import advisor_agent']
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run(command, cwd=cwd, check=True)
+
+
+@benchmark("startup.cli_summary")
+def _cli_summary():
+    command = [sys.executable, 'cli.py', 'summary', '--age', '35', '--savings', '50000', '--monthly', '1000',
+               '--retirement-age', '65', '--goal', '70000']
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+
+def _fake_ollama_llm(load_latency=0.05):
+    from fake_ollama import FakeOllama
+    import llm_pool
+
+    fake = FakeOllama(reply="Stay diversified.", load_latency=load_latency)
+    base_url = fake.start_in_thread()
+    return fake, base_url, llm_pool.shared_llm(base_url=base_url)
+
+
+@benchmark("startup.first_response[cold]")
+def _first_response_cold():
+    fake, _, llm = _fake_ollama_llm()
+
+    def first_response():
+        fake.loaded, fake._loading = False, None  # as if Ollama had unloaded the model
+        llm.invoke("Should I pay off my mortgage early?")
+    try:
+        yield first_response
+    finally:
+        fake.stop_thread()
+
+
+@benchmark("startup.first_response[warm]")
+def _first_response_warm():
+    import llm_pool
+
+    fake, base_url, llm = _fake_ollama_llm()
+    try:
+        llm_pool.warm_up(base_url=base_url)
+        yield lambda: llm.invoke("Should I pay off my mortgage early?")
+    finally:
+        fake.stop_thread()
+
+
+def _time(func, repeat, min_sample_seconds):
+    """Median and min seconds per call, timeit-style with auto-chosen loop counts"""
+    func()  # warm up
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_seconds or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_sample_seconds / 10 else 2
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'loops': loops, 'repeat': repeat}
+
+
+def run_benchmarks(names=None, repeat=5, min_sample_seconds=0.05):
+    """Run the selected benchmarks (default: all) and return a results dict"""
+    selected = [n for n in _registry if names is None or any(n.startswith(prefix) for prefix in names)]
+    results = {}
+    for name in selected:
+        setup = _registry[name]()
+        if not isinstance(setup, types.GeneratorType):
+            results[name] = _time(setup, repeat, min_sample_seconds)
+            continue
+        try:
+            results[name] = _time(next(setup), repeat, min_sample_seconds)
+        finally:
+            setup.close()  # runs the setup's cleanup
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(results, baseline, threshold=0.25):
+    """Benchmarks whose median regressed by more than `threshold` (0.25 = 25%)"""
+    regressions = []
+    for name, current in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous is None:
+            continue
+        ratio = current['median_s'] / previous['median_s']
+        if ratio > 1 + threshold:
+            regressions.append({'name': name, 'baseline_s': previous['median_s'],
+                                'current_s': current['median_s'], 'ratio': ratio})
+    return regressions
+
+
+def _format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument('names', nargs='*', help="benchmark name prefixes to run (default: all)")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', help="write results as the new baseline here")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names or None, repeat=args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for name, result in results['benchmarks'].items():
+        line = f"{name:48s} {_format_seconds(result['median_s'])}"
+        previous = (baseline or {}).get('benchmarks', {}).get(name)
+        if previous:
+            line += f"   x{result['median_s'] / previous['median_s']:.2f} vs baseline"
+        print(line)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {_format_seconds(r['baseline_s'])} -> "
+                  f"{_format_seconds(r['current_s'])} (x{r['ratio']:.2f})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
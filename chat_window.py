@@ -0,0 +1,89 @@
+# chat_window.py
+"""Windowed chat history for the Streamlit app.
+
+Streamlit reruns the whole script on every interaction, so drawing the full
+history each time makes reruns (and session memory) grow with the length of
+the conversation. ChatWindow keeps only the latest `keep` messages in
+memory, as pre-rendered HTML, and draws the latest `window` of them. Every
+message is written to the session store's append-only messages table when
+it is added, so older ones can simply be dropped from memory; load_older()
+pages them back in from the store when the user asks. At most
+max(keep, shown) messages are held, however long the conversation runs.
+
+    chat = ChatWindow.restore(session_id, shared_store())
+    chat.append("You", "When can I retire?")
+    for html in chat.visible():
+        st.markdown(html, unsafe_allow_html=True)
+"""
+from collections import deque
+
+DEFAULT_WINDOW = 20
+DEFAULT_KEEP = 50
+
+
+def message_html(sender, text):
+    """The chat bubble for one message"""
+    class_name = "user-message" if sender == "You" else "bot-message"
+    icon = "👤 You" if sender == "You" else "🤖 Advisor"
+    return f"""
+                <div class="chat-message {class_name}">
+                    <strong>{icon}:</strong><br>
+                    {text}
+                </div>
+                """
+
+
+class ChatWindow:
+    """The latest messages of one session as HTML, with older pages read from the store on demand"""
+
+    def __init__(self, session_id, store, window=DEFAULT_WINDOW, keep=DEFAULT_KEEP):
+        self.session_id = session_id
+        self.store = store
+        self.window = window
+        self.total = 0              # messages in the session, in memory or not
+        self.shown = window         # how many of the latest to draw
+        self._recent = deque(maxlen=max(keep, window))
+        self._older = []            # HTML of the messages just before _recent, loaded by load_older
+
+    @classmethod
+    def restore(cls, session_id, store, **kwargs):
+        """A window over the session's stored history"""
+        chat = cls(session_id, store, **kwargs)
+        chat.total = store.message_count(session_id)
+        chat._recent.extend(message_html(sender, text)
+                            for sender, text in store.history(session_id, limit=chat._recent.maxlen))
+        return chat
+
+    def append(self, sender, text):
+        self.store.append_message(self.session_id, sender, text)
+        if len(self._recent) == self._recent.maxlen and self._older:
+            # Keep the loaded older pages contiguous with the recent messages,
+            # but no longer than the pages asked for, so memory stays bounded
+            self._older.append(self._recent[0])
+            del self._older[:max(len(self._older) - (self.shown - self._recent.maxlen), 0)]
+        self._recent.append(message_html(sender, text))
+        self.total += 1
+
+    @property
+    def hidden(self) -> int:
+        """Older messages not drawn"""
+        return max(self.total - self.shown, 0)
+
+    def load_older(self, count=None):
+        """Draw `count` (default: one window) more of the older messages from the next rerun"""
+        self.shown += self.window if count is None else count
+
+    def visible(self):
+        """HTML of the messages to draw, oldest first"""
+        wanted = min(self.shown, self.total)
+        if wanted <= len(self._recent):
+            return list(self._recent)[len(self._recent) - wanted:]
+        older = wanted - len(self._recent)
+        if len(self._older) < older:
+            rows = self.store.history(self.session_id, limit=older - len(self._older),
+                                      offset=len(self._recent) + len(self._older))
+            self._older[:0] = [message_html(sender, text) for sender, text in rows]
+        return self._older[max(len(self._older) - older, 0):] + list(self._recent)
+
+    def __len__(self):
+        return self.total
@@ -0,0 +1,234 @@
+# cli.py
+"""Command-line interface for scripts and cron jobs.
+
+Gives the plan summary and the calculators without Streamlit. langchain is
+only imported when a question needs the model and --llm is passed, and
+NumPy only for goal-seek questions, so a cold start is little more than the
+interpreter's own.
+
+    python cli.py summary --age 35 --savings 50000 --monthly 1000 --retirement-age 65 --goal 70000
+    echo '{"age": 35, "current_savings": 50000, ...}' | python cli.py summary --json
+    python cli.py calc future_value 10000 0.005 120
+    python cli.py ask "When can I retire?" --age 35 ... [--llm]
+    python cli.py batch < profiles.jsonl > plans.jsonl
+
+Profiles use the UserProfile field names. risk_tolerance sets the expected
+return the questionnaire would (unless expected_return is given). Batch
+lines are profiles, optionally with a "question"; each output line has the
+input line number and the summary figures (and "answer"), or an "error".
+Output is strict JSON: a calculator result with no finite value (e.g. nper
+for a goal that is never reached) is null.
+
+Exit codes: 0 on success, 1 for bad input, 2 when a question needs the
+model and --llm was not given, 3 when the model call fails.
+"""
+import argparse
+import json
+import math
+import sys
+
+import formulas
+from advisor_agent import AdvisorAgent
+from response_cache import ResponseCache
+from user_profile import EXPECTED_RETURNS, RISK_TOLERANCES, UserProfile
+
+REQUIRED_FIELDS = ('age', 'current_savings', 'monthly_savings', 'retirement_age', 'retirement_goal')
+# flag -> UserProfile field
+PROFILE_FLAGS = {
+    'age': 'age',
+    'income': 'income',
+    'savings': 'current_savings',
+    'monthly': 'monthly_savings',
+    'retirement_age': 'retirement_age',
+    'goal': 'retirement_goal',
+    'risk': 'risk_tolerance',
+    'expected_return': 'expected_return',
+    'inflation': 'inflation_rate',
+}
+CALCULATORS = {
+    'future_value': formulas.future_value,
+    'present_value': formulas.present_value,
+    'fv_annuity': formulas.fv_annuity,
+    'pv_annuity': formulas.pv_annuity,
+    'nper': formulas.nper,
+    'rule_of_72': formulas.rule_of_72,
+    'retirement_age': formulas.calculate_retirement_age,
+    'savings_longevity': formulas.calculate_savings_longevity,
+    'monthly_savings_needed': formulas.monthly_savings_needed,
+}
+
+
+class NeedsModel(Exception):
+    """The question can't be answered by the calculators and --llm was not given"""
+
+
+class ModelError(Exception):
+    """The model call for a question failed"""
+
+
+def build_profile(data) -> UserProfile:
+    """A complete UserProfile from a dict of profile fields"""
+    missing = [name for name in REQUIRED_FIELDS if data.get(name) is None]
+    if missing:
+        raise ValueError(f"missing profile fields: {', '.join(missing)}")
+    unknown = set(data) - set(UserProfile().to_dict())
+    if unknown:
+        raise ValueError(f"unknown profile fields: {', '.join(sorted(unknown))}")
+    risk = data.get('risk_tolerance') or 'moderate'
+    if risk not in RISK_TOLERANCES:
+        raise ValueError(f"risk_tolerance must be one of {', '.join(RISK_TOLERANCES)}")
+
+    profile = UserProfile.from_dict({**data, 'risk_tolerance': risk})
+    if data.get('expected_return') is None:
+        profile.expected_return = EXPECTED_RETURNS[risk]
+    if data.get('inflation_rate') is None:
+        profile.inflation_rate = UserProfile().inflation_rate
+    profile.age, profile.retirement_age = int(profile.age), int(profile.retirement_age)
+    profile.is_complete = True
+    return profile
+
+
+def make_agent(profile, llm=None) -> AdvisorAgent:
+    agent = AdvisorAgent(None, response_cache=ResponseCache(), llm=llm)
+    agent.profile = profile
+    agent.question_index = len(agent.questions)
+    return agent
+
+
+def summary_figures(agent) -> dict:
+    years_to_retirement, needed_amount, total_at_retirement, surplus_deficit = agent._summary_figures()
+    return {
+        'years_to_retirement': years_to_retirement,
+        'total_at_retirement': round(total_at_retirement, 2),
+        'needed_amount': round(needed_amount, 2),
+        'surplus_deficit': round(surplus_deficit, 2),
+        'on_track': surplus_deficit >= 0,
+    }
+
+
+def answer(agent, question, use_llm=False) -> str:
+    reply = agent._answer_directly(question)
+    if reply is not None:
+        return reply
+    if not use_llm:
+        raise NeedsModel(f"answering {question!r} needs the model; pass --llm")
+    try:
+        return agent.chat(question, raise_errors=True)
+    except Exception as e:
+        raise ModelError(f"the model call failed: {e}") from e
+
+
+def _llm(args):
+    if not args.llm:
+        return None
+    import llm_pool
+
+    return llm_pool.shared_llm(args.model, args.ollama_url)
+
+
+def _read_profile(args):
+    if args.json:
+        return json.load(sys.stdin)
+    return {field: getattr(args, flag) for flag, field in PROFILE_FLAGS.items() if getattr(args, flag) is not None}
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(',', ':'), allow_nan=False)
+
+
+def _write(record):
+    sys.stdout.write(_dumps(record) + '\n')
+
+
+def _finite(result):
+    """The calculator result, or None where it has no finite value"""
+    return result if result is None or math.isfinite(result) else None
+
+
+def run_batch(lines, use_llm=False, llm=None, out=None):
+    """Summarize (and answer) each JSONL profile; one output line per non-blank input line"""
+    out = out or sys.stdout
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            question = data.pop('question', None)
+            agent = make_agent(build_profile(data), llm)
+            record = {'line': number, **summary_figures(agent)}
+            if question is not None:
+                record['answer'] = answer(agent, question, use_llm)
+            text = _dumps(record)
+        except (ValueError, TypeError, AttributeError, ArithmeticError, NeedsModel, ModelError) as e:
+            text = _dumps({'line': number, 'error': str(e)})
+        out.write(text + '\n')
+        out.flush()
+
+
+def _add_profile_flags(parser):
+    parser.add_argument('--json', action='store_true', help="read the profile as JSON from stdin")
+    parser.add_argument('--age', type=int)
+    parser.add_argument('--income', type=float)
+    parser.add_argument('--savings', type=float, help="current savings")
+    parser.add_argument('--monthly', type=float, help="monthly savings")
+    parser.add_argument('--retirement-age', type=int)
+    parser.add_argument('--goal', type=float, help="annual retirement income wanted")
+    parser.add_argument('--risk', choices=RISK_TOLERANCES)
+    parser.add_argument('--expected-return', type=float, help="overrides the return implied by --risk")
+    parser.add_argument('--inflation', type=float)
+
+
+def _add_llm_flags(parser):
+    parser.add_argument('--llm', action='store_true', help="allow questions that need the model")
+    parser.add_argument('--model', default='mistral')
+    parser.add_argument('--ollama-url', default=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retirement plan summaries and calculators")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summary = commands.add_parser('summary', help="plan summary for one profile")
+    _add_profile_flags(summary)
+    summary.add_argument('--text', action='store_true', help="print the advisor's summary text instead of JSON")
+
+    calc = commands.add_parser('calc', help="run one formula")
+    calc.add_argument('name', choices=sorted(CALCULATORS))
+    calc.add_argument('values', type=float, nargs='+')
+
+    ask = commands.add_parser('ask', help="answer one question about a profile")
+    ask.add_argument('question')
+    _add_profile_flags(ask)
+    _add_llm_flags(ask)
+
+    batch = commands.add_parser('batch', help="JSONL profiles on stdin to JSONL summaries on stdout")
+    _add_llm_flags(batch)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'calc':
+            _write({'result': _finite(CALCULATORS[args.name](*args.values))})
+        elif args.command == 'batch':
+            run_batch(sys.stdin, args.llm, _llm(args))
+        else:
+            agent = make_agent(build_profile(_read_profile(args)), _llm(args) if args.command == 'ask' else None)
+            if args.command == 'ask':
+                _write({'answer': answer(agent, args.question, args.llm)})
+            elif args.text:
+                print(agent._generate_summary().strip())
+            else:
+                _write(summary_figures(agent))
+    except NeedsModel as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except ModelError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 3
+    except (ValueError, TypeError, ArithmeticError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
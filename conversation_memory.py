@@ -0,0 +1,133 @@
+# conversation_memory.py
+"""Token-budgeted conversation memory for the LLM prompt.
+
+Keeps the last `recent_turns` question/answer pairs verbatim and folds older
+turns into a running summary, one turn at a time, so follow-ups like "what
+about at 8%?" keep their context while the prompt stays a roughly constant
+size however long the session runs.
+
+The default summarizer is extractive and needs no model call: each folded
+turn becomes one short line, and the oldest lines are dropped once the
+summary outgrows its share of the budget. Pass llm_summarizer(llm) to have
+the model rewrite the summary instead (one extra call per folded turn).
+
+Token counts are estimated at ~4 characters per token, close enough for
+budgeting without loading a tokenizer.
+"""
+import hashlib
+import re
+from collections import deque
+
+DEFAULT_MAX_TOKENS = 1024
+DEFAULT_RECENT_TURNS = 4
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 240
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _gist(text, max_chars):
+    """First sentence of text, collapsed to one line and cut at max_chars"""
+    text = " ".join(text[:2 * max_chars].split())
+    end = _SENTENCE_END.search(text)
+    if end is not None:
+        text = text[:end.start()]
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def extractive_summarizer(summary_lines, user, assistant):
+    """Fold one turn into the summary as a single line"""
+    half = SUMMARY_LINE_CHARS // 2
+    summary_lines.append(f"- User asked: {_gist(user, half)} Advisor: {_gist(assistant, half)}")
+
+
+def llm_summarizer(llm):
+    """Summarizer that asks the model to fold each turn into the running summary"""
+    def summarize(summary_lines, user, assistant):
+        previous = "\n".join(summary_lines) or "(empty)"
+        reply = llm.invoke([
+            ("system", "Update the running summary of a financial planning conversation. "
+                       "Keep figures and decisions; reply with the summary only, as short bullet points."),
+            ("user", f"Summary so far:\n{previous}\n\nNew exchange:\nUser: {user}\nAdvisor: {assistant}"),
+        ])
+        summary_lines.clear()
+        summary_lines.extend(line for line in reply.content.splitlines() if line.strip())
+    return summarize
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary, within max_tokens.
+
+    summary_tokens of the budget are reserved for the summary and the rest
+    holds recent turns. Turns pushed out of the recent window are summarized
+    lazily, when the summary is next read (or once MAX_UNFOLDED pile up), so
+    calculator answers that never reach the model cost almost nothing.
+    """
+
+    MAX_UNFOLDED = 32
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, recent_turns=DEFAULT_RECENT_TURNS,
+                 summary_tokens=None, summarizer=extractive_summarizer):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summary_tokens = max_tokens // 4 if summary_tokens is None else summary_tokens
+        self.summarizer = summarizer
+        self.turns = deque()
+        self.folded = 0
+        self._summary_lines = deque()
+        self._unfolded = deque()
+        self._turn_tokens = 0
+
+    def add_turn(self, user: str, assistant: str):
+        self.turns.append((user, assistant))
+        self._turn_tokens += estimate_tokens(user) + estimate_tokens(assistant)
+        turn_budget = self.max_tokens - self.summary_tokens
+        while self.turns and (len(self.turns) > self.recent_turns or self._turn_tokens > turn_budget):
+            user, assistant = self.turns.popleft()
+            self._turn_tokens -= estimate_tokens(user) + estimate_tokens(assistant)
+            self._unfolded.append((user, assistant))
+        if len(self._unfolded) >= self.MAX_UNFOLDED:
+            self._fold()
+
+    def _fold(self):
+        """Summarize turns that left the recent window, oldest first, then trim to summary_tokens"""
+        while self._unfolded:
+            self.summarizer(self._summary_lines, *self._unfolded.popleft())
+            self.folded += 1
+        chars = sum(map(len, self._summary_lines)) + len(self._summary_lines) - 1
+        while len(self._summary_lines) > 1 and chars > self.summary_tokens * CHARS_PER_TOKEN:
+            chars -= len(self._summary_lines.popleft()) + 1
+
+    @property
+    def summary(self) -> str:
+        self._fold()
+        return "\n".join(self._summary_lines)
+
+    @property
+    def tokens(self) -> int:
+        return self._turn_tokens + estimate_tokens(self.summary)
+
+    def messages(self):
+        """Recent turns as ("user"/"assistant", text) pairs, oldest first"""
+        pairs = []
+        for user, assistant in self.turns:
+            pairs.append(("user", user))
+            pairs.append(("assistant", assistant))
+        return pairs
+
+    def digest(self) -> str:
+        """Short hash of what the model would see, or '' when nothing is remembered"""
+        if not self.turns and not self._summary_lines and not self._unfolded:
+            return ""
+        raw = self.summary + "\0" + "\0".join(f"{user}\0{assistant}" for user, assistant in self.turns)
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    def clear(self):
+        self.turns.clear()
+        self._summary_lines.clear()
+        self._unfolded.clear()
+        self._turn_tokens = 0
@@ -0,0 +1,226 @@
+# derived_metrics.py
+"""Plan figures derived from a UserProfile, each computed once per change.
+
+The summary, the calculator answers and the app's profile panel all need
+the same handful of figures (years to retirement, the monthly rate, the
+4%-rule target, the balance at retirement, ...). Each figure is declared
+below with the @metric decorator, naming the profile fields or other
+figures it reads, which makes a small dependency graph.
+
+DerivedMetrics memoizes the figures for one profile. Every read first
+compares the profile's fields with the values it last saw; a changed field
+drops only the figures that read it, directly or through other figures, so
+a new monthly_savings recomputes the balance at retirement and the surplus
+but keeps the target, the years to retirement and the doubling time.
+what_if() applies changes to a copy of the profile and starts from the
+figures that don't depend on them.
+
+    metrics = DerivedMetrics(profile)
+    metrics.surplus_deficit                                  # computes what it needs
+    metrics.what_if(monthly_savings=2000).surplus_deficit    # reuses the target etc.
+"""
+import formulas
+from user_profile import UserProfile
+
+WITHDRAWAL_RATE = 0.04  # same 4% rule as the rest of the app
+WHAT_IF_CACHE_SIZE = 8
+
+# name -> (function, names it reads: profile fields or other metrics)
+METRICS = {}
+
+
+def metric(*inputs):
+    """Register a derived figure computed by the decorated function from `inputs`"""
+    def register(function):
+        METRICS[function.__name__] = (function, inputs)
+        return function
+    return register
+
+
+@metric('age', 'retirement_age')
+def years_to_retirement(age, retirement_age):
+    return retirement_age - age
+
+
+@metric('years_to_retirement')
+def months_to_retirement(years_to_retirement):
+    return years_to_retirement * 12
+
+
+@metric('expected_return')
+def monthly_rate(expected_return):
+    return expected_return / 12
+
+
+@metric('expected_return')
+def doubling_time(expected_return):
+    return formulas.rule_of_72(expected_return * 100)
+
+
+@metric('retirement_goal')
+def needed_amount(retirement_goal):
+    return retirement_goal / WITHDRAWAL_RATE
+
+
+@metric('retirement_goal')
+def monthly_withdrawal(retirement_goal):
+    return retirement_goal / 12
+
+
+@metric('current_savings', 'monthly_rate', 'months_to_retirement')
+def future_current(current_savings, monthly_rate, months_to_retirement):
+    return formulas.future_value(current_savings, monthly_rate, months_to_retirement)
+
+
+@metric('monthly_savings', 'monthly_rate', 'months_to_retirement')
+def future_monthly(monthly_savings, monthly_rate, months_to_retirement):
+    return formulas.fv_annuity(monthly_savings, monthly_rate, months_to_retirement)
+
+
+@metric('future_current', 'future_monthly')
+def total_at_retirement(future_current, future_monthly):
+    return future_current + future_monthly
+
+
+@metric('total_at_retirement', 'needed_amount')
+def surplus_deficit(total_at_retirement, needed_amount):
+    return total_at_retirement - needed_amount
+
+
+@metric('age', 'current_savings', 'monthly_savings', 'needed_amount', 'expected_return')
+def projected_retirement_age(age, current_savings, monthly_savings, needed_amount, expected_return):
+    """Age at which the plan reaches the target, or None if it never does"""
+    return formulas.calculate_retirement_age(age, current_savings, monthly_savings, needed_amount, expected_return)
+
+
+@metric('needed_amount', 'monthly_withdrawal', 'expected_return')
+def savings_longevity(needed_amount, monthly_withdrawal, expected_return):
+    return formulas.calculate_savings_longevity(needed_amount, monthly_withdrawal, expected_return)
+
+
+@metric('needed_amount', 'years_to_retirement', 'expected_return')
+def monthly_savings_needed(needed_amount, years_to_retirement, expected_return):
+    """Monthly saving that reaches the target, or None when no months are left to save"""
+    if years_to_retirement <= 0:
+        return None
+    return formulas.monthly_savings_needed(needed_amount, years_to_retirement, expected_return)
+
+
+@metric('retirement_goal', 'inflation_rate', 'years_to_retirement')
+def future_goal(retirement_goal, inflation_rate, years_to_retirement):
+    """The annual goal in the dollars of the year you retire"""
+    return formulas.future_value(retirement_goal, inflation_rate, years_to_retirement)
+
+
+@metric('future_goal')
+def inflated_needed_amount(future_goal):
+    return future_goal / WITHDRAWAL_RATE
+
+
+@metric('total_at_retirement', 'inflated_needed_amount')
+def inflated_surplus_deficit(total_at_retirement, inflated_needed_amount):
+    return total_at_retirement - inflated_needed_amount
+
+
+@metric('expected_return', 'inflation_rate')
+def real_return(expected_return, inflation_rate):
+    return (1 + expected_return) / (1 + inflation_rate) - 1
+
+
+def _dependents(metrics):
+    """Profile field -> every metric that reads it, directly or through other metrics"""
+    dependents = {}
+
+    def add(name, reader):
+        if name in metrics:
+            for source in metrics[name][1]:
+                add(source, reader)
+        else:
+            dependents.setdefault(name, set()).add(reader)
+
+    for name in metrics:
+        add(name, name)
+    return dependents
+
+
+DEPENDENTS = _dependents(METRICS)
+INPUTS = tuple(sorted(DEPENDENTS))
+
+
+class DerivedMetrics:
+    """Memoized METRICS for one profile, read as attributes, by name or with get()"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._inputs = {}   # profile field -> value the memoized figures were computed from
+        self._values = {}
+        self._what_ifs = {}  # sorted changes -> DerivedMetrics, for the current inputs
+
+    def refresh(self):
+        """Drop the figures that read a profile field changed since the last read"""
+        profile = self.profile
+        inputs = self._inputs
+        for name in INPUTS:
+            value = getattr(profile, name)
+            if name not in inputs or inputs[name] != value:
+                inputs[name] = value
+                for dependent in DEPENDENTS[name]:
+                    self._values.pop(dependent, None)
+                self._what_ifs.clear()
+
+    def _get(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        function, sources = METRICS[name]
+        value = function(*(self._get(source) if source in METRICS else self._inputs[source] for source in sources))
+        self._values[name] = value
+        return value
+
+    def __getitem__(self, name):
+        if name not in METRICS:
+            raise KeyError(name)
+        self.refresh()
+        return self._get(name)
+
+    def get(self, *names):
+        """Several figures at once, checking the profile only once"""
+        self.refresh()
+        return tuple(self._get(name) for name in names)
+
+    def what_if(self, **changes):
+        """Metrics for a copy of the profile with `changes` applied (None: unchanged).
+
+        Figures that don't read a changed field are carried over, not
+        recomputed, and the last few what-ifs are kept until the profile
+        changes, so asking the same one again costs a lookup. Returns self
+        when nothing changes.
+        """
+        changes = {name: value for name, value in changes.items()
+                   if value is not None and value != getattr(self.profile, name)}
+        if not changes:
+            return self
+        self.refresh()
+        key = tuple(sorted(changes.items()))
+        other = self._what_ifs.get(key)
+        if other is None:
+            profile = UserProfile.from_dict({**self.profile.to_dict(), **changes})
+            profile.is_complete = self.profile.is_complete
+            other = DerivedMetrics(profile)
+            other._inputs = dict(self._inputs)
+            other._values = dict(self._values)
+            other.refresh()
+            if len(self._what_ifs) >= WHAT_IF_CACHE_SIZE:
+                del self._what_ifs[next(iter(self._what_ifs))]
+            self._what_ifs[key] = other
+        return other
+
+
+def _attribute(name):
+    return property(lambda self: self[name], doc=METRICS[name][0].__doc__)
+
+
+# Each metric can also be read as an attribute, e.g. metrics.surplus_deficit
+for _name in METRICS:
+    setattr(DerivedMetrics, _name, _attribute(_name))
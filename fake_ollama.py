@@ -0,0 +1,182 @@
+# fake_ollama.py
+"""Local stand-in for the Ollama HTTP API, for tests and load testing.
+
+Implements the endpoints ChatOllama uses (/api/chat, /api/generate) with
+NDJSON streaming, plus /api/tags. Latency is configurable: a one-off model
+load paid by the first request, a fixed delay before the first token of
+every reply (prompt eval) and a token rate for generation, so the advisor
+can be exercised offline under realistic timing. As with Ollama, a generate
+request with an empty prompt just loads the model.
+
+    python fake_ollama.py --port 11434 --tokens-per-second 30 --first-token-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web
+
+DEFAULT_REPLY = (
+    "Based on your profile, keep contributing steadily, hold an emergency fund "
+    "of three to six months of expenses, and review your plan once a year."
+)
+
+
+class FakeOllama:
+    def __init__(self, reply=DEFAULT_REPLY, tokens_per_second=0.0, first_token_latency=0.0, load_latency=0.0):
+        self.reply = reply  # str, or callable(messages) -> str
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.load_latency = load_latency
+        self.loaded = False
+        self._loading = None
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._runner = None
+        self._loop = None
+        self._thread = None
+        self.base_url = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/api/chat', self._chat)
+        app.router.add_post('/api/generate', self._generate)
+        app.router.add_get('/api/tags', self._tags)
+        return app
+
+    def _reply_text(self, payload):
+        if 'messages' not in payload and not payload.get('prompt'):
+            return ''
+        if callable(self.reply):
+            return self.reply(payload.get('messages') or [{'role': 'user', 'content': payload.get('prompt', '')}])
+        return self.reply
+
+    async def _stream(self, request, make_chunk):
+        payload = await request.json()
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        started = time.perf_counter()
+        try:
+            text = self._reply_text(payload)
+            # Ollama streams one token at a time; words are close enough here
+            tokens = [word + ' ' for word in text.split(' ')]
+            tokens[-1] = tokens[-1].rstrip(' ')
+
+            response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await response.prepare(request)
+            load_started = time.perf_counter()
+            await self._load()
+            load_duration = time.perf_counter() - load_started
+            await asyncio.sleep(self.first_token_latency)
+            delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+            for token in tokens if text else []:
+                await response.write((json.dumps(make_chunk(payload, token, False)) + '\n').encode())
+                if delay:
+                    await asyncio.sleep(delay)
+
+            prompt_chars = sum(len(m.get('content', '')) for m in payload.get('messages', [])) + len(payload.get('prompt') or '')
+            final = make_chunk(payload, '', True)
+            final.update({
+                'done_reason': 'stop',
+                'total_duration': int((time.perf_counter() - started) * 1e9),
+                'load_duration': int(load_duration * 1e9),
+                'prompt_eval_count': max(1, prompt_chars // 4),
+                'eval_count': len(tokens) if text else 0,
+            })
+            await response.write((json.dumps(final) + '\n').encode())
+            await response.write_eof()
+            return response
+        finally:
+            self.active -= 1
+
+    async def _load(self):
+        """Pay load_latency once; concurrent first requests wait for the same load"""
+        if self.loaded:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(asyncio.sleep(self.load_latency))
+        await asyncio.shield(self._loading)
+        self.loaded = True
+
+    async def _chat(self, request):
+        def chunk(payload, token, done):
+            return {
+                'model': payload.get('model', 'mistral'),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'message': {'role': 'assistant', 'content': token},
+                'done': done,
+            }
+        return await self._stream(request, chunk)
+
+    async def _generate(self, request):
+        def chunk(payload, token, done):
+            return {
+                'model': payload.get('model', 'mistral'),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'response': token,
+                'done': done,
+            }
+        return await self._stream(request, chunk)
+
+    async def _tags(self, request):
+        return web.json_response({'models': [{'name': 'mistral:latest', 'model': 'mistral:latest'}]})
+
+    async def start(self, host='127.0.0.1', port=0) -> str:
+        """Start serving on the running event loop and return the base URL"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host='127.0.0.1', port=0) -> str:
+        """Serve from a background thread (for synchronous clients)"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='fake-ollama', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--tokens-per-second', type=float, default=30.0)
+    parser.add_argument('--first-token-latency', type=float, default=0.3)
+    parser.add_argument('--load-latency', type=float, default=0.0, help="one-off model load on first request")
+    args = parser.parse_args(argv)
+
+    fake = FakeOllama(tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency,
+                      load_latency=args.load_latency)
+    web.run_app(fake.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
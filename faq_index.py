@@ -0,0 +1,260 @@
+# faq_index.py
+"""Local retrieval over curated answers to common education questions.
+
+Questions the intent router doesn't recognise go to the model, but many of
+them are the same few explanations in other words ("explain the
+calculations", "how long until my money doubles", "what is the 4% rule").
+FaqIndex answers those from FAQ without a generation.
+
+Every example question is turned into hashed TF-IDF features (words, word
+pairs and character trigrams, hashed into `dim` buckets with crc32 so the
+index is the same in every process), and the L2-normalised rows are stored
+inverted: for each bucket, the examples that use it and their float32
+weights in two compact arrays. A lookup hashes the message the same way and
+scores it against every example by walking only the buckets it touches.
+There is no NumPy, so the first FAQ answer in a fresh process (the CLI's
+`ask`) doesn't pay for importing it. Stopwords and question framing are dropped
+first, so "what's the difference between X and Y" only matches on X and Y.
+A match is confident when its cosine score is at least `threshold` and
+beats the best example of every other entry by `margin`; then the entry's
+answer is filled in with the profile's figures (derived_metrics, so nothing
+is recomputed). Otherwise the caller asks the model.
+
+    index = default_index()
+    index.answer("How long until my money doubles?", agent.metrics)
+"""
+import math
+import re
+import string
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from derived_metrics import METRICS
+
+DEFAULT_DIM = 1 << 12
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_MARGIN = 0.1   # best entry's score over the runner-up entry's
+
+_WORD = re.compile(r"[a-z0-9%$]+(?:'[a-z]+)?")
+# Function words and question framing ("what's the difference between ...")
+# that say nothing about the topic; they are dropped before hashing so that
+# only the topic words decide the match
+STOPWORDS = frozenset("""
+    a about am an and are as at be between by can could did difference do does explain for from how i i'm if in is
+    it it's me mean means my of on or should so tell than that the this to vs was what what's when where which who
+    why will with would you your
+""".split())
+
+
+class FaqEntry(NamedTuple):
+    name: str
+    questions: tuple    # example phrasings
+    answer: str         # str.format template over profile fields and derived metrics
+
+
+class FaqMatch(NamedTuple):
+    name: str
+    score: float        # cosine similarity to the closest example question
+    margin: float       # score minus the closest example of any other entry
+
+
+FAQ = (
+    FaqEntry('calculations', (
+        "Explain the calculations you used",
+        "How did you calculate my retirement plan?",
+        "What formulas do you use?",
+        "Show me the math behind my summary",
+        "How do you work out my total at retirement?",
+    ), "Here's how your plan is worked out:\n"
+       "- Your ${current_savings:,.2f} grows at {monthly_rate:.3%} a month ({expected_return:.1%} a year) for "
+       "{months_to_retirement} months, to ${future_current:,.2f}: FV = PV × (1 + r)^n.\n"
+       "- Saving ${monthly_savings:,.2f} a month adds ${future_monthly:,.2f}: FV = PMT × [(1 + r)^n – 1] / r.\n"
+       "- Together that's ${total_at_retirement:,.2f} at age {retirement_age}.\n"
+       "- To draw ${retirement_goal:,.2f} a year at a 4% withdrawal rate you need ${retirement_goal:,.2f} / 0.04 = "
+       "${needed_amount:,.2f}, leaving a surplus/deficit of ${surplus_deficit:,.2f}."),
+    FaqEntry('four_percent_rule', (
+        "What is the 4% rule?",
+        "Explain the four percent rule",
+        "Why do you divide my goal by 4 percent?",
+        "How much do I need saved to retire?",
+        "What is a safe withdrawal rate?",
+        "How is my retirement target calculated?",
+    ), "The 4% rule says you can withdraw about 4% of your savings in the first year of retirement, and "
+       "the same amount adjusted for inflation after that, with a good chance of it lasting 30 years. "
+       "Turned around, you need 25 times the income you want: ${retirement_goal:,.2f} / 0.04 = ${needed_amount:,.2f}."),
+    FaqEntry('doubling', (
+        "How long until my money doubles?",
+        "How fast will my investments double?",
+        "How many years does it take to double my savings?",
+        "When will my savings double?",
+    ), "Dividing 72 by your return in percent gives the years to double: 72 / {expected_return_percent:.1f} ≈ "
+       "{doubling_time:.1f} years, so your ${current_savings:,.2f} would be about ${doubled_savings:,.2f} by then "
+       "without adding anything."),
+    FaqEntry('compound_interest', (
+        "What is compound interest?",
+        "How does compounding work?",
+        "Why does starting to save early matter?",
+        "Explain compound growth",
+    ), "Compound interest means your returns earn returns of their own. At {expected_return:.1%} a year, "
+       "compounded monthly, your ${current_savings:,.2f} becomes ${future_current:,.2f} over your "
+       "{years_to_retirement} years to retirement without another dollar added; the earlier money goes in, the "
+       "more times it compounds."),
+    FaqEntry('real_return', (
+        "What is a real return?",
+        "What's the difference between nominal and real returns?",
+        "What does after-inflation return mean?",
+    ), "A nominal return is what your investments earn; the real return is what's left after inflation eats "
+       "into it: (1 + {expected_return:.1%}) / (1 + {inflation_rate:.1%}) − 1 = {real_return:.1%} a year for you."),
+    FaqEntry('expected_return', (
+        "Why do you assume this return?",
+        "Where does my expected return come from?",
+        "How did you pick my rate of return?",
+        "What return are you assuming for me?",
+        "Why a 7% return?",
+    ), "Your expected return of {expected_return:.1%} comes from your {risk_tolerance} risk tolerance "
+       "(conservative 5%, moderate 7%, aggressive 9% a year). It's a long-run average; actual returns vary "
+       "from year to year."),
+    FaqEntry('surplus_deficit', (
+        "What does surplus or deficit mean?",
+        "Am I on track for retirement?",
+        "What does my deficit mean?",
+        "Explain my surplus",
+    ), "The surplus/deficit is your projected total at retirement minus what you need: ${total_at_retirement:,.2f} "
+       "− ${needed_amount:,.2f} = ${surplus_deficit:,.2f}. {on_track}"),
+)
+
+
+def _hash(gram):
+    return zlib.crc32(gram.encode())
+
+
+@lru_cache(maxsize=16_384)
+def _word_features(word):
+    """Hashes of a word and its character trigrams; the vocabulary repeats, so these are cached"""
+    padded = f" {word} "
+    return (_hash(f"w:{word}"),) + tuple(_hash(f"c:{padded[i:i + 3]}") for i in range(len(padded) - 2))
+
+
+def _features(text, dim):
+    """Bucket -> count of the hashed word, word-pair and character-trigram features of `text`"""
+    words = [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+    keys = [key for word in words for key in _word_features(word)]
+    keys += [_hash(f"b:{a} {b}") for a, b in zip(words, words[1:])]
+    counts = {}
+    for key in keys:
+        column = key % dim
+        counts[column] = counts.get(column, 0) + 1
+    return counts
+
+
+# Template fields that are neither derived metrics nor profile fields
+_EXTRA_FIELDS = {
+    'expected_return_percent': lambda metrics: metrics.profile.expected_return * 100,
+    'doubled_savings': lambda metrics: metrics.profile.current_savings * 2,
+    'on_track': lambda metrics: ("✅ You're on track." if metrics.surplus_deficit >= 0
+                                 else "⚠️ You need to save more."),
+}
+
+
+def _template_fields(template):
+    """(derived metric names, other field names) used by a str.format template"""
+    names = {name for _, name, _, _ in string.Formatter().parse(template) if name}
+    return tuple(sorted(names & set(METRICS))), tuple(sorted(names - set(METRICS)))
+
+
+def _fill(template, fields, metrics):
+    metric_names, other_names = fields
+    values = dict(zip(metric_names, metrics.get(*metric_names)))
+    for name in other_names:
+        extra = _EXTRA_FIELDS.get(name)
+        values[name] = extra(metrics) if extra is not None else getattr(metrics.profile, name)
+    return template.format_map(values)
+
+
+class FaqIndex:
+    """Hashed TF-IDF nearest-neighbour lookup over the example questions of `entries`"""
+
+    def __init__(self, entries=FAQ, dim=DEFAULT_DIM, threshold=DEFAULT_THRESHOLD, margin=DEFAULT_MARGIN):
+        self.entries = {entry.name: entry for entry in entries}
+        self._fields = {entry.name: _template_fields(entry.answer) for entry in entries}
+        self.dim = dim
+        self.threshold = threshold
+        self.margin = margin
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        documents = [(entry.name, question) for entry in entries for question in entry.questions]
+        self._names = [name for name, _ in documents]
+        counts = [_features(question, dim) for _, question in documents]
+        document_frequency = [0] * dim
+        for row in counts:
+            for column in row:
+                document_frequency[column] += 1
+        # Buckets no example uses get the highest weight, so unknown words lower the score
+        self._idf = [math.log((1 + len(documents)) / (1 + frequency)) + 1 for frequency in document_frequency]
+
+        # bucket -> (example indices, weights), for the buckets some example uses
+        self._postings = {}
+        for i, row in enumerate(counts):
+            columns, weights = self._weights(row)
+            for column, weight in zip(columns, weights):
+                examples, example_weights = self._postings.setdefault(column, (array('H'), array('f')))
+                examples.append(i)
+                example_weights.append(weight)
+
+    def _weights(self, counts):
+        """Bucket indices and unit-length sublinear TF-IDF weights"""
+        idf = self._idf
+        weights = [(1 + math.log(count)) * idf[column] for column, count in counts.items()]
+        norm = math.sqrt(sum(weight * weight for weight in weights))
+        return list(counts), [weight / norm for weight in weights]
+
+    def lookup(self, message: str) -> Optional[FaqMatch]:
+        """The closest entry, its score and margin, whatever they are; None for a message with no topic words"""
+        counts = _features(message, self.dim)
+        if not counts:
+            return None
+        scores = [0.0] * len(self._names)
+        for column, weight in zip(*self._weights(counts)):
+            posting = self._postings.get(column)
+            if posting is not None:
+                for i, example_weight in zip(*posting):
+                    scores[i] += weight * example_weight
+        best = max(range(len(scores)), key=scores.__getitem__)
+        name = self._names[best]
+        runner_up = max((score for i, score in enumerate(scores) if self._names[i] != name), default=0.0)
+        return FaqMatch(name, scores[best], scores[best] - runner_up)
+
+    def answer(self, message: str, metrics, count: bool = True) -> Optional[str]:
+        """The filled-in answer for `message` if the match is confident enough, otherwise None"""
+        match = self.lookup(message)
+        confident = match is not None and match.score >= self.threshold and match.margin >= self.margin
+        with self._lock:
+            if confident:
+                self.hits += count
+            else:
+                self.misses += count
+        if not confident:
+            return None
+        return _fill(self.entries[match.name].answer, self._fields[match.name], metrics)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {'lookups': total, 'hits': self.hits, 'hit_rate': self.hits / total if total else 0.0}
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> FaqIndex:
+    """Process-wide index over FAQ, built on first use"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = FaqIndex()
+        return _default_index
@@ -1,6 +1,8 @@
 # formulas.py
 import math
 
+HORIZON_AGE = 95  # planning horizon: a retirement age past it is treated as out of reach
+
 def future_value(pv, rate, n):
     """Calculate future value: FV = PV × (1 + r)^n"""
     return pv * (1 + rate) ** n
@@ -53,6 +55,8 @@ def calculate_retirement_age(current_age, current_savings, monthly_savings, targ
 def calculate_savings_longevity(initial_amount, monthly_withdrawal, annual_return):
     """Calculate how long savings will last with regular withdrawals"""
     monthly_rate = annual_return / 12
+    if monthly_withdrawal <= initial_amount * monthly_rate:
+        return float('inf')  # Withdrawals never exceed the interest
     
     # Use NPER: how long until balance reaches 0
     months = nper(monthly_rate, monthly_withdrawal, -initial_amount, 0)
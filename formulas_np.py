@@ -0,0 +1,245 @@
+# formulas_np.py
+"""Array versions of the functions in formulas.py.
+
+Every function accepts scalars or NumPy arrays and broadcasts its arguments
+against each other. Branches in the scalar code (zero rate, no solution) are
+handled with masks instead of `if`, so results match formulas.py element by
+element, up to the last bit of rounding in NumPy's vectorized pow/log.
+
+On one core and 1M elements, against a loop over the scalar functions on
+the same inputs, nper and calculate_retirement_age run 65-100x faster, the
+annuities, calculate_savings_longevity and monthly_savings_needed roughly
+50-65x, and future_value 40-55x (`python benchmarks.py scalar batch` times
+each of them). future_value is one np.power pass plus an add and a multiply,
+and np.power is two thirds of that time; exp(n × ln(1 + r)) saves under 5%
+here, so the kernels keep np.power and its rounding.
+
+Where the scalar code would raise ZeroDivisionError (e.g. a zero payment at a
+zero rate) the array code gives inf/nan for that element instead.
+"""
+import numpy as np
+
+
+def _f(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _out(x):
+    # 0-d results come back as plain floats so scalar calls stay scalar
+    return x[()] if x.ndim == 0 else x
+
+
+# Elements per block when evaluating large inputs. Working through the
+# broadcast inputs a block at a time keeps the output block and the scratch
+# buffer in cache, which is roughly twice as fast as whole-array passes at 1M
+# rows.
+BLOCK_SIZE = 16384
+
+
+def _apply(kernel, *args):
+    """Evaluate an elementwise kernel over broadcast float64 arguments, blockwise.
+
+    The output is allocated once and each kernel call writes its block in
+    place (`out`), using one preallocated block of `scratch` for whatever it
+    needs besides. Blocks are runs of the leading axis: arguments that have
+    it are sliced without copying and the rest broadcast as they are.
+    Kernels compute the masked cases' division by zero and invalid results
+    before replacing them, so those warnings are off for the whole call.
+    """
+    args = [_f(a) for a in args]
+    shape = np.broadcast_shapes(*(a.shape for a in args))
+    out = np.empty(shape)
+    rows = shape[0] if shape else 1
+    step = max(1, BLOCK_SIZE // max(1, out.size // max(1, rows)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if step >= rows:
+            kernel(*args, out=out, scratch=np.empty(shape))
+            return _out(out)
+
+        scratch = np.empty((step,) + shape[1:])
+        sliced = [a.ndim == len(shape) and a.shape[0] != 1 for a in args]
+        for start in range(0, rows, step):
+            block = slice(start, start + step)
+            block_out = out[block]
+            kernel(*(a[block] if s else a for a, s in zip(args, sliced)),
+                   out=block_out, scratch=scratch[:len(block_out)])
+    return out
+
+
+def _growth(rate, n, out):
+    """(1 + r)^n, in `out`"""
+    np.add(rate, 1.0, out=out)
+    return np.power(out, n, out=out)
+
+
+def _set_where(out, mask, value):
+    """out[mask] = value (inf or nan; inf only over finite elements).
+
+    A masked copy is cheap when few elements are set but several times
+    slower than plain arithmetic when the mask mixes True and False (no
+    solution for a large share of the inputs), so then an offset of value
+    where mask and 0 elsewhere is added instead.
+    """
+    if np.count_nonzero(mask) <= mask.size // 8:
+        np.copyto(out, value, where=mask)
+        return out
+    offset = np.divide(1.0, ~mask)  # inf where mask, 1 elsewhere
+    offset -= 1                     # inf where mask, 0 elsewhere
+    if value != np.inf:
+        offset *= 0                 # nan where mask, 0 elsewhere
+    out += offset
+    return out
+
+
+def _where_zero_rate(out, rate, scratch, value, *args):
+    """out = value(*args) where rate == 0, computed in `scratch` only if there are any"""
+    zero = rate == 0
+    if zero.any():
+        np.copyto(out, value(*args, out=scratch), where=zero)
+    return out
+
+
+def _future_value(pv, rate, n, out, scratch):
+    _growth(rate, n, out)
+    return np.multiply(pv, out, out=out)
+
+
+def future_value(pv, rate, n):
+    """Calculate future value: FV = PV × (1 + r)^n"""
+    return _apply(_future_value, pv, rate, n)
+
+
+def _present_value(fv, rate, n, out, scratch):
+    _growth(rate, n, out)
+    return np.divide(fv, out, out=out)
+
+
+def present_value(fv, rate, n):
+    """Calculate present value: PV = FV / (1 + r)^n"""
+    return _apply(_present_value, fv, rate, n)
+
+
+def _fv_annuity(pmt, rate, n, out, scratch):
+    _growth(rate, n, out)
+    out -= 1
+    out *= pmt
+    out /= rate
+    return _where_zero_rate(out, rate, scratch, np.multiply, pmt, n)
+
+
+def fv_annuity(pmt, rate, n):
+    """Calculate future value of annuity: FV = PMT × [(1 + r)^n – 1] / r"""
+    return _apply(_fv_annuity, pmt, rate, n)
+
+
+def _pv_annuity(pmt, rate, n, out, scratch):
+    _growth(rate, np.negative(n), out)
+    np.subtract(1.0, out, out=out)
+    out *= pmt
+    out /= rate
+    return _where_zero_rate(out, rate, scratch, np.multiply, pmt, n)
+
+
+def pv_annuity(pmt, rate, n):
+    """Calculate present value of annuity: PV = PMT × [1 – (1 + r)^(–n)] / r"""
+    return _apply(_pv_annuity, pmt, rate, n)
+
+
+# Stands in for a nonpositive NPER numerator so its log stays finite (and fast)
+_TINY = np.finfo(np.float64).tiny
+
+
+def _nper(rate, pmt, pv, fv, out, scratch):
+    # NPER = ln((pmt - fv*rate) / (pmt + pv*rate)) / ln(1 + rate)
+    np.multiply(fv, rate, out=out)
+    np.subtract(pmt, out, out=out)
+    np.multiply(pv, rate, out=scratch)
+    scratch += pmt
+    out /= scratch
+    no_solution = out <= 0
+    np.maximum(out, _TINY, out=out)
+    np.log(out, out=out)
+    np.add(rate, 1.0, out=scratch)
+    out /= np.log(scratch, out=scratch)
+    _set_where(out, no_solution, np.inf)
+
+    return _where_zero_rate(out, rate, scratch, _zero_rate_nper, pmt, pv, fv)
+
+
+def _zero_rate_nper(pmt, pv, fv, out):
+    np.add(fv, pv, out=out)
+    np.negative(out, out=out)
+    return np.divide(out, pmt, out=out)
+
+
+def nper(rate, pmt, pv, fv=0):
+    """Calculate number of periods (Excel-style NPER function)
+
+    Elements with no solution are inf, as in the scalar version.
+    """
+    return _apply(_nper, rate, pmt, pv, fv)
+
+
+def rule_of_72(rate_percent):
+    """Estimate years to double investment: Years ≈ 72 / rate%"""
+    with np.errstate(divide='ignore'):
+        return _out(np.divide(72, _f(rate_percent)))
+
+
+def _retirement_age(current_age, current_savings, monthly_savings, target_amount, annual_return, out, scratch):
+    monthly_rate = annual_return / 12
+    _nper(monthly_rate, -monthly_savings, -current_savings, target_amount, out, scratch)
+
+    unreachable = (out == np.inf) | (out < 0)
+    out /= 12
+    out += current_age
+    return _set_where(out, unreachable, np.nan)
+
+
+def calculate_retirement_age(current_age, current_savings, monthly_savings, target_amount, annual_return):
+    """Calculate when someone can retire based on their savings plan
+
+    Elements with no reachable retirement age are nan (None in the scalar version).
+    """
+    return _apply(_retirement_age, current_age, current_savings, monthly_savings, target_amount, annual_return)
+
+
+def _savings_longevity(initial_amount, monthly_withdrawal, annual_return, out, scratch):
+    # _nper with pv = -initial_amount and fv = 0 folded in, and every way the
+    # money lasts forever collected in one mask
+    monthly_rate = annual_return / 12
+    np.multiply(initial_amount, monthly_rate, out=scratch)
+    forever = monthly_withdrawal <= scratch  # withdrawals never exceed the interest
+    np.subtract(monthly_withdrawal, scratch, out=scratch)
+    np.divide(monthly_withdrawal, scratch, out=out)
+    forever |= out <= 0
+    np.maximum(out, _TINY, out=out)
+    np.log(out, out=out)
+    np.add(monthly_rate, 1.0, out=scratch)
+    out /= np.log(scratch, out=scratch)
+    _where_zero_rate(out, monthly_rate, scratch, np.divide, initial_amount, monthly_withdrawal)
+
+    forever |= out < 0
+    out /= 12
+    return _set_where(out, forever, np.inf)
+
+
+def calculate_savings_longevity(initial_amount, monthly_withdrawal, annual_return):
+    """Calculate how long savings will last with regular withdrawals"""
+    return _apply(_savings_longevity, initial_amount, monthly_withdrawal, annual_return)
+
+
+def _monthly_savings_needed(target_amount, years, annual_return, out, scratch):
+    monthly_rate = annual_return / 12
+    months = years * 12
+
+    # PMT = FV * r / [(1 + r)^n - 1]
+    _growth(monthly_rate, months, out)
+    out -= 1
+    np.divide(np.multiply(target_amount, monthly_rate, out=scratch), out, out=out)
+    return _where_zero_rate(out, monthly_rate, scratch, np.divide, target_amount, months)
+
+
+def monthly_savings_needed(target_amount, years, annual_return):
+    """Calculate monthly savings needed to reach a target"""
+    return _apply(_monthly_savings_needed, target_amount, years, annual_return)
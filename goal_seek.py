@@ -0,0 +1,222 @@
+# goal_seek.py
+"""Batched goal-seek solvers.
+
+formulas has closed forms for the number of periods and the level monthly
+saving, but not for "what return do I need?", "what is the most I can
+withdraw for 30 years?" or "what annual spend supports retiring at 60?"
+once inflation or contribution growth is involved. solve() finds the roots
+of any monotone residual for a whole batch of problems at once, with a
+safeguarded Newton method: each step is a Newton step from a finite
+difference, falling back to bisection whenever the step would leave the
+bracket or the bracket stops shrinking fast enough. Every element that
+converges has its root bracketed to within xtol; the rest are counted.
+
+    >>> required_return(50_000, 1_000, 360, 2_000_000).root
+    0.0791...
+
+Cash flows follow projection.iter_schedule: payments at the end of each
+month, stepped up by the growth rate at the start of each year.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from formulas import HORIZON_AGE
+
+DEFAULT_MAX_ITER = 100
+
+
+class GoalSeekResult(NamedTuple):
+    root: np.ndarray        # nan where there is no root in the bracket or the solver gave up
+    converged: np.ndarray   # True where |root - true root| <= xtol is guaranteed
+    iterations: np.ndarray
+    failed: int             # how many did not converge (those with no root in the bracket have 0 iterations)
+
+
+def _f(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _out(x):
+    return x[()] if x.ndim == 0 else x
+
+
+def solve(residual, low, high, xtol=1e-8, max_iter=DEFAULT_MAX_ITER, x0=None):
+    """Roots of residual(x, index) = 0 for a batch, each bracketed by [low, high].
+
+    residual is called with candidate roots for the rows in `index` (an
+    integer array into the batch) and must return their residuals. It only
+    needs to change sign across the bracket; a monotone residual has exactly
+    one root there.
+    """
+    low, high = np.broadcast_arrays(_f(low), _f(high))
+    shape = low.shape
+    low, high = low.ravel().copy(), high.ravel().copy()
+    n = low.size
+    everything = np.arange(n)
+
+    f_low, f_high = residual(low, everything), residual(high, everything)
+    root = np.full(n, np.nan)
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=np.int64)
+
+    # Orient each bracket so that residual(neg) < 0 < residual(pos)
+    neg = np.where(f_low < 0, low, high)
+    pos = np.where(f_low < 0, high, low)
+    for point, value in ((low, f_low), (high, f_high)):
+        exact = value == 0
+        root[exact], converged[exact] = point[exact], True
+    no_root = ~converged & ~((f_low < 0) ^ (f_high < 0))
+    no_root |= ~np.isfinite(f_low) | ~np.isfinite(f_high)
+    done = converged | no_root
+
+    x = (neg + pos) / 2 if x0 is None else np.clip(np.broadcast_to(_f(x0), shape).ravel(),
+                                                   np.minimum(neg, pos), np.maximum(neg, pos))
+    direction = np.ones(n)
+    previous_width = np.abs(pos - neg)
+
+    for _ in range(max_iter):
+        active = np.flatnonzero(~done)
+        if active.size == 0:
+            break
+        iterations[active] += 1
+        xa, ng, ps = x[active], neg[active], pos[active]
+
+        # Probe one tolerance away, continuing in the direction of the last
+        # step: once Newton is within xtol the two probes straddle the root
+        h = direction[active] * np.maximum(xtol, 1e-12)
+        fx = residual(xa, active)
+        fh = residual(xa + h, active)
+        for point, value in ((xa, fx), (xa + h, fh)):
+            inside = (point - ng) * (point - ps) <= 0
+            ng = np.where(inside & (value < 0), point, ng)
+            ps = np.where(inside & (value > 0), point, ps)
+        exact = fx == 0
+        width = np.abs(ps - ng)
+        finished = exact | (width <= 2 * xtol)
+        root[active[exact]] = xa[exact]
+        settled = finished & ~exact
+        root[active[settled]] = (ng[settled] + ps[settled]) / 2
+        converged[active[finished]] = True
+        done[active[finished]] = True
+        neg[active], pos[active] = ng, ps
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = xa - fx * h / (fh - fx)
+        lower, upper = np.minimum(ng, ps), np.maximum(ng, ps)
+        use_newton = np.isfinite(newton) & (newton > lower) & (newton < upper)
+        # Bisect when the bracket shrank by less than half since the last iteration
+        use_newton &= width <= 0.5 * previous_width[active]
+        x_next = np.where(use_newton, newton, (ng + ps) / 2)
+        direction[active] = np.where(x_next >= xa, 1.0, -1.0)
+        previous_width[active] = np.where(use_newton, previous_width[active], width)
+        x[active] = x_next
+
+    failed = int(np.count_nonzero(~converged))
+    return GoalSeekResult(_out(root.reshape(shape)), _out(converged.reshape(shape)),
+                          _out(iterations.reshape(shape)), failed)
+
+
+def _annuity_factor(rate, months):
+    """(1 + r)^n - 1 over r, i.e. fv_annuity(1, r, n), with the r = 0 limit"""
+    growth = np.expm1(months * np.log1p(rate))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate == 0, months, growth / rate)
+
+
+def accumulate(current_savings, monthly_payment, monthly_rate, months, growth=0.0):
+    """Balance after `months` of end-of-month payments that step up by `growth` each year.
+
+    With growth = 0 this is future_value + fv_annuity. A negative payment is
+    a withdrawal, so accumulate(balance, -w, r, n, inflation) is the balance
+    left after n months of inflation-linked withdrawals.
+    """
+    pv, pmt, rate, months, growth = (_f(x) for x in (current_savings, monthly_payment, monthly_rate, months, growth))
+    years, remainder = np.divmod(months, 12)
+
+    # Each full year's payments are worth pmt * q^k * A12 at the end of year
+    # k; summed forward to the end of the last full year this is
+    # A12 * (G12^Y - q^Y) / (G12 - q), written with expm1 so it stays exact
+    # as G12 approaches q.
+    log_g12 = 12 * np.log1p(rate)
+    log_q = np.log1p(growth)
+    d = log_g12 - log_q
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(d == 0, years, np.expm1(years * d) / np.expm1(d))
+    full_years = pmt * _annuity_factor(rate, 12) * np.exp((years - 1) * log_q) * ratio
+    full_years = np.where(years == 0, 0.0, full_years)
+
+    tail = pmt * np.exp(years * log_q) * _annuity_factor(rate, remainder)
+    return pv * np.exp(months * np.log1p(rate)) + full_years * np.exp(remainder * np.log1p(rate)) + tail
+
+
+def _rows(index, *arrays):
+    return (a[index] for a in arrays)
+
+
+def required_return(current_savings, monthly_savings, months, target_amount, contribution_growth=0.0,
+                    low=-0.5, high=1.0, xtol=1e-7):
+    """Annual return needed to reach target_amount after `months`, for each profile"""
+    arrays = [a.ravel() for a in np.broadcast_arrays(*(_f(x) for x in (
+        current_savings, monthly_savings, months, target_amount, contribution_growth)))]
+    shape = np.broadcast_shapes(*(np.shape(x) for x in (current_savings, monthly_savings, months, target_amount,
+                                                       contribution_growth)))
+
+    def residual(annual_return, index):
+        pv, pmt, n, target, growth = _rows(index, *arrays)
+        return accumulate(pv, pmt, annual_return / 12, n, growth) - target
+
+    result = solve(residual, np.full(arrays[0].shape, low), high, xtol=xtol)
+    return _reshape(result, shape)
+
+
+def sustainable_withdrawal(initial_amount, years, annual_return, inflation_rate=0.0, xtol=1e-4):
+    """Largest first-month withdrawal, rising with inflation each year, that lasts exactly `years`"""
+    arrays = [a.ravel() for a in np.broadcast_arrays(*(_f(x) for x in (
+        initial_amount, years, annual_return, inflation_rate)))]
+    shape = np.broadcast_shapes(*(np.shape(x) for x in (initial_amount, years, annual_return, inflation_rate)))
+
+    def residual(withdrawal, index):
+        pv, n_years, annual, inflation = _rows(index, *arrays)
+        # Remaining balance falls as the withdrawal rises; negate so the residual rises
+        return -accumulate(pv, -withdrawal, annual / 12, n_years * 12, inflation)
+
+    amount, _, annual, _ = arrays
+    # Withdrawing the whole balance (plus a month's growth) in month one always overshoots
+    high = amount * (1 + np.maximum(annual, 0) / 12) + 1
+    result = solve(residual, np.zeros_like(amount), high, xtol=xtol)
+    return _reshape(result, shape)
+
+
+def retirement_spend(age, retirement_age, current_savings, monthly_savings, annual_return, inflation_rate=0.0,
+                     contribution_growth=0.0, horizon_age=HORIZON_AGE, xtol=1e-2):
+    """Annual spend in today's dollars that savings support from retirement_age to horizon_age.
+
+    Savings grow (with contributions stepping up by contribution_growth)
+    until retirement, then fund withdrawals that keep pace with inflation
+    until horizon_age.
+    """
+    inputs = (age, retirement_age, current_savings, monthly_savings, annual_return, inflation_rate,
+              contribution_growth, horizon_age)
+    arrays = [a.ravel() for a in np.broadcast_arrays(*(_f(x) for x in inputs))]
+    shape = np.broadcast_shapes(*(np.shape(x) for x in inputs))
+
+    age, retire, savings, pmt, annual, inflation, growth, horizon = arrays
+    saving_months = np.maximum(retire - age, 0) * 12
+    at_retirement = accumulate(savings, pmt, annual / 12, saving_months, growth)
+    price_level = np.exp(saving_months / 12 * np.log1p(inflation))
+    spending_months = np.maximum(horizon - retire, 0) * 12
+
+    def residual(annual_spend, index):
+        balance, level, annual_rate, infl, n = _rows(index, at_retirement, price_level, annual, inflation,
+                                                     spending_months)
+        return -accumulate(balance, -annual_spend / 12 * level, annual_rate / 12, n, infl)
+
+    # Spending the whole balance in the first month always overshoots
+    high = np.maximum(at_retirement, 0) * 12 / price_level * (1 + np.maximum(annual, 0)) + 1
+    result = solve(residual, np.zeros_like(at_retirement), high, xtol=xtol)
+    return _reshape(result, shape)
+
+
+def _reshape(result, shape):
+    return GoalSeekResult(*(_out(np.reshape(values, shape)) for values in result[:3]), result.failed)
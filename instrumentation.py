@@ -0,0 +1,187 @@
+# instrumentation.py
+"""Per-stage latency and token instrumentation for AdvisorAgent.
+
+The agent times each stage of a request (route matching, the calculator
+math, cache lookup, prompt building, the model call) through a Tracer, which
+hands one record per stage to its sinks:
+
+    {'stage': 'chat.llm', 'seconds': 1.84, 'ts': 1760000000.0,
+     'ttft_s': 0.61, 'load_s': 0.42, 'prompt_tokens': 212, 'completion_tokens': 96}
+
+Sinks are any object with a record(dict) method. JSONLSink appends records
+to a file and HistogramSink keeps recent durations in memory for p50/p95.
+A tracer with no sinks skips timing altogether.
+
+Set ADVISOR_TRACE_PATH to a JSONL file to log every record from the shared
+tracer.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_HISTOGRAM_SAMPLES = 2048
+
+
+class _Stage:
+    __slots__ = ('tracer', 'name', 'fields', 'start')
+
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fields['error'] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.start, **self.fields)
+        return False
+
+
+class _NullStage:
+    # Shared by every untraced stage; fields written to it are never read
+    __slots__ = ('fields',)
+
+    def __init__(self):
+        self.fields = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fields.clear()
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Tracer:
+    """Times named stages and fans the records out to its sinks"""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    @property
+    def enabled(self):
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        if sink not in self.sinks:
+            self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def stage(self, name, **fields):
+        """Context manager timing one stage; extra fields can be set on .fields inside it"""
+        if not self.sinks:
+            return _NULL_STAGE
+        return _Stage(self, name, fields)
+
+    def record(self, name, seconds, **fields):
+        if not self.sinks:
+            return
+        record = {'stage': name, 'seconds': seconds, 'ts': time.time()}
+        record.update(fields)
+        for sink in self.sinks:
+            sink.record(record)
+
+
+class JSONLSink:
+    """Appends one JSON line per record"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _nearest_rank(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(q / 100 * len(sorted_samples)))]
+
+
+class HistogramSink:
+    """Keeps the most recent durations per stage for percentiles.
+
+    Each record's 'seconds' is kept under its stage, and any other *_s field
+    under '<stage>.<field>' (so ttft_s on chat.llm becomes chat.llm.ttft).
+    """
+
+    def __init__(self, max_samples=DEFAULT_HISTOGRAM_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        stage = record['stage']
+        values = [(stage, record['seconds'])]
+        for field, value in record.items():
+            if field.endswith('_s') and value is not None:
+                values.append((f"{stage}.{field[:-2]}", value))
+        with self._lock:
+            for name, value in values:
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.max_samples)
+                samples.append(value)
+
+    def percentile(self, stage, q):
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        return _nearest_rank(samples, q) if samples else None
+
+    def summary(self, percentiles=(50, 95)) -> dict:
+        """{stage: {'count': n, 'p50': s, 'p95': s}} for every stage seen"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in sorted(snapshot.items()):
+            row = {'count': len(samples)}
+            for q in percentiles:
+                row[f"p{q}"] = _nearest_rank(samples, q)
+            result[name] = row
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+def llm_usage(message) -> dict:
+    """Token counts (and Ollama model load time) reported with a model reply, where available"""
+    usage = getattr(message, 'usage_metadata', None) or {}
+    metadata = getattr(message, 'response_metadata', None) or {}
+    prompt_tokens = usage.get('input_tokens', metadata.get('prompt_eval_count'))
+    completion_tokens = usage.get('output_tokens', metadata.get('eval_count'))
+    fields = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+    if metadata.get('load_duration') is not None:
+        fields['load_s'] = metadata['load_duration'] / 1e9
+    return fields
+
+
+def _default_tracer():
+    tracer = Tracer()
+    path = os.environ.get("ADVISOR_TRACE_PATH")
+    if path:
+        tracer.add_sink(JSONLSink(path))
+    return tracer
+
+
+default_tracer = _default_tracer()
@@ -0,0 +1,201 @@
+# intent_router.py
+"""Deterministic intent routing for AdvisorAgent.chat.
+
+One precompiled regex scans the message once and picks out both the intent
+keywords ("when can I retire", "rule of 72", "inflation", ...) and the
+numbers the user gave (rates, dollar amounts, ages, durations). The agent
+then answers from formulas with those numbers in place of the profile's,
+without calling the model.
+
+    >>> default_router.route("How long will $500k last in retirement?")
+    Intent(name='savings_longevity', params={'amount': 500000.0})
+
+A percentage is only used for what its wording says it is: a return ("at
+8%", "earning 6%", "a 7% return") goes in `rate`, and inflation, withdrawal
+and income-growth percentages in `inflation`, `withdrawal_rate` and
+`growth`. A question with a percentage the intent's answer can't use, or
+one without such wording ("if I save 10% more"), is left to the model.
+"""
+import re
+import threading
+from typing import NamedTuple, Optional
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_SCALE = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'mm': 1e6, 'million': 1e6}
+_PERIOD = {'month': 'monthly', 'mo': 'monthly', 'monthly': 'monthly',
+           'year': 'annual', 'yr': 'annual', 'annually': 'annual', 'annual': 'annual'}
+
+# Alternatives are tried left to right at each position, so numbers with a
+# unit come before the keywords that could otherwise swallow them.
+_TOKENS = re.compile(r"""
+    (?P<money>
+        (?:\$\s*(?P<dollars>{num})\s*(?P<dollar_scale>k|mm|m|thousand|million)?\b
+          |(?<![\d.,])(?!(?:401|403|457)\s?[kb]\b)(?P<scaled>{num})\s*(?P<scale>k|mm|m|thousand|million)\b)
+        (?:\s*(?:a|an|per|/|each|every)?\s*(?P<period>month|mo|year|yr|monthly|annually|annual)\b)?
+    )
+    |(?P<rule_of_72>rule\ of\ 72)
+    |(?P<percent>(?P<percent_value>(?:(?<![\d.])-)?{num})\s*(?:%|percent\b))
+    |(?P<age>\b(?:at|age)\s+(?:age\s+)?(?P<age_value>\d{{2,3}})\b(?!\s*(?:%|percent|years?|yrs?)))
+    |(?P<years>(?P<years_value>{num})\s*(?:years?|yrs?)\b)
+    |(?P<retire_when>when\ (?:can|could|will|would|should|might)\ i\ retire)
+    |(?P<how_long>how\ long\ (?:will|would|could|can|does|do))
+    |(?P<return_needed>(?:what|which)\ (?:rate\ of\ |annual\ |investment\ )?return\b|return\ (?:do|would|will)\ i\ need)
+    |(?P<withdraw_most>(?:most|maximum|max|how\ much)\ {can_i}(?:safely\ )?withdraw|safe(?:ly)?\ withdraw)
+    |(?P<spend_most>(?:most|maximum|max|how\ much|what(?:\ annual|\ yearly)?)\ {can_i}(?:afford\ to\ )?spend
+        |afford\ to\ spend)
+    |(?P<last>\blast)
+    |(?P<money_word>\bmoney)
+    |(?P<monthly>monthly)
+    |(?P<save>save)
+    |(?P<inflation>inflation)
+""".format(num=_NUMBER, can_i=r"(?:(?:can|could|should)\ i\ |i\ (?:can|could)\ )?"), re.VERBOSE)
+
+
+# Wording that says what a percentage is, just before it (the last one in its
+# clause wins, and "at" only counts when nothing more specific is there) or
+# just after it ("a 7% return", "3% inflation")
+_PERCENT_WORDS = r"""
+    (?P<rate>returns?|earn(?:s|ing)?|yield(?:s|ing)?|interest|grow(?:s|ing)?\ at)
+    |(?P<inflation>inflation)
+    |(?P<withdrawal_rate>withdraw(?:s|ing|al)?|spend(?:s|ing)?)
+    |(?P<growth>grows?|growing|growth|raises?|increases?|rises?)
+"""
+_PERCENT_BEFORE = re.compile(r"\b(?:{words}|(?P<at>at))\b".format(words=_PERCENT_WORDS), re.VERBOSE)
+_PERCENT_AFTER = re.compile(r"\s*(?:[a-z]+\ )?(?:{words})\b".format(words=_PERCENT_WORDS), re.VERBOSE)
+_CLAUSE_END = re.compile(r".*[,;.?!]", re.DOTALL)
+
+# Percentage params each intent's answer uses, and the one an unlabelled
+# percentage means for it
+PERCENT_PARAMS = {
+    'retirement_age': {'rate'},
+    'savings_longevity': {'rate', 'withdrawal_rate'},
+    'rule_of_72': {'rate'},
+    'monthly_savings_needed': {'rate'},
+    'inflation': {'inflation'},
+    'required_return': {'inflation'},
+    'sustainable_withdrawal': {'rate', 'inflation'},
+    'retirement_spend': {'rate', 'inflation'},
+}
+_DEFAULT_PERCENT = {'rule_of_72': 'rate', 'inflation': 'inflation'}
+
+
+def _percent_key(text, start, end, previous_end):
+    """The param a percentage at text[start:end] is for, or None if the wording doesn't say"""
+    after = _PERCENT_AFTER.match(text, end)
+    if after is not None:
+        return after.lastgroup
+    before = text[previous_end:start]
+    clause = _CLAUSE_END.match(before)
+    if clause is not None:
+        before = before[clause.end():]
+    kinds = [match.lastgroup for match in _PERCENT_BEFORE.finditer(before)]
+    specific = [kind for kind in kinds if kind != 'at']
+    if specific:
+        return specific[-1]
+    return 'rate' if kinds else None
+
+
+class Intent(NamedTuple):
+    name: str
+    params: dict
+
+
+def _to_float(text):
+    return float(text.replace(',', ''))
+
+
+class IntentRouter:
+    """Maps a chat message to an Intent with the numbers it mentions.
+
+    Counts how many messages were routed (hits) out of all it saw, per
+    intent, so the share answered without the model can be monitored.
+    """
+
+    INTENTS = ('retirement_age', 'savings_longevity', 'rule_of_72', 'monthly_savings_needed', 'inflation',
+               'required_return', 'sustainable_withdrawal', 'retirement_spend')
+
+    def __init__(self):
+        self.total = 0
+        self.hits = dict.fromkeys(self.INTENTS, 0)
+        self._lock = threading.Lock()
+
+    def route(self, message: str, count: bool = True) -> Optional[Intent]:
+        """The message's Intent, or None; count=False leaves the hit statistics alone"""
+        seen = set()
+        params = {}
+        percents = []   # (param or None, value)
+        text = message.lower()
+        previous_end = 0    # end of the last number, so each percentage's wording is its own
+        for match in _TOKENS.finditer(text):
+            kind = match.lastgroup
+            if kind == 'money':
+                if match.group('dollars') is not None:
+                    amount = _to_float(match.group('dollars')) * _SCALE.get(match.group('dollar_scale'), 1)
+                else:
+                    amount = _to_float(match.group('scaled')) * _SCALE[match.group('scale')]
+                period = _PERIOD.get(match.group('period'))
+                params.setdefault({'monthly': 'monthly_amount', 'annual': 'annual_amount'}.get(period, 'amount'), amount)
+            elif kind == 'percent':
+                key = _percent_key(text, match.start(), match.end(), previous_end)
+                percents.append((key, _to_float(match.group('percent_value')) / 100))
+            elif kind == 'age':
+                params.setdefault('age', int(match.group('age_value')))
+            elif kind == 'years':
+                params.setdefault('years', _to_float(match.group('years_value')))
+            else:
+                seen.add(kind)
+                continue
+            previous_end = match.end()
+
+        name = self._pick(seen)
+        for key, value in percents:
+            key = key or _DEFAULT_PERCENT.get(name)
+            if key not in PERCENT_PARAMS.get(name, ()):
+                name = None  # the answer would ignore it
+                break
+            params.setdefault(key, value)
+        if count:
+            with self._lock:
+                self.total += 1
+                if name is not None:
+                    self.hits[name] += 1
+        return Intent(name, params) if name is not None else None
+
+    @staticmethod
+    def has_figures(message: str) -> bool:
+        """Whether the message gives an amount, an age or a number of years of its own"""
+        return any(match.lastgroup in ('money', 'age', 'years') for match in _TOKENS.finditer(message.lower()))
+
+    @staticmethod
+    def _pick(seen):
+        # Same precedence as the original if/elif chain in AdvisorAgent.chat
+        if 'retire_when' in seen:
+            return 'retirement_age'
+        if 'how_long' in seen and ('last' in seen or 'money_word' in seen):
+            return 'savings_longevity'
+        if 'rule_of_72' in seen:
+            return 'rule_of_72'
+        if 'monthly' in seen and 'save' in seen:
+            return 'monthly_savings_needed'
+        # Goal-seek questions, answered by goal_seek rather than a closed form
+        if 'return_needed' in seen:
+            return 'required_return'
+        if 'withdraw_most' in seen:
+            return 'sustainable_withdrawal'
+        if 'spend_most' in seen:
+            return 'retirement_spend'
+        if 'inflation' in seen:
+            return 'inflation'
+        return None
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        return {
+            'messages': self.total,
+            'hits': hits,
+            'hit_rate': hits / self.total if self.total else 0.0,
+            'by_intent': dict(self.hits),
+        }
+
+
+default_router = IntentRouter()
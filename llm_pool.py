@@ -0,0 +1,104 @@
+# llm_pool.py
+"""Process-wide LLM clients and model warm-up.
+
+ChatOllama holds no per-conversation state, so every AdvisorAgent in a
+process can share one client per (model, base_url) instead of building its
+own. langchain is only imported when the first client is actually needed,
+so sessions that stay on the calculator branches never load it.
+
+Ollama loads a model into memory on the first request and unloads it after
+keep_alive of inactivity, so without warm-up the first real question pays
+the whole load. start_warmup() sends Ollama's load-only request (a generate
+with an empty prompt) from a daemon thread as soon as the app starts, and
+repeats it every `interval` seconds so the model stays resident while the
+app is idle. Clients are also created with the same keep_alive, so every
+chat extends it.
+
+    llm_pool.start_warmup()           # at startup, returns immediately
+    agent = AdvisorAgent(None)        # uses llm_pool.shared_llm() on first LLM call
+"""
+import json
+import threading
+import time
+
+from instrumentation import default_tracer
+
+DEFAULT_MODEL = "mistral"
+DEFAULT_BASE_URL = "http://localhost:11434"
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_REFRESH_INTERVAL = 600.0  # seconds; well inside DEFAULT_KEEP_ALIVE
+
+_clients = {}
+_warmers = {}
+_lock = threading.Lock()
+
+
+def shared_llm(model=DEFAULT_MODEL, base_url=None, keep_alive=DEFAULT_KEEP_ALIVE):
+    """The process-wide ChatOllama for this model and URL, created on first use"""
+    base_url = base_url or DEFAULT_BASE_URL
+    with _lock:
+        llm = _clients.get((model, base_url))
+        if llm is None:
+            from langchain_community.chat_models import ChatOllama
+
+            llm = ChatOllama(model=model, base_url=base_url, keep_alive=keep_alive)
+            _clients[(model, base_url)] = llm
+        return llm
+
+
+def warm_up(model=DEFAULT_MODEL, base_url=None, keep_alive=DEFAULT_KEEP_ALIVE, timeout=300.0, tracer=None) -> bool:
+    """Load the model into Ollama and keep it for keep_alive; False if Ollama could not be reached"""
+    import urllib.request
+
+    tracer = tracer if tracer is not None else default_tracer
+    url = (base_url or DEFAULT_BASE_URL).rstrip('/') + '/api/generate'
+    body = json.dumps({'model': model, 'prompt': '', 'keep_alive': keep_alive, 'stream': False}).encode()
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        ok = True
+    except OSError:
+        ok = False
+    tracer.record("llm.warmup", time.perf_counter() - started, model=model, ok=ok)
+    return ok
+
+
+class Warmer:
+    """Daemon thread that warms a model now and again every `interval` seconds (None: once)"""
+
+    def __init__(self, model=DEFAULT_MODEL, base_url=None, keep_alive=DEFAULT_KEEP_ALIVE,
+                 interval=DEFAULT_REFRESH_INTERVAL, tracer=None):
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.tracer = tracer
+        self.ok = None
+        self.ready = threading.Event()  # set once the first warm-up has finished
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'llm-warmup-{model}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.ok = warm_up(self.model, self.base_url, self.keep_alive, tracer=self.tracer)
+            self.ready.set()
+            if self.interval is None or self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+def start_warmup(model=DEFAULT_MODEL, base_url=None, keep_alive=DEFAULT_KEEP_ALIVE,
+                 interval=DEFAULT_REFRESH_INTERVAL) -> Warmer:
+    """Start warming this model in the background, once per process (later calls return the same Warmer)"""
+    key = (model, base_url or DEFAULT_BASE_URL)
+    with _lock:
+        warmer = _warmers.get(key)
+        if warmer is None or warmer._stopped.is_set():
+            warmer = _warmers[key] = Warmer(model, base_url, keep_alive, interval)
+        return warmer
@@ -0,0 +1,232 @@
+# loadtest.py
+"""Offline load test: many simulated users against the HTTP server.
+
+Starts fake_ollama (in its own thread, with the token rate and latencies
+given) and server.create_app in this process, then ramps through the
+concurrency levels given. At each level that many users run at once, and
+each goes through `sessions` whole sessions back to back: create a session,
+answer the seven questions (the last answer returns the summary), then ask
+`questions` chat questions, a mix of calculator and model questions
+(`llm_fraction` of them go to the model, streamed). Profiles are drawn at
+random so model answers are not all cache hits.
+
+For each level it reports:
+- throughput (requests and sessions per second)
+- p50/p95/p99 per client-side stage, plus time to first byte for model
+  answers
+- p50/p95/p99 of the agent's own stages from instrumentation
+- memory per session: growth in resident memory divided by the sessions the
+  server holds
+
+    python loadtest.py --levels 1 10 50 100 --tokens-per-second 40 --first-token-latency 0.2 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+import instrumentation
+import llm_pool
+from advisor_agent import AdvisorAgent
+from fake_ollama import FakeOllama
+from response_cache import ResponseCache
+from server import SESSIONS, create_app
+
+PERCENTILES = (50, 95, 99)
+CALCULATOR_QUESTIONS = (
+    "When can I retire?",
+    "How much should I save monthly?",
+    "What if inflation is 4%?",
+    "How long will $500k last in retirement?",
+    "What's the rule of 72?",
+    "What return do I need to retire at 60?",
+)
+LLM_QUESTIONS = (
+    "Should I pay off my mortgage early?",
+    "Should I invest in index funds or individual stocks?",
+    "Should I use a Roth or a traditional IRA?",
+    "How big should my emergency fund be?",
+)
+RISK_ANSWERS = ("conservative", "moderate", "aggressive")
+
+
+def random_answers(rng):
+    """Seven questionnaire answers for a plausible random profile"""
+    age = rng.randint(22, 60)
+    return [
+        str(age),
+        str(rng.randrange(30_000, 250_000, 1_000)),
+        str(rng.randrange(0, 500_000, 500)),
+        str(rng.randrange(100, 5_000, 50)),
+        str(rng.randint(max(age + 5, 55), 70)),
+        rng.choice(RISK_ANSWERS),
+        str(rng.randrange(30_000, 150_000, 1_000)),
+    ]
+
+
+def rss_bytes():
+    """Current resident memory of this process (peak where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Counters:
+    def __init__(self):
+        self.requests = 0
+        self.sessions = 0
+        self.busy = 0
+        self.errors = 0
+
+
+async def _request(http, method, url, sink, stage, counters, **kwargs):
+    """One request, timed under `stage`; retried after Retry-After on 503"""
+    while True:
+        started = time.perf_counter()
+        async with http.request(method, url, **kwargs) as response:
+            if response.status == 503:
+                counters.busy += 1
+                await asyncio.sleep(float(response.headers.get('Retry-After', 1)))
+                continue
+            fields = {}
+            if kwargs.get('params', {}).get('stream'):
+                await response.content.readany()
+                fields['ttfb_s'] = time.perf_counter() - started
+                await response.read()
+                body = None
+            else:
+                body = await response.json() if response.content_type == 'application/json' else None
+            counters.requests += 1
+            if response.status >= 400:
+                counters.errors += 1
+            sink.record({'stage': stage, 'seconds': time.perf_counter() - started, **fields})
+            return body
+
+
+async def _user(http, base_url, rng, sink, counters, sessions, questions, llm_fraction):
+    for _ in range(sessions):
+        created = await _request(http, 'POST', f"{base_url}/sessions", sink, 'create', counters)
+        session_url = f"{base_url}/sessions/{created['session_id']}"
+        answers = random_answers(rng)
+        for i, answer in enumerate(answers):
+            stage = 'summary' if i == len(answers) - 1 else 'answer'
+            await _request(http, 'POST', f"{session_url}/answer", sink, stage, counters, json={'answer': answer})
+        for _ in range(questions):
+            if rng.random() < llm_fraction:
+                await _request(http, 'POST', f"{session_url}/chat", sink, 'chat.llm', counters,
+                               json={'message': rng.choice(LLM_QUESTIONS)}, params={'stream': '1'})
+            else:
+                await _request(http, 'POST', f"{session_url}/chat", sink, 'chat.calculator', counters,
+                               json={'message': rng.choice(CALCULATOR_QUESTIONS)})
+        counters.sessions += 1
+
+
+def _summary(sink):
+    return {stage: {key: round(value * 1000, 3) if key != 'count' else value for key, value in row.items()}
+            for stage, row in sink.summary(PERCENTILES).items()}
+
+
+async def run_load(levels, sessions=2, questions=4, llm_fraction=0.3, tokens_per_second=30.0,
+                   first_token_latency=0.2, load_latency=0.0, max_llm=4, max_waiting=64, seed=0):
+    """Run each concurrency level in turn and return one result dict per level"""
+    fake = FakeOllama(tokens_per_second=tokens_per_second, first_token_latency=first_token_latency,
+                      load_latency=load_latency)
+    ollama_url = fake.start_in_thread()
+    cache = ResponseCache()
+    llm = llm_pool.shared_llm(base_url=ollama_url)
+    app = create_app(lambda: AdvisorAgent(None, response_cache=cache, llm=llm),
+                     max_concurrent_llm=max_llm, max_waiting=max_waiting, max_sessions=sys.maxsize)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    agent_sink = instrumentation.default_tracer.add_sink(instrumentation.HistogramSink(max_samples=100_000))
+    rng = random.Random(seed)
+    results = []
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as http:
+            rss_start = rss_bytes()
+            for users in levels:
+                client_sink = instrumentation.HistogramSink(max_samples=100_000)
+                agent_sink.clear()
+                counters = _Counters()
+                started = time.perf_counter()
+                await asyncio.gather(*(
+                    _user(http, base_url, random.Random(rng.random()), client_sink, counters, sessions, questions,
+                          llm_fraction)
+                    for _ in range(users)
+                ))
+                elapsed = time.perf_counter() - started
+                held = len(app[SESSIONS])
+                results.append({
+                    'users': users,
+                    'seconds': round(elapsed, 3),
+                    'requests': counters.requests,
+                    'requests_per_s': round(counters.requests / elapsed, 1),
+                    'sessions_per_s': round(counters.sessions / elapsed, 2),
+                    'busy_retries': counters.busy,
+                    'errors': counters.errors,
+                    'sessions_held': held,
+                    'kb_per_session': round((rss_bytes() - rss_start) / 1024 / max(held, 1), 1),
+                    'stages_ms': _summary(client_sink),
+                    'agent_stages_ms': _summary(agent_sink),
+                })
+    finally:
+        instrumentation.default_tracer.remove_sink(agent_sink)
+        await runner.cleanup()
+        fake.stop_thread()
+    return results
+
+
+def format_level(result):
+    lines = [f"users={result['users']:<5} {result['requests_per_s']:8.1f} req/s {result['sessions_per_s']:7.2f} "
+             f"sessions/s  busy={result['busy_retries']} errors={result['errors']}  "
+             f"{result['kb_per_session']:.1f} KB/session ({result['sessions_held']} held)"]
+    for title, stages in (("client", result['stages_ms']), ("agent", result['agent_stages_ms'])):
+        for stage, row in stages.items():
+            lines.append(f"  {title:6s} {stage:24s} n={row['count']:<6} "
+                         + "  ".join(f"p{q}={row[f'p{q}']:9.2f}ms" for q in PERCENTILES))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ramp simulated users against the server and a fake Ollama")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 50, 100], help="concurrent users per step")
+    parser.add_argument('--sessions', type=int, default=2, help="sessions each user runs per step")
+    parser.add_argument('--questions', type=int, default=4, help="chat questions per session")
+    parser.add_argument('--llm-fraction', type=float, default=0.3, help="share of questions that need the model")
+    parser.add_argument('--tokens-per-second', type=float, default=30.0)
+    parser.add_argument('--first-token-latency', type=float, default=0.2)
+    parser.add_argument('--load-latency', type=float, default=0.0, help="one-off model load")
+    parser.add_argument('--max-llm', type=int, default=4, help="server's concurrent model calls")
+    parser.add_argument('--max-waiting', type=int, default=64, help="server's model call queue")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_load(
+        args.levels, args.sessions, args.questions, args.llm_fraction, args.tokens_per_second,
+        args.first_token_latency, args.load_latency, args.max_llm, args.max_waiting, args.seed,
+    ))
+    for result in results:
+        print(format_level(result))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# monte_carlo.py
+"""Monte Carlo retirement simulator.
+
+Instead of one deterministic projection at a constant expected_return, this
+draws many monthly return paths around the profile's expected_return with a
+volatility set by its risk_tolerance, and reports how often the plan reaches
+the 4%-rule target and the spread of balances at retirement.
+
+Paths are simulated in fixed-size chunks so memory is bounded by the chunk,
+not the path count. Every chunk gets its own child of one SeedSequence, so a
+seeded run gives the same answer whether it runs in-process or on a pool of
+any size.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Annual volatility assumed for each risk_tolerance answer
+VOLATILITY = {
+    'conservative': 0.06,
+    'moderate': 0.12,
+    'aggressive': 0.18,
+}
+PERCENTILES = (5, 25, 50, 75, 95)
+WITHDRAWAL_RATE = 0.04
+
+DEFAULT_PATHS = 100_000
+CHUNK_PATHS = 1024  # ~3.5 MB of path data per chunk at 35 years
+# Below this many path-months a pool costs more than it saves
+_POOL_THRESHOLD = 20_000_000
+
+_pool = None
+
+
+def _get_pool(workers):
+    """Reuse one process pool across calls (e.g. across Streamlit reruns).
+
+    Workers are spawned rather than forked: the app calls this from one of
+    Streamlit's script threads, and a fork copies the other threads' locks in
+    whatever state they happen to be in.
+    """
+    global _pool
+    if _pool is None or _pool._max_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def simulate_balances(current_savings, monthly_savings, months, annual_return, annual_volatility, paths, seed_sequence):
+    """Balances at the end of `months` for `paths` random monthly return paths.
+
+    Monthly returns are normal with mean annual_return/12 and standard
+    deviation annual_volatility/sqrt(12). Contributions are made at the end of
+    each month, as in formulas.fv_annuity, so zero volatility reproduces the
+    closed-form future_value + fv_annuity.
+
+    Paths come in antithetic pairs (z, -z): half the random draws, which is
+    most of the cost, and a lower-variance estimate of the mean.
+    """
+    if months <= 0:
+        return np.full(paths, float(current_savings))
+
+    rng = np.random.default_rng(seed_sequence)
+    growth = np.empty((paths, months))
+    half = (paths + 1) // 2
+    rng.standard_normal(out=growth[:half])
+    np.negative(growth[:paths - half], out=growth[half:])
+    growth *= annual_volatility / np.sqrt(12)
+    growth += 1 + annual_return / 12
+    np.cumprod(growth, axis=1, out=growth)
+
+    # b_T = G_T * (B_0 + pmt * sum_k 1/G_k), with G_k the growth through month k
+    final_growth = growth[:, -1].copy()
+    np.reciprocal(growth, out=growth)
+    contributions = growth.sum(axis=1)
+    return final_growth * (current_savings + monthly_savings * contributions)
+
+
+def _simulate_chunk(args):
+    return simulate_balances(*args)
+
+
+def simulate_profile(profile, paths=DEFAULT_PATHS, seed=None, workers=None, chunk_paths=CHUNK_PATHS):
+    """Simulate a UserProfile and summarise the outcome.
+
+    Returns a dict with the success probability (share of paths that reach
+    retirement_goal / 4% by retirement_age), the requested percentiles of the
+    balance at retirement, and the inputs used. workers=0 runs in-process;
+    by default a shared pool is used only for large runs.
+    """
+    months = int(round((profile.retirement_age - profile.age) * 12))
+    volatility = VOLATILITY.get(profile.risk_tolerance, VOLATILITY['moderate'])
+    needed_amount = profile.retirement_goal / WITHDRAWAL_RATE
+
+    sizes = [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (profile.current_savings, profile.monthly_savings, months,
+         profile.expected_return, volatility, size, child)
+        for size, child in zip(sizes, seeds)
+    ]
+
+    if workers is None:
+        workers = 0 if paths * max(months, 1) < _POOL_THRESHOLD else (os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) == 1:
+        chunks = [_simulate_chunk(task) for task in tasks]
+    else:
+        chunks = list(_get_pool(workers).map(_simulate_chunk, tasks))
+    balances = np.concatenate(chunks)
+
+    return {
+        'paths': paths,
+        'months': months,
+        'volatility': volatility,
+        'needed_amount': needed_amount,
+        'success_probability': float(np.mean(balances >= needed_amount)),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(balances, PERCENTILES).tolist())),
+    }
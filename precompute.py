@@ -0,0 +1,128 @@
+# precompute.py
+"""Speculative answers for the questions the app advertises.
+
+Once the questionnaire is complete the profile is known, and the next click
+is most likely one of SAMPLE_QUESTIONS or QUICK_ACTIONS. Precompute answers
+all of them on a shared thread pool straight away: calculator answers in
+microseconds, and the rest from the response cache or the model (streamed,
+so a cancelled run stops between chunks). AdvisorAgent.chat checks its
+Precompute before doing any work of its own, so those clicks return as soon
+as their answer is ready; an answer still queued behind other work is
+cancelled and answered inline instead, so a click is never slower than with
+no precompute.
+
+Each question is answered by a snapshot of the agent with a frozen copy of
+the profile and an empty conversation, so model answers are what the
+question would get if asked first. A Precompute is only valid for the
+profile it was started with; the agent cancels it when the profile changes.
+Model answers are also stored in the response cache, and are no longer
+served once the conversation has moved on, since they didn't see it.
+Snapshots don't count toward the router, FAQ or response cache statistics.
+"""
+import threading
+
+from response_cache import normalize_message
+
+SAMPLE_QUESTIONS = (
+    "When can I retire?",
+    "How much should I save monthly?",
+    "What if inflation is 4%?",
+    "How long will $500k last in retirement?",
+    "Should I pay off my mortgage early?",
+    "What's the rule of 72?",
+    "Explain the calculations you used",
+)
+# (button label, message sent)
+QUICK_ACTIONS = (
+    ("📈 Retirement Forecast", "Show me my retirement forecast"),
+    ("💰 Savings Analysis", "Analyze my current savings plan"),
+)
+ADVERTISED_QUESTIONS = SAMPLE_QUESTIONS + tuple(message for _, message in QUICK_ACTIONS)
+
+PRECOMPUTE_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor():
+    """Process-wide pool for precompute work, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(PRECOMPUTE_WORKERS, thread_name_prefix='precompute')
+        return _executor
+
+
+def answer_ahead(snapshot, message, cancelled):
+    """(What snapshot.chat(message) would answer, whether it is a model answer), or None if cancelled first"""
+    answer = snapshot._answer_directly(message)
+    if answer is not None:
+        return answer, False
+    cache_key = snapshot._cache_key(message)
+    cached = snapshot.response_cache.get(cache_key, count=False)
+    if cached is not None:
+        return cached, True
+
+    parts = []
+    for chunk in snapshot.llm.stream(snapshot._llm_messages(message)):
+        if cancelled.is_set():
+            return None
+        parts.append(chunk.content)
+    answer = "".join(parts)
+    snapshot.response_cache.put(cache_key, answer)
+    return answer, True
+
+
+class Precompute:
+    """Answers to `questions` for one agent's current profile, computed in the background"""
+
+    def __init__(self, agent, questions=ADVERTISED_QUESTIONS, executor=None):
+        executor = executor if executor is not None else shared_executor()
+        self.profile_key = agent.profile.to_bytes()
+        self.context = agent.memory.digest()
+        self._cancelled = threading.Event()
+        # One snapshot per question, so no two threads share an agent
+        self._futures = {
+            normalize_message(message): executor.submit(answer_ahead, agent._snapshot(), message, self._cancelled)
+            for message in questions
+        }
+
+    def valid_for(self, profile) -> bool:
+        return not self._cancelled.is_set() and profile.to_bytes() == self.profile_key
+
+    def get(self, message, wait=True, context=None):
+        """The precomputed answer, or None if there isn't one (yet, when wait is False).
+
+        With wait, a running answer is waited for, but one still queued
+        (behind other sessions' work on the shared pool) is cancelled and
+        None returned, so the caller answers inline instead of waiting.
+        Model answers are only returned while `context` (the conversation's
+        memory digest, if given) is still the one they were started with.
+        """
+        future = self._futures.get(normalize_message(message))
+        if future is None or self._cancelled.is_set():
+            return None
+        if not future.done() and (not wait or future.cancel()):
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            return None  # let chat try again and report the error itself
+        if result is None:
+            return None
+        answer, uses_model = result
+        if uses_model and context is not None and context != self.context:
+            return None
+        return answer
+
+    def ready(self) -> int:
+        """How many answers have finished"""
+        return sum(future.done() for future in self._futures.values())
+
+    def cancel(self):
+        self._cancelled.set()
+        for future in self._futures.values():
+            future.cancel()
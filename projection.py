@@ -0,0 +1,139 @@
+# projection.py
+"""Month-by-month projection schedules.
+
+_generate_summary only gives the end balance from the closed forms. A
+schedule shows the whole path, and can model contributions that grow with
+income each year and the effect of inflation (UserProfile.inflation_rate).
+
+Two modes:
+
+- iter_schedule() is a lazy generator that yields one ScheduleRow per month.
+  Its memory use is constant, so it suits long horizons and streaming export
+  (see write_csv).
+- schedule_arrays() builds whole schedules for many profiles at once as
+  compact columnar arrays (float32 by default). It works through profiles in
+  blocks, so float64 temporaries stay bounded by the block size. At 70 years
+  the 'balance' column for 100k profiles is 100k x 840 x 4 bytes = ~336 MB,
+  or ~28 MB with every=12 (yearly rows).
+
+With zero income growth and zero inflation both modes agree with
+formulas.future_value + formulas.fv_annuity.
+"""
+import csv
+from typing import NamedTuple
+
+import numpy as np
+
+COLUMNS = ('balance', 'contributions', 'real_balance')
+
+
+class ScheduleRow(NamedTuple):
+    month: int
+    age: float
+    contribution: float
+    growth: float
+    balance: float
+    real_balance: float
+
+
+def _months(profile, years):
+    return int(round((profile.retirement_age - profile.age if years is None else years) * 12))
+
+
+def iter_schedule(profile, years=None, income_growth=0.0, inflation_rate=None):
+    """Yield one row per month from now until retirement (or for `years`).
+
+    Contributions are made at the end of each month, as in fv_annuity, and
+    step up by income_growth at the start of each year. real_balance is the
+    balance in today's dollars.
+    """
+    inflation_rate = profile.inflation_rate if inflation_rate is None else inflation_rate
+    monthly_rate = profile.expected_return / 12
+    balance = float(profile.current_savings)
+    contribution = float(profile.monthly_savings)
+
+    for month in range(1, _months(profile, years) + 1):
+        if month > 1 and (month - 1) % 12 == 0:
+            contribution *= 1 + income_growth
+        growth = balance * monthly_rate
+        balance = balance + growth + contribution
+        yield ScheduleRow(
+            month=month,
+            age=profile.age + month / 12,
+            contribution=contribution,
+            growth=growth,
+            balance=balance,
+            real_balance=balance / (1 + inflation_rate) ** (month / 12),
+        )
+
+
+def write_csv(rows, file):
+    """Stream schedule rows (e.g. from iter_schedule) to an open text file"""
+    writer = csv.writer(file)
+    writer.writerow(ScheduleRow._fields)
+    writer.writerows(rows)
+
+
+def _record_months(months, every):
+    records = np.arange(every, months + 1, every)
+    if months and (records.size == 0 or records[-1] != months):
+        records = np.append(records, months)
+    return records
+
+
+def schedule_arrays(current_savings, monthly_savings, expected_return, months, income_growth=0.0,
+                    inflation_rate=0.0, every=1, columns=('balance',), dtype=np.float32, block_size=4096):
+    """Schedules for many profiles as columnar arrays.
+
+    Profile inputs are scalars or 1-D arrays of equal length. Returns a dict
+    with 'month' (the month number of each record, every `every` months and
+    always including the last) and one (profiles x records) array per
+    requested column from COLUMNS.
+    """
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown schedule columns: {', '.join(sorted(unknown))}")
+
+    inputs = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in
+                                   (current_savings, monthly_savings, expected_return, income_growth, inflation_rate)))
+    n_profiles = inputs[0].shape[0]
+    months = max(months, 0)  # already retired: no records, as with iter_schedule
+    month = np.arange(1, months + 1, dtype=np.float64)
+    records = _record_months(months, every)
+    record_index = records - 1
+    result = {'month': records.astype(np.int32)}
+    for name in columns:
+        result[name] = np.empty((n_profiles, records.size), dtype=dtype)
+    if months == 0:
+        return result
+
+    # Contribution multiplier steps up once a year: (1 + g)^floor((m - 1) / 12)
+    year_index = np.floor((month - 1) / 12)
+
+    for start in range(0, n_profiles, block_size):
+        block = slice(start, start + block_size)
+        savings0, pmt, annual_return, growth, inflation = (x[block, None] for x in inputs)
+
+        contributions = pmt * (1 + growth) ** year_index
+        # b_m = G^m * (B_0 + sum_{k<=m} c_k / G^k) with G = 1 + r
+        discount = (1 + annual_return / 12) ** -month
+        balance = np.cumsum(contributions * discount, axis=1)
+        balance += savings0
+        balance /= discount
+
+        if 'balance' in columns:
+            result['balance'][block] = balance[:, record_index]
+        if 'contributions' in columns:
+            result['contributions'][block] = np.cumsum(contributions, axis=1)[:, record_index]
+        if 'real_balance' in columns:
+            deflator = (1 + inflation) ** (records / 12)
+            result['real_balance'][block] = balance[:, record_index] / deflator
+    return result
+
+
+def profile_schedule(profile, years=None, income_growth=0.0, inflation_rate=None, **kwargs):
+    """schedule_arrays for one UserProfile, with 1-D columns"""
+    inflation_rate = profile.inflation_rate if inflation_rate is None else inflation_rate
+    result = schedule_arrays(profile.current_savings, profile.monthly_savings, profile.expected_return,
+                             _months(profile, years), income_growth, inflation_rate, **kwargs)
+    return {name: values if name == 'month' else values[0] for name, values in result.items()}
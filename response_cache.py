@@ -0,0 +1,147 @@
+# response_cache.py
+"""Cache for LLM answers in AdvisorAgent.chat.
+
+Answers are keyed on the normalized question plus a fingerprint of the
+profile they were generated for, so the same profile asking the same thing
+again (e.g. one of the sample questions in app.py) skips the model call.
+Entries live in an in-memory LRU with a TTL and, optionally, in a SQLite file
+so they survive restarts.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation"""
+    return _WHITESPACE.sub(" ", message.lower()).strip(" \t\n?!.,;:")
+
+
+def profile_fingerprint(profile) -> str:
+    """Stable hash of the profile fields the answer depends on"""
+    canonical = json.dumps(profile.to_dict(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, path=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (created, response)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            import sqlite3  # only file-backed caches need it
+
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(message: str, profile, context: str = "") -> str:
+        """Key for a question asked with this profile and, optionally, conversation context"""
+        raw = normalize_message(message) + "\0" + profile_fingerprint(profile)
+        if context:
+            raw += "\0" + context
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _expired(self, created):
+        return self._clock() - created > self.ttl_seconds
+
+    def get(self, key: str, count: bool = True):
+        """Return the cached response for key, or None; count=False leaves hits/misses alone"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT created, response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = row
+                    self._remember(key, entry)
+
+            if entry is not None and self._expired(entry[0]):
+                self._forget(key)
+                entry = None
+
+            if entry is None:
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+            return entry[1]
+
+    def put(self, key: str, response: str):
+        with self._lock:
+            entry = (self._clock(), response)
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                    (key, response, entry[0]),
+                )
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            # Evicted from memory only; the disk copy stays until it expires
+            self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> ResponseCache:
+    """Process-wide cache used by AdvisorAgent by default.
+
+    Set ADVISOR_CACHE_PATH to a SQLite file to keep answers across restarts.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(path=os.environ.get("ADVISOR_CACHE_PATH"))
+        return _shared_cache
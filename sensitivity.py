@@ -0,0 +1,151 @@
+# sensitivity.py
+"""What-if sensitivity grids for a retirement plan.
+
+Computes the surplus/deficit (total at retirement minus retirement_goal / 4%)
+over a grid of expected return x monthly savings x retirement age in one
+broadcast call to formulas_np.future_value and fv_annuity, instead of one
+round trip per "what if". Grids are cached per profile fingerprint so UI
+controls can slice an existing grid rather than recompute it.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import formulas
+import formulas_np
+from response_cache import profile_fingerprint
+
+WITHDRAWAL_RATE = 0.04
+
+
+class SensitivityGrid:
+    """Surplus/deficit surface; surplus[i, j, k] is for returns[i], savings[j], ages[k]"""
+
+    def __init__(self, returns, savings, ages, surplus):
+        self.returns = returns
+        self.savings = savings
+        self.ages = ages
+        self.surplus = surplus
+
+    def at_age(self, retirement_age):
+        """2-D (returns x savings) slice for the grid age closest to retirement_age"""
+        k = int(np.abs(self.ages - retirement_age).argmin())
+        return self.ages[k], self.surplus[:, :, k]
+
+
+def default_axes(profile, n_returns=50, n_savings=50, n_ages=30):
+    """Axes centred on the profile: 0-12% returns, 0-3x savings, +/-15 years of retirement age"""
+    returns = np.linspace(0.0, 0.12, n_returns)
+    savings = np.linspace(0.0, max(3 * profile.monthly_savings, 1000.0), n_savings)
+    first_age = max(profile.age + 1, profile.retirement_age - n_ages // 2)
+    ages = np.arange(first_age, first_age + n_ages, dtype=np.float64)
+    return returns, savings, ages
+
+
+def surplus_grid(profile, returns, savings, ages):
+    """Surplus/deficit for every combination of the three axes, in one pass"""
+    monthly_rate = np.asarray(returns, dtype=np.float64)[:, None, None] / 12
+    monthly_savings = np.asarray(savings, dtype=np.float64)[None, :, None]
+    months = (np.asarray(ages, dtype=np.float64) - profile.age)[None, None, :] * 12
+
+    total = formulas_np.future_value(profile.current_savings, monthly_rate, months)
+    total = total + formulas_np.fv_annuity(monthly_savings, monthly_rate, months)
+    return total - profile.retirement_goal / WITHDRAWAL_RATE
+
+
+class SensitivityEngine:
+    """LRU of grids keyed by profile fingerprint and grid shape"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def grid(self, profile, n_returns=50, n_savings=50, n_ages=30) -> SensitivityGrid:
+        key = (profile_fingerprint(profile), n_returns, n_savings, n_ages)
+        with self._lock:
+            cached = self._grids.get(key)
+            if cached is not None:
+                self._grids.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        axes = default_axes(profile, n_returns, n_savings, n_ages)
+        result = SensitivityGrid(*axes, surplus_grid(profile, *axes))
+        with self._lock:
+            self._grids[key] = result
+            while len(self._grids) > self.max_entries:
+                self._grids.popitem(last=False)
+        return result
+
+
+def _surplus(profile, annual_return, monthly_savings, retirement_age):
+    months = (retirement_age - profile.age) * 12
+    monthly_rate = annual_return / 12
+    total = (formulas.future_value(profile.current_savings, monthly_rate, months)
+             + formulas.fv_annuity(monthly_savings, monthly_rate, months))
+    return total - profile.retirement_goal / WITHDRAWAL_RATE
+
+
+def smallest_change(profile, max_return=0.25, tolerance=1e-6):
+    """Smallest change to a single input that puts the plan on track.
+
+    Returns {'monthly_savings': ..., 'retirement_age': ..., 'expected_return': ...,
+    'best': axis}, where each axis entry is {'value', 'change', 'relative_change'}
+    (or None if no value on that axis alone works) and 'best' is the axis with
+    the smallest relative change. Plans already on track need no change.
+    """
+    needed_amount = profile.retirement_goal / WITHDRAWAL_RATE
+    current = {
+        'monthly_savings': profile.monthly_savings,
+        'retirement_age': profile.retirement_age,
+        'expected_return': profile.expected_return,
+    }
+    if _surplus(profile, profile.expected_return, profile.monthly_savings, profile.retirement_age) >= 0:
+        options = {axis: {'value': value, 'change': 0.0, 'relative_change': 0.0} for axis, value in current.items()}
+        options['best'] = 'monthly_savings'
+        return options
+
+    monthly_rate = profile.expected_return / 12
+    months = (profile.retirement_age - profile.age) * 12
+    shortfall = needed_amount - formulas.future_value(profile.current_savings, monthly_rate, months)
+    required = {
+        'monthly_savings': shortfall / formulas.fv_annuity(1.0, monthly_rate, months) if months > 0 else None,
+        'retirement_age': formulas.calculate_retirement_age(
+            profile.age, profile.current_savings, profile.monthly_savings, needed_amount, profile.expected_return
+        ),
+        'expected_return': None,
+    }
+
+    # Surplus rises monotonically with the return, so bisect on it
+    if _surplus(profile, max_return, profile.monthly_savings, profile.retirement_age) >= 0:
+        low, high = profile.expected_return, max_return
+        while high - low > tolerance:
+            mid = (low + high) / 2
+            if _surplus(profile, mid, profile.monthly_savings, profile.retirement_age) >= 0:
+                high = mid
+            else:
+                low = mid
+        required['expected_return'] = high
+
+    options = {}
+    for axis, value in required.items():
+        if value is None:
+            options[axis] = None
+            continue
+        change = value - current[axis]
+        options[axis] = {
+            'value': value,
+            'change': change,
+            'relative_change': abs(change) / abs(current[axis]) if current[axis] else float('inf'),
+        }
+    feasible = [axis for axis in required if options[axis] is not None]
+    options['best'] = min(feasible, key=lambda axis: options[axis]['relative_change']) if feasible else None
+    return options
+
+
+default_engine = SensitivityEngine()
@@ -0,0 +1,352 @@
+# server.py
+"""HTTP entry point that hosts many advisor sessions on one event loop.
+
+Each session has its own AdvisorAgent and a lock, so requests for one
+session run in order while different sessions run concurrently. Profiles,
+questionnaire progress and chat history are written to a SessionStore;
+only recently used sessions keep an agent in memory, and the rest are
+loaded back from the store on their next request (pass --session-db to keep
+them across restarts). Model calls
+go through a shared LLMLimiter: at most `max_concurrent` run at once, at most
+`max_waiting` queue behind them, and anything beyond that gets 503 with a
+Retry-After header instead of piling up.
+
+    python server.py --port 8080 --max-llm 4 --max-waiting 32
+
+Endpoints (JSON in, JSON out):
+    POST /sessions                      -> {session_id, question}
+    POST /sessions/{id}/answer {answer} -> {feedback, question, is_complete}
+    POST /sessions/{id}/chat {message}  -> {response}   (?stream=1 for chunked text)
+    GET  /sessions/{id}                 -> {profile, question_index, is_complete}
+    GET  /sessions/{id}/history         -> {history: [[sender, text], ...]}  (?limit=N for the latest N)
+    DELETE /sessions/{id}
+    GET  /health                        -> limiter and session counts
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+import llm_pool
+from advisor_agent import AdvisorAgent
+from session_store import SessionStore
+
+
+class LLMBusyError(Exception):
+    """Raised when the LLM queue is full"""
+
+
+class LLMLimiter:
+    """Bounded concurrency for model calls, with a bounded wait queue"""
+
+    def __init__(self, max_concurrent=4, max_waiting=16):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise LLMBusyError("The advisor is busy, please retry shortly.")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+        }
+
+
+class Session:
+    def __init__(self, agent):
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.holders = 0    # requests holding or waiting for the lock
+        self.last_seen = time.monotonic()
+
+    @asynccontextmanager
+    async def hold(self):
+        """The session's lock for one request. A held session is never evicted,
+        so a later request can't restore a second agent for it meanwhile."""
+        self.holders += 1
+        try:
+            async with self.lock:
+                yield
+        finally:
+            self.holders -= 1
+
+
+def _chat_turns(history):
+    """(user, advisor) pairs of the chat messages in a stored history.
+
+    Chat requests record a message and its answer; questionnaire answers
+    record the answer, the feedback and the next question, so they are the
+    groups of three.
+    """
+    group = []
+    for sender, text in history + [("You", None)]:
+        if sender == "You" and group:
+            if len(group) == 2:
+                yield group[0], group[1]
+            group = []
+        group.append(text)
+
+
+class SessionManager:
+    """Sessions backed by a SessionStore. Agents stay in memory for the most
+    recently used max_sessions, and are dropped when idle for longer than
+    idle_timeout seconds (unless a request holds them); dropped sessions are
+    restored from the store, conversation memory included."""
+
+    def __init__(self, agent_factory, max_sessions=10_000, idle_timeout=3600, store=None):
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.store = store if store is not None else SessionStore()
+        self._sessions = OrderedDict()
+
+    def create(self):
+        session_id = uuid.uuid4().hex
+        session = self._sessions[session_id] = Session(self.agent_factory())
+        self.persist(session_id, session)
+        self._evict()
+        return session_id, session
+
+    def get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._restore(session_id)
+        session.last_seen = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _restore(self, session_id):
+        stored = self.store.load(session_id)
+        if stored is None:
+            raise web.HTTPNotFound(text='{"error": "unknown session"}', content_type='application/json')
+        agent = self.agent_factory()
+        agent.profile, agent.question_index = stored
+        if agent.profile.is_complete:
+            for user, advisor in _chat_turns(self.store.history(session_id)):
+                agent.memory.add_turn(user, advisor)
+        session = self._sessions[session_id] = Session(agent)
+        self._evict()
+        return session
+
+    def persist(self, session_id, session):
+        self.store.save(session_id, session.agent.profile, session.agent.question_index)
+
+    def record(self, session_id, sender, text):
+        self.store.append_message(session_id, sender, text)
+
+    def delete(self, session_id):
+        self._sessions.pop(session_id, None)
+        self.store.delete(session_id)
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for _ in range(len(self._sessions) - 1):  # never the session just created or restored
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and session.last_seen >= cutoff:
+                break
+            if session.holders:
+                self._sessions.move_to_end(session_id)  # in use, so not the least recently used
+            else:
+                del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+SESSIONS = web.AppKey('sessions', SessionManager)
+LIMITER = web.AppKey('limiter', LLMLimiter)
+
+
+async def _json_field(request, name):
+    try:
+        body = await request.json()
+        return str(body[name])
+    except (ValueError, KeyError, TypeError):
+        raise web.HTTPBadRequest(text=f'{{"error": "expected JSON body with \\"{name}\\""}}',
+                                 content_type='application/json')
+
+
+def _busy(error):
+    return web.json_response({'error': str(error)}, status=503, headers={'Retry-After': '1'})
+
+
+async def create_session(request):
+    session_id, session = request.app[SESSIONS].create()
+    async with session.hold():
+        question, _ = await session.agent.aask_next_question()
+    return web.json_response({'session_id': session_id, 'question': question}, status=201)
+
+
+async def get_session(request):
+    session = request.app[SESSIONS].get(request.match_info['session_id'])
+    agent = session.agent
+    return web.json_response({
+        'profile': agent.profile.to_dict(),
+        'question_index': agent.question_index,
+        'is_complete': agent.profile.is_complete,
+    })
+
+
+async def get_history(request):
+    sessions = request.app[SESSIONS]
+    session_id = request.match_info['session_id']
+    sessions.get(session_id)
+    try:
+        limit = int(request.query['limit']) if 'limit' in request.query else None
+    except ValueError:
+        raise web.HTTPBadRequest(text='{"error": "limit must be an integer"}', content_type='application/json')
+    return web.json_response({'history': sessions.store.history(session_id, limit)})
+
+
+async def delete_session(request):
+    request.app[SESSIONS].delete(request.match_info['session_id'])
+    return web.Response(status=204)
+
+
+async def answer(request):
+    sessions = request.app[SESSIONS]
+    session_id = request.match_info['session_id']
+    text = await _json_field(request, 'answer')
+    session = sessions.get(session_id)
+    async with session.hold():
+        feedback = await session.agent.aprocess_answer(text)
+        question, is_complete = await session.agent.aask_next_question()
+        sessions.persist(session_id, session)
+        for sender, message in (("You", text), ("Advisor", feedback), ("Advisor", question)):
+            sessions.record(session_id, sender, message)
+    return web.json_response({'feedback': feedback, 'question': question, 'is_complete': is_complete})
+
+
+async def chat(request):
+    sessions = request.app[SESSIONS]
+    session_id = request.match_info['session_id']
+    message = await _json_field(request, 'message')
+    limiter = request.app[LIMITER]
+
+    session = sessions.get(session_id)
+    async with session.hold():
+        if request.query.get('stream') in ('1', 'true'):
+            return await _chat_stream(request, sessions, session_id, session.agent, message, limiter)
+        try:
+            response = await session.agent.achat(message, llm_slot=limiter.slot)
+        except LLMBusyError as e:
+            return _busy(e)
+        sessions.record(session_id, "You", message)
+        sessions.record(session_id, "Advisor", response)
+    return web.json_response({'response': response})
+
+
+async def _chat_stream(request, sessions, session_id, agent, message, limiter):
+    tokens = agent.achat_stream(message, llm_slot=limiter.slot)
+    try:
+        first = await tokens.__anext__()
+    except LLMBusyError as e:
+        return _busy(e)
+    except StopAsyncIteration:
+        first = ''
+
+    response = web.StreamResponse(headers={'Content-Type': 'text/plain; charset=utf-8'})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    await response.write(first.encode())
+    parts = [first]
+    async for token in tokens:
+        parts.append(token)
+        await response.write(token.encode())
+    await response.write_eof()
+    sessions.record(session_id, "You", message)
+    sessions.record(session_id, "Advisor", "".join(parts))
+    return response
+
+
+async def health(request):
+    return web.json_response({
+        'sessions': len(request.app[SESSIONS]),
+        'llm': request.app[LIMITER].stats(),
+    })
+
+
+async def _store_flusher(app):
+    """Commit writes still queued once traffic goes quiet, and close the store on shutdown"""
+    store = app[SESSIONS].store
+
+    async def flush_periodically():
+        while True:
+            await asyncio.sleep(store.flush_interval)
+            store.flush()
+
+    task = asyncio.create_task(flush_periodically())
+    yield
+    task.cancel()
+    store.close()
+
+
+def create_app(agent_factory=None, max_concurrent_llm=4, max_waiting=16, max_sessions=10_000, idle_timeout=3600,
+               store=None):
+    """Build the aiohttp application. agent_factory() must return a new AdvisorAgent."""
+    app = web.Application()
+    app[SESSIONS] = SessionManager(agent_factory or (lambda: AdvisorAgent(openai_api_key=None)),
+                                   max_sessions=max_sessions, idle_timeout=idle_timeout, store=store)
+    app[LIMITER] = LLMLimiter(max_concurrent_llm, max_waiting)
+    app.cleanup_ctx.append(_store_flusher)
+    app.router.add_post('/sessions', create_session)
+    app.router.add_get('/sessions/{session_id}', get_session)
+    app.router.add_get('/sessions/{session_id}/history', get_history)
+    app.router.add_delete('/sessions/{session_id}', delete_session)
+    app.router.add_post('/sessions/{session_id}/answer', answer)
+    app.router.add_post('/sessions/{session_id}/chat', chat)
+    app.router.add_get('/health', health)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the financial advisor over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-llm', type=int, default=4, help="concurrent model calls")
+    parser.add_argument('--max-waiting', type=int, default=16, help="model calls allowed to queue")
+    parser.add_argument('--ollama-url', default=None, help="Ollama base URL (default: ChatOllama's)")
+    parser.add_argument('--session-db', default=None, help="SQLite file for sessions (default: in memory)")
+    parser.add_argument('--max-sessions', type=int, default=10_000, help="sessions kept in memory")
+    parser.add_argument('--no-warmup', action='store_true', help="don't preload the model at startup")
+    args = parser.parse_args(argv)
+
+    agent_factory = None
+    if args.ollama_url:
+        agent_factory = lambda: AdvisorAgent(openai_api_key=None, llm=llm_pool.shared_llm(base_url=args.ollama_url))
+    if not args.no_warmup:
+        llm_pool.start_warmup(base_url=args.ollama_url)
+
+    store = SessionStore(args.session_db) if args.session_db else None
+    app = create_app(agent_factory, args.max_llm, args.max_waiting, max_sessions=args.max_sessions, store=store)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
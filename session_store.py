@@ -0,0 +1,163 @@
+# session_store.py
+"""SQLite store for resumable advisor sessions.
+
+A session is its profile (stored with UserProfile.to_bytes), its
+question_index and its chat history. Writes are buffered and committed in
+one transaction once `max_pending` have queued up or `flush_interval`
+seconds have passed since the last commit, so a busy server does one fsync
+per batch rather than one per message. Reads are lazy: load() fetches a
+single session when it is first needed again, and history() reads messages
+only when asked, so the process holds just the sessions in use.
+
+    store = SessionStore("sessions.sqlite")
+    store.save(session_id, agent.profile, agent.question_index)
+    store.append_message(session_id, "You", "When can I retire?")
+    profile, question_index = store.load(session_id)
+
+Set ADVISOR_SESSION_PATH to choose the file used by shared_store().
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from user_profile import UserProfile
+
+DEFAULT_SESSION_PATH = "sessions.sqlite"
+
+
+class SessionStore:
+    def __init__(self, path=":memory:", max_pending=256, flush_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._pending_sessions = {}
+        self._pending_messages = []
+        self._last_flush = clock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY, profile BLOB NOT NULL, question_index INTEGER NOT NULL, updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY, session_id TEXT NOT NULL, sender TEXT NOT NULL, text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+        """)
+        self._db.commit()
+
+    def save(self, session_id, profile, question_index):
+        """Queue the session's profile and questionnaire position (the latest save wins)"""
+        with self._lock:
+            self._pending_sessions[session_id] = (profile.to_bytes(), question_index, time.time())
+            self._maybe_flush()
+
+    def append_message(self, session_id, sender, text):
+        with self._lock:
+            self._pending_messages.append((session_id, sender, text))
+            self._maybe_flush()
+
+    def load(self, session_id):
+        """(UserProfile, question_index) for a stored session, or None"""
+        with self._lock:
+            pending = self._pending_sessions.get(session_id)
+            if pending is not None:
+                row = pending[:2]
+            else:
+                row = self._db.execute(
+                    "SELECT profile, question_index FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+        if row is None:
+            return None
+        return UserProfile.from_bytes(row[0]), row[1]
+
+    def history(self, session_id, limit=None, offset=0):
+        """Chat history as (sender, text) pairs, oldest first.
+
+        `limit` keeps only the latest messages, after skipping the newest
+        `offset`, so older pages can be read on demand.
+        """
+        with self._lock:
+            self.flush()
+            if limit is None and not offset:
+                rows = self._db.execute(
+                    "SELECT sender, text FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT sender, text FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (session_id, -1 if limit is None else limit, offset),
+                ).fetchall()[::-1]
+        return [tuple(row) for row in rows]
+
+    def message_count(self, session_id) -> int:
+        with self._lock:
+            self.flush()
+            return self._db.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def delete(self, session_id):
+        with self._lock:
+            self.flush()
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def __contains__(self, session_id):
+        return self.load(session_id) is not None
+
+    def __len__(self):
+        with self._lock:
+            self.flush()
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _maybe_flush(self):
+        pending = len(self._pending_sessions) + len(self._pending_messages)
+        if pending >= self.max_pending or self._clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write everything queued in one transaction"""
+        with self._lock:
+            self._last_flush = self._clock()
+            if not self._pending_sessions and not self._pending_messages:
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sessions (id, profile, question_index, updated) VALUES (?, ?, ?, ?)",
+                    [(session_id, *row) for session_id, row in self._pending_sessions.items()],
+                )
+                self._db.executemany(
+                    "INSERT INTO messages (session_id, sender, text) VALUES (?, ?, ?)", self._pending_messages
+                )
+            self._pending_sessions.clear()
+            self._pending_messages.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self.flush()
+                self._db.close()
+                self._db = None
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def shared_store() -> SessionStore:
+    """Process-wide store, flushed at exit.
+
+    Set ADVISOR_SESSION_PATH to a SQLite file (default sessions.sqlite).
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = SessionStore(os.environ.get("ADVISOR_SESSION_PATH", DEFAULT_SESSION_PATH))
+            atexit.register(_shared_store.close)
+        return _shared_store
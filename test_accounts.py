@@ -0,0 +1,74 @@
+import math
+import types
+
+import numpy as np
+import accounts
+import formulas
+from accounts import AccountType
+
+
+class Profile:
+    age, retirement_age, current_savings, monthly_savings = 40, 65, 0, 2_500
+    expected_return, retirement_goal = 0.06, 160_000
+
+
+def _simulate(profile, balances, income_tax=0.22, gains_tax=0.15):
+    """Month-by-month reference for the default accounts"""
+    rates = {a.name: (profile.expected_return - a.tax_drag) / 12 for a in accounts.ACCOUNTS}
+    monthly = dict(zip((a.name for a in accounts.ACCOUNTS),
+                       accounts.allocate_contributions(profile.monthly_savings)))
+    basis = balances['taxable']
+    for _ in range((profile.retirement_age - profile.age) * 12):
+        for name in balances:
+            balances[name] = balances[name] * (1 + rates[name]) + monthly[name]
+        basis += monthly['taxable']
+    tax = {'pretax': income_tax, 'roth': 0.0, 'taxable': gains_tax * (1 - basis / balances['taxable'])}
+
+    months = 0
+    while months < 1200 and any(balance > 0 for balance in balances.values()):
+        for name in balances:
+            balances[name] *= 1 + rates[name]
+        need = profile.retirement_goal / 12
+        for name in accounts.WITHDRAWAL_ORDER:
+            gross = min(balances[name], need / (1 - tax[name]))
+            balances[name] -= gross
+            need -= gross * (1 - tax[name])
+        months += 1
+    return months / 12
+
+
+def test_single_untaxed_account_matches_summary_and_longevity():
+    plain = (AccountType('savings', math.inf, 0.0, 'none'),)
+    result = accounts.project_accounts(30, 65, [[10_000]], 500, 0.07, 84_000, accounts=plain,
+                                       withdrawal_order=('savings',))
+    total = formulas.future_value(10_000, 0.07 / 12, 420) + formulas.fv_annuity(500, 0.07 / 12, 420)
+    np.testing.assert_allclose(result['after_tax_at_retirement'], total, rtol=1e-12)
+    np.testing.assert_allclose(result['surplus_deficit'], total - 84_000 / 0.04, rtol=1e-12)
+    np.testing.assert_allclose(result['years_lasting'], formulas.calculate_savings_longevity(total, 7_000, 0.07),
+                               rtol=1e-12)
+
+
+def test_limits_taxes_and_withdrawal_order_match_monthly_simulation():
+    np.testing.assert_allclose(accounts.allocate_contributions([1_000, 2_500, 4_000]) * 12,
+                               [[12_000, 0, 0], [23_000, 7_000, 0], [23_000, 7_000, 18_000]])
+    balances = {'pretax': 150_000, 'roth': 40_000, 'taxable': 60_000}
+    figures = accounts.profile_accounts(Profile, balances)
+    assert figures['contributions'] == {'pretax': 23_000 / 12, 'roth': 7_000 / 12, 'taxable': 0.0}
+    assert figures['after_tax_at_retirement'] < sum(figures['balance_at_retirement'].values())
+    assert math.isfinite(figures['years_lasting'])
+    assert abs(figures['years_lasting'] - _simulate(Profile, dict(balances))) < 3 / 12
+
+
+def test_book_is_projected_in_one_call():
+    rng = np.random.default_rng(0)
+    n = 200
+    ages, goals = rng.integers(25, 60, n), rng.uniform(30_000, 150_000, n)
+    monthly, balances = rng.uniform(0, 5_000, n), rng.uniform(0, 300_000, (n, 3))
+    book = accounts.project_accounts(ages, 65, balances, monthly, 0.06, goals)
+    assert book['balance_at_retirement'].shape == (n, 3)
+    for i in range(0, n, 37):
+        profile = types.SimpleNamespace(age=ages[i], retirement_age=65, monthly_savings=monthly[i],
+                                        expected_return=0.06, retirement_goal=goals[i])
+        one = accounts.profile_accounts(profile, dict(zip(('pretax', 'roth', 'taxable'), balances[i])))
+        np.testing.assert_allclose(book['years_lasting'][i], one['years_lasting'], rtol=1e-12)
+        np.testing.assert_allclose(book['after_tax_at_retirement'][i], one['after_tax_at_retirement'], rtol=1e-12)
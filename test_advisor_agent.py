@@ -0,0 +1,110 @@
+import concurrent.futures
+import itertools
+import threading
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from advisor_agent import AdvisorAgent
+from response_cache import ResponseCache
+
+ANSWERS = ["30", "80000", "10000", "500", "65", "moderate", "60000"]
+
+
+def _agent(replies=("Pay down high-interest debt first.",)):
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache())
+    agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content=r) for r in replies]))
+    for answer in ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+    return agent
+
+
+def test_chat_stream_yields_tokens_and_caches_full_text():
+    agent = _agent()
+    tokens = list(agent.chat_stream("Should I pay off my mortgage early?"))
+
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Pay down high-interest debt first."
+
+    # A fresh conversation with the same profile is served from the cache
+    other = _agent(replies=())
+    other.response_cache = agent.response_cache
+    assert other.chat("should i pay off my mortgage early") == "Pay down high-interest debt first."
+    assert agent.response_cache.stats()['hits'] == 1
+
+
+def test_chat_stream_calculator_answers_are_immediate():
+    agent = _agent(replies=())
+    tokens = list(agent.chat_stream("What's the rule of 72?"))
+    assert tokens == [agent.chat("What's the rule of 72?")]
+    assert "double" in tokens[0]
+
+
+def test_sample_questions_use_numbers_from_the_question():
+    agent = _agent(replies=())
+    assert agent.chat("How long will $500k last in retirement?").startswith("$500,000.00 withdrawn")
+    assert agent.chat("What if inflation is 4%?").startswith("At 4.0% inflation")
+
+
+def test_goal_seek_questions_are_answered_without_the_model():
+    agent = _agent(replies=())
+    assert "annual return" in agent.chat("What return do I need to retire at 60?")
+    assert agent.chat("How much can I safely withdraw from $1M over 30 years at 5%?").startswith(
+        "You could withdraw up to $")
+    assert "/year in today's dollars" in agent.chat("What annual spend supports retiring at 60?")
+    assert "beyond the age-95 planning horizon" in agent.chat("What annual spend supports retiring at 100?")
+    assert agent.chat("What if inflation is -2%?").startswith("At -2.0% inflation")
+    assert agent.chat("When can I retire at 0% return?") == (
+        "Based on saving $500.00 per month at a 0.0% return toward $1,500,000.00, you wouldn't reach "
+        "$1,500,000.00 before age 95, so that goal isn't reachable without saving more.")
+
+
+def test_withdrawals_matching_the_interest_last_indefinitely():
+    agent = _agent(replies=())
+    # 7% of the savings a year is exactly the interest at the profile's 7% return
+    assert agent.chat("How long will $1M last if I withdraw 7% a year?") == (
+        "$1,000,000.00 withdrawn at $5,833.33 per month with a 7.0% return should last indefinitely "
+        "with proper management!")
+    assert agent.chat("How long will $1M last if I withdraw 10% a year?").endswith("years in retirement.")
+    # A calculation error is left to the model rather than formatted as a number
+    agent._calculate_with_tools = lambda *args, **kwargs: "Calculation error: float division by zero"
+    agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content=r) for r in ("It depends.", "Later.")]))
+    assert agent.chat("How long will $1M last if I withdraw 5% a year?") == "It depends."
+    assert agent.chat("When can I retire with $3M?") == "Later."
+
+
+def test_advertised_questions_are_answered_ahead_and_dropped_when_the_profile_changes():
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache(), precompute=True)
+    agent.llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content="Pay down high-interest debt first.")))
+    for answer in ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+    precompute = agent._precompute
+    assert [precompute.get(q) for q in ("When can I retire?", "should i pay off my mortgage early")] == [
+        "Based on your current savings plan, you can retire at age 70.2",
+        "Pay down high-interest debt first.",
+    ]
+
+    concurrent.futures.wait(precompute._futures.values())
+    agent.llm = GenericFakeChatModel(messages=iter(()))  # the model is not asked again
+    assert agent.chat("Should I pay off my mortgage early?") == "Pay down high-interest debt first."
+    # Model answers didn't see that turn, so they are dropped; calculator answers still apply
+    assert agent._precomputed_answer("Show me my retirement forecast") is None
+    assert list(agent.chat_stream("When can I retire?")) == [
+        "Based on your current savings plan, you can retire at age 70.2"]
+    # Speculative work doesn't count toward the cache statistics (the mortgage answer came from it)
+    assert agent.response_cache.stats()['hits'] + agent.response_cache.stats()['misses'] == 0
+
+    agent.profile.monthly_savings = 2_000
+    assert agent.chat("When can I retire?") == "Based on your current savings plan, you can retire at age 53.7"
+    assert agent._precompute is None and precompute.get("When can I retire?") is None
+
+
+def test_queued_precompute_is_cancelled_and_answered_inline():
+    agent = _agent(replies=())
+    release = threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(1) as busy:
+        busy.submit(release.wait)  # another session's work holds the only worker
+        precompute = agent.start_precompute(["When can I retire?"], executor=busy)
+        assert agent.chat("When can I retire?").startswith("Based on your current savings plan")
+        assert precompute._futures["when can i retire"].cancelled()
+        release.set()
@@ -0,0 +1,62 @@
+import math
+import types
+
+import numpy as np
+import backtest
+import formulas
+
+
+def _loop_accumulation(returns, savings, monthly, start, months):
+    balance = savings
+    for r in returns[start:start + months]:
+        balance = balance * (1 + r) + monthly
+    return balance
+
+
+def _loop_withdrawal(returns, balance, withdrawal, start, months):
+    for month, r in enumerate(returns[start:start + months], 1):
+        balance = balance * (1 + r) - withdrawal
+        if balance <= 0:
+            return month / 12
+    return math.inf
+
+
+def test_windows_match_closed_forms_and_month_by_month_loop():
+    flat = np.full(600, 0.07 / 12)
+    _, balances = backtest.accumulation_windows(flat, 10_000, 500, 420)
+    expected = formulas.future_value(10_000, 0.07 / 12, 420) + formulas.fv_annuity(500, 0.07 / 12, 420)
+    np.testing.assert_allclose(balances, expected, rtol=1e-10)
+    _, years = backtest.withdrawal_windows(flat, 1e6, 7_000, 480)
+    assert years[0] * 12 == math.ceil(formulas.nper(0.07 / 12, 7_000, -1e6, 0))
+
+    returns = np.random.default_rng(0).normal(0.006, 0.045, 900)
+    starts, balances = backtest.accumulation_windows(returns, 20_000, 800, 300, step=7)
+    np.testing.assert_allclose(balances, [_loop_accumulation(returns, 20_000, 800, s, 300) for s in starts], rtol=1e-9)
+    starts, years = backtest.withdrawal_windows(returns, 500_000, 3_000, 360, step=5)
+    assert list(years) == [_loop_withdrawal(returns, 500_000, 3_000, s, 360) for s in starts]
+    assert np.isfinite(years).any() and np.isinf(years).any()
+
+
+def test_csv_is_cached_as_memory_mapped_npy(tmp_path):
+    path = tmp_path / "returns.csv"
+    path.write_text("date,return\n1926-07,0.01\n1926-08,-0.02\n1926-09,0.03\n")
+    series = backtest.load_returns(str(path))
+    assert isinstance(series.returns, np.memmap)
+    assert list(series.returns) == [0.01, -0.02, 0.03]
+    assert (series.start_year, series.start_month) == (1926, 7)
+    assert series.label(6) == "1927-01"
+    assert (tmp_path / "returns.csv.npy").exists()
+
+
+def test_backtest_profile_reports_january_windows():
+    returns = np.random.default_rng(1).normal(0.007, 0.04, 1200)
+    series = backtest.ReturnSeries(returns, 1925, start_month=3)
+    profile = types.SimpleNamespace(age=30, retirement_age=65, current_savings=10_000, monthly_savings=500,
+                                    retirement_goal=60_000)
+    result = backtest.backtest_profile(profile, series)
+    assert result['needed_amount'] == 1_500_000
+    accumulation, withdrawal = result['accumulation'], result['withdrawal']
+    assert accumulation['windows'] == 65 and withdrawal['windows'] == 70
+    assert accumulation['worst']['balance'] <= accumulation['median']['balance'] <= accumulation['best']['balance']
+    assert all(outcome['start'].endswith('-01') for outcome in (accumulation['worst'], withdrawal['best']))
+    assert 0 <= withdrawal['success_rate'] <= 1
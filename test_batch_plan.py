@@ -0,0 +1,64 @@
+import csv
+import math
+import formulas
+from batch_plan import PROFILE_FIELDS, RESULT_FIELDS, run_batch
+
+PROFILES = [
+    (30, 80000, 10000, 500, 65, 0.07, 0.03, 'moderate', 60000),
+    (45, 120000, 250000, 2000, 60, 0.05, 0.03, 'conservative', 90000),
+    (25, 50000, 0, 100, 67, 0.09, 0.03, 'aggressive', 40000),
+    (50, 70000, 1000, -100, 65, 0.07, 0.03, 'moderate', 1000000),
+]
+
+
+def _write_profiles(path, profiles):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(PROFILE_FIELDS)
+        writer.writerows(profiles)
+
+
+def _read_results(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _expected(profile):
+    age, _, savings, monthly, retire, rate, _, _, goal = profile
+    months = (retire - age) * 12
+    total = formulas.future_value(savings, rate / 12, months) + formulas.fv_annuity(monthly, rate / 12, months)
+    needed = goal / 0.04
+    return {
+        'total_at_retirement': total,
+        'needed_amount': needed,
+        'surplus_deficit': total - needed,
+        'projected_retirement_age': formulas.calculate_retirement_age(age, savings, monthly, needed, rate),
+        'monthly_savings_needed': formulas.monthly_savings_needed(needed, retire - age, rate),
+    }
+
+
+def test_run_batch_matches_scalar_formulas(tmp_path):
+    source, target = tmp_path / 'profiles.csv', tmp_path / 'plans.csv'
+    _write_profiles(source, PROFILES)
+
+    assert run_batch(source, target, chunk_rows=3, workers=0) == len(PROFILES)
+
+    results = _read_results(target)
+    assert [int(r['row']) for r in results] == list(range(len(PROFILES)))
+    for profile, result in zip(PROFILES, results):
+        for name, value in _expected(profile).items():
+            if value is None:
+                assert result[name] == ''
+            else:
+                assert math.isclose(float(result[name]), value, abs_tol=0.01)
+
+
+def test_process_pool_output_matches_in_process(tmp_path):
+    source = tmp_path / 'profiles.csv'
+    _write_profiles(source, PROFILES * 50)
+
+    run_batch(source, tmp_path / 'serial.csv', chunk_rows=16, workers=0)
+    run_batch(source, tmp_path / 'pooled.csv', chunk_rows=16, workers=2, max_in_flight=2)
+
+    assert (tmp_path / 'serial.csv').read_text() == (tmp_path / 'pooled.csv').read_text()
+    assert _read_results(tmp_path / 'pooled.csv')[0].keys() == set(RESULT_FIELDS)
@@ -0,0 +1,42 @@
+import json
+import pathlib
+import benchmarks
+
+
+def _results(**medians):
+    return {'benchmarks': {name: {'median_s': value} for name, value in medians.items()}}
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = _results(a=1.0, b=1.0, c=1.0)
+    current = _results(a=1.2, b=1.3, c=0.5, d=9.0)
+    regressions = benchmarks.compare(current, baseline, threshold=0.25)
+    assert [r['name'] for r in regressions] == ['b']
+    assert regressions[0]['ratio'] == 1.3
+
+
+def test_checked_in_baseline_covers_every_benchmark():
+    with open(pathlib.Path(benchmarks.__file__).with_name('benchmarks_baseline.json')) as f:
+        baseline = json.load(f)
+    assert set(baseline['benchmarks']) == set(benchmarks._registry)
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(_results(**{'scalar.future_value': 1e-12})))
+    output = tmp_path / 'results.json'
+
+    status = benchmarks.main(['scalar.future_value', '--repeat', '2', '--baseline', str(baseline), '--output', str(output)])
+
+    assert status == 1
+    results = json.loads(output.read_text())
+    assert list(results['benchmarks']) == ['scalar.future_value']
+    assert results['benchmarks']['scalar.future_value']['median_s'] > 0
+
+
+def test_startup_benchmarks_stop_their_fake_ollama_servers():
+    import threading
+
+    results = benchmarks.run_benchmarks(['startup.first_response'], repeat=1, min_sample_seconds=0.01)
+    assert list(results['benchmarks']) == ['startup.first_response[cold]', 'startup.first_response[warm]']
+    assert not [thread for thread in threading.enumerate() if thread.name == 'fake-ollama']
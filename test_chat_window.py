@@ -0,0 +1,56 @@
+from chat_window import ChatWindow, message_html
+from session_store import SessionStore
+
+
+def _chat(store, count, **kwargs):
+    chat = ChatWindow("s", store, **kwargs)
+    for i in range(count):
+        chat.append("You" if i % 2 == 0 else "Advisor", f"message {i}")
+    return chat
+
+
+def test_only_the_latest_messages_are_kept_and_drawn():
+    store = SessionStore()
+    chat = _chat(store, 30, window=5, keep=10)
+
+    assert len(chat) == 30 and chat.hidden == 25
+    assert chat.visible() == [message_html("Advisor" if i % 2 else "You", f"message {i}") for i in range(25, 30)]
+    assert len(chat._recent) == 10
+    assert store.history("s", limit=3, offset=1) == [("You", "message 26"), ("Advisor", "message 27"),
+                                                     ("You", "message 28")]
+    assert store.message_count("s") == 30
+
+
+def test_older_pages_come_back_from_the_store_in_order():
+    store = SessionStore()
+    chat = _chat(store, 30, window=5, keep=10)
+    chat.load_older(12)
+    assert "message 13" in chat.visible()[0] and chat.hidden == 13
+
+    # New messages push the oldest in-memory ones onto the loaded pages without gaps
+    chat.append("You", "message 30")
+    visible = chat.visible()
+    assert len(visible) == 17 and "message 14" in visible[0] and "message 30" in visible[-1]
+    assert [f"message {i}\n" in html for i, html in zip(range(14, 31), visible)] == [True] * 17
+
+
+def test_restore_reads_the_stored_history(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    _chat(store, 8, window=3)
+    chat = ChatWindow.restore("s", store, window=3, keep=4)
+    assert len(chat) == 8 and chat.hidden == 5
+    chat.load_older()
+    assert ["message 2" in html for html in chat.visible()] == [True] + [False] * 5
+
+
+def test_memory_stays_bounded_after_loading_older_pages():
+    store = SessionStore()
+    chat = _chat(store, 30, window=5, keep=10)
+    chat.load_older(12)
+    chat.visible()
+    for i in range(30, 1030):
+        chat.append("You", f"message {i}")
+    assert len(chat._older) + len(chat._recent) <= chat.shown
+    visible = chat.visible()
+    assert len(visible) == 17 and "message 1013" in visible[0] and "message 1029" in visible[-1]
+    assert len(chat._older) + len(chat._recent) == chat.shown
@@ -0,0 +1,67 @@
+import io
+import json
+import subprocess
+import sys
+
+import cli
+import formulas
+
+PROFILE = ['--age', '30', '--savings', '10000', '--monthly', '500', '--retirement-age', '65', '--goal', '60000']
+
+
+def test_summary_matches_the_advisor_and_needs_no_heavy_imports(capsys):
+    assert cli.main(['summary', *PROFILE]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    total = formulas.future_value(10000, 0.07 / 12, 420) + formulas.fv_annuity(500, 0.07 / 12, 420)
+    assert summary == {'years_to_retirement': 35, 'total_at_retirement': round(total, 2), 'needed_amount': 1500000.0,
+                       'surplus_deficit': round(total - 1500000, 2), 'on_track': False}
+
+    check = ("import sys, cli; cli.main(['summary', '--text', *sys.argv[1:]]); cli.main(['ask', 'When can I retire?', "
+             "*sys.argv[1:]]); assert not {'streamlit', 'langchain_core', 'numpy'} & set(sys.modules)")
+    output = subprocess.run([sys.executable, '-c', check, *PROFILE], check=True, capture_output=True, text=True).stdout
+    assert "Your Retirement Plan Summary" in output and "you can retire at age 70.2" in output
+
+
+def test_questions_needing_the_model_fail_without_llm(capsys):
+    assert cli.main(['ask', 'Should I buy gold?', *PROFILE]) == 2
+    assert "pass --llm" in capsys.readouterr().err
+    assert cli.main(['summary', '--age', '30']) == 1
+
+
+def test_calc_output_is_strict_json_and_model_failures_exit_nonzero(capsys, monkeypatch):
+    assert cli.main(['calc', 'nper', '0.005', '100', '-1000', '1000000']) == 0
+    assert json.loads(capsys.readouterr().out) == {'result': None}
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+    monkeypatch.setattr(cli, '_llm', lambda args: GenericFakeChatModel(messages=iter(())))
+    assert cli.main(['ask', 'Should I buy gold?', *PROFILE, '--llm']) == 3
+    captured = capsys.readouterr()
+    assert captured.out == "" and "the model call failed" in captured.err
+
+
+def test_batch_writes_one_line_per_profile():
+    profile = {'age': 40, 'current_savings': 1e5, 'monthly_savings': 1000, 'retirement_age': 65,
+               'retirement_goal': 80000, 'risk_tolerance': 'aggressive'}
+    lines = [json.dumps({**profile, 'question': "What's the rule of 72?"}), '', json.dumps({'age': 40}),
+             json.dumps({**profile, 'question': 'Should I buy gold?'})]
+    out = io.StringIO()
+    cli.run_batch(lines, out=out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['line'] for r in records] == [1, 3, 4]
+    assert records[0]['answer'].startswith("With a 9.0% return")
+    assert "missing profile fields" in records[1]['error'] and "pass --llm" in records[2]['error']
+
+
+def test_batch_reports_arithmetic_errors_per_line():
+    profile = {'age': 65, 'current_savings': 1e5, 'monthly_savings': 1000, 'retirement_age': 65,
+               'retirement_goal': 80000}
+    lines = [json.dumps({**profile, 'question': "How much should I save monthly?"}),
+             json.dumps({**profile, 'expected_return': 0.0, 'question': "What's the rule of 72?"}),
+             json.dumps({**profile, 'retirement_age': 70})]
+    out = io.StringIO()
+    cli.run_batch(lines, out=out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['line'] for r in records] == [1, 2, 3]
+    assert "no months left" in records[0]['answer']
+    assert 'error' in records[1] and records[2]['years_to_retirement'] == 5
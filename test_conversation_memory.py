@@ -0,0 +1,47 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from advisor_agent import AdvisorAgent
+from conversation_memory import ConversationMemory, estimate_tokens, extractive_summarizer
+from response_cache import ResponseCache
+
+ANSWERS = ["30", "80000", "10000", "500", "65", "moderate", "60000"]
+
+
+def test_memory_stays_within_budget_and_folds_incrementally():
+    calls = []
+
+    def counting_summarizer(lines, user, assistant):
+        calls.append(user)
+        extractive_summarizer(lines, user, assistant)
+
+    memory = ConversationMemory(max_tokens=400, recent_turns=3, summarizer=counting_summarizer)
+    for turn in range(200):
+        memory.add_turn(f"Question {turn}: what about a {turn}% return? " * 3, f"Answer {turn}. " + "detail " * 40)
+        assert memory.tokens <= memory.max_tokens
+
+    assert len(memory.turns) <= 3
+    assert calls == [f"Question {turn}: what about a {turn}% return? " * 3 for turn in range(memory.folded)]
+    assert estimate_tokens(memory.summary) <= memory.summary_tokens
+    assert "Question 199" in memory.messages()[-2][1]
+
+
+def test_follow_ups_see_earlier_turns_and_system_prompt_is_cached():
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache(),
+                         llm=GenericFakeChatModel(messages=iter([AIMessage(content="Then you could retire earlier.")])))
+    for answer in ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+
+    retire_answer = agent.chat("When can I retire?")
+    system_prompt = agent._system_prompt()
+    assert agent.chat("What about at 8%?") == "Then you could retire earlier."
+
+    messages = agent._llm_messages("And at 9%?")
+    assert [m.content for m in messages[1:]] == [
+        "When can I retire?", retire_answer, "What about at 8%?", "Then you could retire earlier.", "And at 9%?",
+    ]
+    assert isinstance(messages[-1], HumanMessage)
+    assert agent._system_prompt() is system_prompt
+
+    agent.profile.monthly_savings = 900.0
+    assert "$900.00" in agent._system_prompt()
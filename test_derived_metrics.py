@@ -0,0 +1,62 @@
+import pytest
+
+import formulas
+from derived_metrics import DEPENDENTS, DerivedMetrics
+from user_profile import UserProfile
+
+
+def _profile(**changes):
+    return UserProfile.from_dict({'age': 35, 'income': 90000, 'current_savings': 50000, 'monthly_savings': 1000,
+                                  'retirement_age': 65, 'retirement_goal': 70000, **changes})
+
+
+def test_figures_match_the_formulas():
+    metrics = DerivedMetrics(_profile())
+    total = formulas.future_value(50000, 0.07 / 12, 360) + formulas.fv_annuity(1000, 0.07 / 12, 360)
+
+    assert metrics.years_to_retirement == 30
+    assert metrics.total_at_retirement == pytest.approx(total)
+    assert metrics.surplus_deficit == pytest.approx(total - 70000 / 0.04)
+    assert metrics['doubling_time'] == pytest.approx(72 / 7)
+    assert metrics.projected_retirement_age == pytest.approx(
+        formulas.calculate_retirement_age(35, 50000, 1000, 70000 / 0.04, 0.07))
+    with pytest.raises(AttributeError):
+        metrics.not_a_metric
+
+
+def test_a_changed_input_drops_only_the_figures_that_read_it():
+    profile = _profile()
+    metrics = DerivedMetrics(profile)
+    before = {name: metrics[name] for name in ('needed_amount', 'future_current', 'doubling_time', 'surplus_deficit')}
+
+    profile.monthly_savings = 2000
+    metrics.refresh()
+    assert set(metrics._values) == {'years_to_retirement', 'months_to_retirement', 'monthly_rate', 'needed_amount',
+                                    'future_current', 'doubling_time'}
+    assert metrics.surplus_deficit > before['surplus_deficit']
+    assert metrics.needed_amount == before['needed_amount']
+    assert 'surplus_deficit' in DEPENDENTS['monthly_savings']
+    assert 'needed_amount' not in DEPENDENTS['monthly_savings']
+
+
+def test_what_if_reuses_unaffected_figures_and_leaves_the_profile_alone():
+    profile = _profile()
+    metrics = DerivedMetrics(profile)
+    metrics.surplus_deficit
+    metrics._values['needed_amount'] = 'memoized'
+
+    what_if = metrics.what_if(monthly_savings=2000, expected_return=None)
+    assert what_if.needed_amount == 'memoized'
+    assert what_if.total_at_retirement == pytest.approx(DerivedMetrics(_profile(monthly_savings=2000)).total_at_retirement)
+    assert profile.monthly_savings == 1000
+    assert metrics.what_if(monthly_savings=1000) is metrics
+    assert metrics.what_if(monthly_savings=2000) is what_if
+
+    profile.age = 40
+    assert metrics.what_if(monthly_savings=2000) is not what_if
+
+
+def test_monthly_savings_needed_is_none_once_no_months_remain():
+    assert DerivedMetrics(_profile(retirement_age=35)).monthly_savings_needed is None
+    assert DerivedMetrics(_profile(retirement_age=36)).monthly_savings_needed == pytest.approx(
+        formulas.monthly_savings_needed(70000 / 0.04, 1, 0.07))
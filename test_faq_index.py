@@ -0,0 +1,78 @@
+import itertools
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from advisor_agent import AdvisorAgent
+from derived_metrics import DerivedMetrics
+from faq_index import FAQ, FaqIndex
+from response_cache import ResponseCache
+from user_profile import UserProfile
+
+ANSWERS = ["30", "80000", "10000", "500", "65", "moderate", "60000"]
+
+
+def _profile():
+    return UserProfile.from_dict({'age': 35, 'income': 90000, 'current_savings': 50000, 'monthly_savings': 1000,
+                                  'retirement_age': 65, 'retirement_goal': 70000})
+
+
+@pytest.mark.parametrize("message, name", [
+    ("Can you explain the calculation?", 'calculations'),
+    ("what's the 4 percent rule", 'four_percent_rule'),
+    ("How long does it take for money to double?", 'doubling'),
+    ("explain compound interest to me", 'compound_interest'),
+    ("what does a deficit mean", 'surplus_deficit'),
+])
+def test_paraphrases_match_their_entry_above_the_threshold(message, name):
+    index = FaqIndex()
+    match = index.lookup(message)
+    assert match.name == name and match.score >= index.threshold and match.margin >= index.margin
+
+
+@pytest.mark.parametrize("message", [
+    "What's the difference between stocks and bonds?",
+    "What's the difference between a Roth and traditional IRA?",
+    "What's the difference between a 401k and an IRA?",
+    "What's the difference between an ETF and a mutual fund?",
+])
+def test_question_framing_alone_does_not_match(message):
+    index = FaqIndex()
+    assert index.answer(message, DerivedMetrics(_profile())) is None
+    match = index.lookup(message)
+    assert match.score < index.threshold or match.margin < index.margin
+
+
+def test_other_questions_fall_below_the_threshold():
+    index = FaqIndex()
+    for message in ("Should I pay off my mortgage early?", "Show me my retirement forecast",
+                    "How big should my emergency fund be?", "What is a good return on investment?", "hello"):
+        assert index.answer(message, DerivedMetrics(_profile())) is None
+    assert index.lookup("?!") is None and index.lookup("What is the") is None
+    assert index.stats()['hits'] == 0
+
+
+def test_answers_use_the_profiles_figures():
+    index = FaqIndex()
+    metrics = DerivedMetrics(_profile())
+    assert f"{metrics.doubling_time:.1f} years" in index.answer("When will my savings double?", metrics)
+    assert "$1,750,000.00" in index.answer("What is the 4% rule?", metrics)
+    # Every template fills in
+    for entry in FAQ:
+        assert index.answer(entry.questions[0], metrics)
+
+
+def test_agent_answers_faq_questions_without_the_model():
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache())
+    agent.llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content="From the model.")))
+    for answer in ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+
+    assert agent.chat("Explain the calculations you used").startswith("Here's how your plan is worked out")
+    assert agent.chat("Should I pay off my mortgage early?") == "From the model."
+    # Personalized questions go to the model even when they read like an FAQ entry
+    for message in ("How much do I need saved to retire early at 50?", "How much do I need to retire with $80k a year?",
+                    "What is the 4% rule if I retire in 10 years?"):
+        assert agent.chat(message) == "From the model."
@@ -0,0 +1,107 @@
+import math
+import numpy as np
+import formulas
+import formulas_np
+
+
+def _random_inputs(size=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'rate': np.where(rng.random(size) < 0.1, 0.0, rng.uniform(-0.002, 0.01, size)),
+        'n': rng.integers(1, 600, size).astype(float),
+        'amount': rng.uniform(0, 1_000_000, size),
+        'pmt': rng.uniform(-500, 5000, size),
+    }
+
+
+def _scalar_map(func, *arrays):
+    out = []
+    for args in zip(*(a.tolist() for a in arrays)):
+        try:
+            value = func(*args)
+        except ZeroDivisionError:
+            value = float('nan')
+        out.append(float('nan') if value is None else value)
+    return np.array(out)
+
+
+def _assert_matches(vector, scalar):
+    np.testing.assert_array_equal(np.isnan(vector), np.isnan(scalar))
+    np.testing.assert_array_equal(np.isinf(vector), np.isinf(scalar))
+    finite = np.isfinite(scalar)
+    np.testing.assert_allclose(vector[finite], scalar[finite], rtol=1e-10, atol=1e-9)
+
+
+def test_growth_functions_match_scalar():
+    x = _random_inputs()
+    for name in ('future_value', 'present_value', 'fv_annuity', 'pv_annuity'):
+        scalar = _scalar_map(getattr(formulas, name), x['amount'], x['rate'], x['n'])
+        vector = getattr(formulas_np, name)(x['amount'], x['rate'], x['n'])
+        _assert_matches(vector, scalar)
+
+
+def test_nper_matches_scalar():
+    x = _random_inputs()
+    scalar = _scalar_map(formulas.nper, x['rate'], -x['pmt'], -x['amount'], x['amount'] * 3)
+    vector = formulas_np.nper(x['rate'], -x['pmt'], -x['amount'], x['amount'] * 3)
+    _assert_matches(vector, scalar)
+
+
+def test_planning_functions_match_scalar():
+    x = _random_inputs()
+    age = np.full_like(x['rate'], 30.0)
+    annual = x['rate'] * 12
+
+    scalar = _scalar_map(formulas.calculate_retirement_age, age, x['amount'], x['pmt'], x['amount'] * 4, annual)
+    vector = formulas_np.calculate_retirement_age(age, x['amount'], x['pmt'], x['amount'] * 4, annual)
+    _assert_matches(vector, scalar)
+
+    scalar = _scalar_map(formulas.calculate_savings_longevity, x['amount'], x['pmt'], annual)
+    vector = formulas_np.calculate_savings_longevity(x['amount'], x['pmt'], annual)
+    _assert_matches(vector, scalar)
+
+    years = x['n'] / 12
+    scalar = _scalar_map(formulas.monthly_savings_needed, x['amount'], years, annual)
+    vector = formulas_np.monthly_savings_needed(x['amount'], years, annual)
+    _assert_matches(vector, scalar)
+
+
+def test_scalar_inputs_return_scalars():
+    assert round(formulas_np.future_value(1000, 0.06, 10), 2) == 1790.85
+    assert formulas_np.fv_annuity(100, 0, 12) == 1200
+    assert formulas_np.nper(0, 100, -1000, 0) == 10
+    assert math.isnan(formulas_np.calculate_retirement_age(30, 1000, -100, 1000000, 0.07))
+    assert formulas_np.monthly_savings_needed(12000, 1, 0) == 1000
+
+
+def test_broadcasting():
+    rates = np.array([0.0, 0.05, 0.07])[:, None]
+    years = np.array([10, 20, 30, 40])[None, :]
+    result = formulas_np.monthly_savings_needed(1_000_000, years, rates)
+    assert result.shape == (3, 4)
+    assert result[0, 0] == formulas.monthly_savings_needed(1_000_000, 10, 0.0)
+
+
+def test_mostly_unreachable_inputs_match_scalar():
+    x = _random_inputs()
+    age = np.full_like(x['rate'], 30.0)
+    annual = x['rate'] * 12
+    scalar = _scalar_map(formulas.calculate_retirement_age, age, x['amount'], -x['pmt'], x['amount'] * 40, annual)
+    vector = formulas_np.calculate_retirement_age(age, x['amount'], -x['pmt'], x['amount'] * 40, annual)
+    assert np.isnan(vector).mean() > 0.5
+    _assert_matches(vector, scalar)
+
+
+def test_blockwise_evaluation_matches_one_pass(monkeypatch):
+    x = _random_inputs()
+    rates = x['rate'][:40, None]
+    months = x['n'][None, :50]
+    whole = formulas_np.fv_annuity(100.0, rates, months), formulas_np.nper(x['rate'], -x['pmt'], -x['amount'], 1e6)
+    monkeypatch.setattr(formulas_np, 'BLOCK_SIZE', 64)
+    blocked = formulas_np.fv_annuity(100.0, rates, months), formulas_np.nper(x['rate'], -x['pmt'], -x['amount'], 1e6)
+    for a, b in zip(whole, blocked):
+        np.testing.assert_array_equal(a, b)
+    # A trailing axis longer than a block is evaluated a row at a time
+    grown = formulas_np.future_value(1.0, x['rate'][None, :], x['n'][:3, None])
+    assert grown.shape == (3, 2000)
+    assert math.isclose(grown[2, 5], formulas.future_value(1.0, x['rate'][5], x['n'][2]), rel_tol=1e-12)
@@ -0,0 +1,53 @@
+import numpy as np
+import formulas_np
+import goal_seek
+import projection
+
+
+def test_accumulate_matches_closed_forms_and_schedules():
+    rng = np.random.default_rng(0)
+    savings, pmt, rate = rng.uniform(0, 2e5, 50), rng.uniform(0, 3000, 50), rng.uniform(0, 0.1, 50)
+    months = rng.integers(1, 480, 50)
+    flat = goal_seek.accumulate(savings, pmt, rate / 12, months)
+    expected = formulas_np.future_value(savings, rate / 12, months) + formulas_np.fv_annuity(pmt, rate / 12, months)
+    np.testing.assert_allclose(flat, expected, rtol=1e-10)
+
+    growth = rng.uniform(0, 0.06, 50)
+    for i in range(5):
+        schedule = projection.schedule_arrays(savings[i], pmt[i], rate[i], int(months[i]), growth[i], dtype=np.float64)
+        np.testing.assert_allclose(goal_seek.accumulate(savings[i], pmt[i], rate[i] / 12, months[i], growth[i]),
+                                   schedule['balance'][0, -1], rtol=1e-10)
+    # Contributions growing exactly as fast as the balance compounds
+    same = (1 + 0.06 / 12) ** 12 - 1
+    schedule = projection.schedule_arrays(0, 500, 0.06, 360, same, dtype=np.float64)
+    np.testing.assert_allclose(goal_seek.accumulate(0, 500, 0.06 / 12, 360, same), schedule['balance'][0, -1], rtol=1e-10)
+
+
+def test_batched_roots_are_within_tolerance():
+    rng = np.random.default_rng(1)
+    n = 10_000
+    savings, pmt = rng.uniform(0, 2e5, n), rng.uniform(100, 3000, n)
+    months, true_rate = rng.integers(60, 480, n), rng.uniform(-0.02, 0.15, n)
+    target = goal_seek.accumulate(savings, pmt, true_rate / 12, months)
+
+    result = goal_seek.required_return(savings, pmt, months, target, xtol=1e-9)
+    assert result.failed == 0 and result.converged.all()
+    assert np.abs(result.root - true_rate).max() <= 1e-9
+    assert result.iterations.max() < 40
+
+
+def test_withdrawal_matches_level_annuity_and_spend_exhausts_savings():
+    result = goal_seek.sustainable_withdrawal([1e6, 5e5], 30, [0.07, 0.0])
+    np.testing.assert_allclose(result.root, [1e6 / formulas_np.pv_annuity(1, 0.07 / 12, 360), 5e5 / 360], atol=1e-4)
+
+    spend = goal_seek.retirement_spend(35, 60, 50_000, 1_000, 0.07, 0.03)
+    at_retirement = goal_seek.accumulate(50_000, 1_000, 0.07 / 12, 300)
+    first_month = spend.root / 12 * 1.03 ** 25
+    assert abs(goal_seek.accumulate(at_retirement, -first_month, 0.07 / 12, 420, 0.03)) < 10
+
+
+def test_unreachable_goals_are_counted_not_guessed():
+    result = goal_seek.required_return([0, 10_000], [0, 500], 120, [1e6, 1e5])
+    assert result.failed == 1
+    assert np.isnan(result.root[0]) and not result.converged[0] and result.iterations[0] == 0
+    assert result.converged[1]
@@ -0,0 +1,69 @@
+import json
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from advisor_agent import AdvisorAgent
+from instrumentation import HistogramSink, JSONLSink, Tracer
+from response_cache import ResponseCache
+
+ANSWERS = ["30", "80000", "10000", "500", "65", "moderate", "60000"]
+
+
+class _ListSink:
+    def __init__(self):
+        self.records = []
+
+    def record(self, record):
+        self.records.append(record)
+
+
+def test_histogram_percentiles_and_derived_fields():
+    sink = HistogramSink()
+    tracer = Tracer([sink])
+    for ms in range(1, 101):
+        tracer.record("chat.llm", ms / 1000, ttft_s=ms / 10000)
+
+    summary = sink.summary()
+    assert summary["chat.llm"] == {'count': 100, 'p50': 0.051, 'p95': 0.096}
+    assert summary["chat.llm.ttft"]['p50'] == 0.0051
+
+
+def test_jsonl_sink_and_stage_errors(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    sink = JSONLSink(str(path))
+    tracer = Tracer([sink])
+    with tracer.stage("summary.math"):
+        pass
+    try:
+        with tracer.stage("chat.llm"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    sink.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r['stage'] for r in records] == ["summary.math", "chat.llm"]
+    assert records[1]['error'] == "RuntimeError"
+
+
+def test_agent_records_each_stage_with_llm_details():
+    sink = _ListSink()
+    agent = AdvisorAgent(openai_api_key=None, response_cache=ResponseCache(), tracer=Tracer([sink]),
+                         llm=GenericFakeChatModel(messages=iter([AIMessage(content="Pay down high-interest debt first.")])))
+    for answer in ANSWERS:
+        agent.process_answer(answer)
+    agent.ask_next_question()
+    agent.chat("What's the rule of 72?")
+    "".join(agent.chat_stream("Should I pay off my mortgage early?"))
+
+    stages = [r['stage'] for r in sink.records]
+    assert stages.count("process_answer") == len(ANSWERS)
+    assert stages[len(ANSWERS):] == [
+        "summary.math", "summary.format",
+        "chat.route", "chat.calculate", "chat",
+        "chat.route", "chat.faq", "chat.cache", "chat.prompt", "chat.llm", "chat",
+    ]
+    llm = sink.records[-2]
+    assert llm['streamed'] and llm['ttft_s'] <= llm['seconds']
+    assert llm['completion_tokens'] > 1
+    assert sink.records[-1]['branch'] == 'llm'
+
@@ -0,0 +1,82 @@
+from intent_router import Intent, IntentRouter
+
+
+def test_routes_original_branches():
+    router = IntentRouter()
+    assert router.route("When can I retire?") == Intent('retirement_age', {})
+    assert router.route("How long will my money last?") == Intent('savings_longevity', {})
+    assert router.route("What's the rule of 72?") == Intent('rule_of_72', {})
+    assert router.route("How much should I save monthly?") == Intent('monthly_savings_needed', {})
+    assert router.route("Should I pay off my mortgage early?") is None
+
+
+def test_routes_goal_seek_questions():
+    router = IntentRouter()
+    assert router.route("What return do I need to retire at 60?") == Intent('required_return', {'age': 60})
+    assert router.route("What's the most I can withdraw for 30 years?") == \
+        Intent('sustainable_withdrawal', {'years': 30.0})
+    assert router.route("What annual spend supports retiring at 60?") == Intent('retirement_spend', {'age': 60})
+    assert router.route("Should I withdraw from my 401k?") is None
+
+
+def test_extracts_numbers_from_sample_questions():
+    router = IntentRouter()
+    assert router.route("What if inflation is 4%?") == Intent('inflation', {'inflation': 0.04})
+    assert router.route("How long will $500k last in retirement?") == Intent('savings_longevity', {'amount': 500000.0})
+
+
+def test_extracts_amount_periods_ages_and_durations():
+    router = IntentRouter()
+    intent = router.route("When can I retire if I save $1,500 a month at 8%?")
+    assert intent == Intent('retirement_age', {'monthly_amount': 1500.0, 'rate': 0.08})
+
+    intent = router.route("How much should I save monthly to retire at 60 with $2M?")
+    assert intent == Intent('monthly_savings_needed', {'age': 60, 'amount': 2000000.0})
+
+    intent = router.route("How long will 1.2 million last over 30 years withdrawing $60,000 per year?")
+    assert intent.params == {'amount': 1200000.0, 'years': 30.0, 'annual_amount': 60000.0}
+
+
+def test_extracts_three_digit_ages_and_negative_rates():
+    router = IntentRouter()
+    assert router.route("What annual spend supports retiring at 100?") == Intent('retirement_spend', {'age': 100})
+    assert router.route("What if inflation is -2%?") == Intent('inflation', {'inflation': -0.02})
+    assert router.route("When can I retire if I earn 4-6%?").params == {'rate': 0.06}
+
+
+def test_hit_rate():
+    router = IntentRouter()
+    router.route("When can I retire?")
+    router.route("Explain the calculations you used")
+    stats = router.stats()
+    assert stats['messages'] == 2
+    assert stats['hit_rate'] == 0.5
+    assert stats['by_intent']['retirement_age'] == 1
+
+
+def test_percentages_go_where_their_wording_says():
+    router = IntentRouter()
+    assert router.route("When can I retire with an 8% return?") == Intent('retirement_age', {'rate': 0.08})
+    assert router.route("When can I retire if my investments grow at 7%?") == Intent('retirement_age', {'rate': 0.07})
+    assert router.route("How long will my money last if I withdraw 4% a year?") == \
+        Intent('savings_longevity', {'withdrawal_rate': 0.04})
+    assert router.route("What return do I need to retire at 60 with 3% inflation?") == \
+        Intent('required_return', {'age': 60, 'inflation': 0.03})
+    # Percentages the answer would ignore, or that aren't a rate at all, go to the model
+    assert router.route("When can I retire if my income grows 3% a year?") is None
+    assert router.route("When can I retire if I save 10% more?") is None
+    assert router.route("How much should I save monthly if inflation is 5%?") is None
+
+
+def test_account_names_are_not_amounts():
+    router = IntentRouter()
+    assert router.route("How long will my 401k last?") == Intent('savings_longevity', {})
+    assert router.route("How long will my 403b and 457b last?") == Intent('savings_longevity', {})
+
+
+def test_has_figures():
+    router = IntentRouter()
+    assert router.has_figures("How much do I need saved to retire early at 50?")
+    assert router.has_figures("Is $500k enough?") and router.has_figures("What if I retire in 10 years?")
+    assert not router.has_figures("What is the 4% rule?")
+    assert not router.has_figures("How long will my 401k last?")
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import time
+
+import llm_pool
+from advisor_agent import AdvisorAgent
+from fake_ollama import FakeOllama
+from response_cache import ResponseCache
+
+
+def test_importing_the_agent_does_not_load_langchain_or_numpy():
+    check = ("import sys, advisor_agent; "
+             "assert not {'langchain_core', 'langchain_community', 'numpy'} & set(sys.modules), sys.modules")
+    subprocess.run([sys.executable, '-c', check], check=True)
+
+
+def test_agents_share_one_client_per_model_and_url():
+    first, second = AdvisorAgent(None, response_cache=ResponseCache()), AdvisorAgent(None, response_cache=ResponseCache())
+    assert first.llm is second.llm is llm_pool.shared_llm()
+    assert llm_pool.shared_llm(base_url="http://127.0.0.1:1") is not first.llm
+
+
+def test_warmup_loads_the_model_before_the_first_question():
+    fake = FakeOllama(reply="Stay diversified.", load_latency=0.3)
+    base_url = fake.start_in_thread()
+    try:
+        warmer = llm_pool.start_warmup(base_url=base_url, interval=None)
+        assert llm_pool.start_warmup(base_url=base_url) is warmer
+        assert warmer.ready.wait(5) and warmer.ok and fake.loaded
+
+        started = time.perf_counter()
+        assert llm_pool.shared_llm(base_url=base_url).invoke("Hello").content == "Stay diversified."
+        assert time.perf_counter() - started < 0.3
+    finally:
+        fake.stop_thread()
+    assert not llm_pool.warm_up(base_url=base_url, timeout=1)
@@ -0,0 +1,28 @@
+import asyncio
+import random
+
+from advisor_agent import AdvisorAgent
+from loadtest import LLM_QUESTIONS, PERCENTILES, format_level, random_answers, run_load
+from response_cache import ResponseCache
+
+
+def test_ramp_reports_throughput_stages_and_memory():
+    results = asyncio.run(run_load([1, 3], sessions=1, questions=3, llm_fraction=0.5, tokens_per_second=0,
+                                   first_token_latency=0.01))
+    assert [r['users'] for r in results] == [1, 3]
+    for result in results:
+        assert result['requests'] == result['users'] * (1 + 7 + 3)
+        assert result['errors'] == 0 and result['requests_per_s'] > 0
+        assert {'create', 'answer', 'summary'} <= set(result['stages_ms'])
+        assert set(result['stages_ms']['answer']) == {'count'} | {f"p{q}" for q in PERCENTILES}
+        assert result['agent_stages_ms']['process_answer']['count'] == result['users'] * 7
+    assert results[-1]['sessions_held'] == 4
+    assert "req/s" in format_level(results[-1])
+
+
+def test_llm_questions_reach_the_model():
+    agent = AdvisorAgent(None, response_cache=ResponseCache())
+    for answer in random_answers(random.Random(0)):
+        agent.process_answer(answer)
+    agent.ask_next_question()
+    assert [agent._answer_directly(question) for question in LLM_QUESTIONS] == [None] * len(LLM_QUESTIONS)
@@ -0,0 +1,44 @@
+import types
+import numpy as np
+import formulas
+import monte_carlo
+
+
+def _profile(**overrides):
+    profile = dict(age=30, retirement_age=65, current_savings=10000, monthly_savings=500,
+                   expected_return=0.07, risk_tolerance='moderate', retirement_goal=60000)
+    profile.update(overrides)
+    return types.SimpleNamespace(**profile)
+
+
+def test_zero_volatility_matches_closed_form():
+    months, rate = 420, 0.07
+    balances = monte_carlo.simulate_balances(10000, 500, months, rate, 0.0, 8, np.random.SeedSequence(0))
+    expected = formulas.future_value(10000, rate / 12, months) + formulas.fv_annuity(500, rate / 12, months)
+    np.testing.assert_allclose(balances, expected, rtol=1e-9)
+
+
+def test_seeded_runs_are_reproducible_across_workers():
+    profile = _profile()
+    serial = monte_carlo.simulate_profile(profile, paths=5000, seed=42, workers=0, chunk_paths=1000)
+    pooled = monte_carlo.simulate_profile(profile, paths=5000, seed=42, workers=2, chunk_paths=1000)
+    assert serial == pooled
+    assert monte_carlo._pool._mp_context.get_start_method() == 'spawn'
+
+    other = monte_carlo.simulate_profile(profile, paths=5000, seed=43, workers=0, chunk_paths=1000)
+    assert other['percentiles'] != serial['percentiles']
+
+
+def test_summary_shape_and_bounds():
+    result = monte_carlo.simulate_profile(_profile(risk_tolerance='aggressive'), paths=2001, seed=1)
+    assert 0 <= result['success_probability'] <= 1
+    assert result['volatility'] == monte_carlo.VOLATILITY['aggressive']
+    assert result['needed_amount'] == 60000 / 0.04
+    values = [result['percentiles'][p] for p in monte_carlo.PERCENTILES]
+    assert values == sorted(values)
+
+
+def test_more_savings_raises_success_probability():
+    low = monte_carlo.simulate_profile(_profile(monthly_savings=500), paths=4000, seed=7)
+    high = monte_carlo.simulate_profile(_profile(monthly_savings=3000), paths=4000, seed=7)
+    assert high['success_probability'] > low['success_probability']
@@ -0,0 +1,68 @@
+import io
+from types import SimpleNamespace
+import numpy as np
+import formulas
+import projection
+
+
+def _profile(**overrides):
+    values = dict(age=30, current_savings=10000, monthly_savings=500, retirement_age=65,
+                  expected_return=0.07, inflation_rate=0.0)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _closed_form(profile, months):
+    rate = profile.expected_return / 12
+    return formulas.future_value(profile.current_savings, rate, months) + formulas.fv_annuity(profile.monthly_savings, rate, months)
+
+
+def test_lazy_schedule_matches_closed_form():
+    profile = _profile()
+    rows = list(projection.iter_schedule(profile))
+    assert len(rows) == 420
+    assert rows[-1].age == 65
+    assert np.isclose(rows[-1].balance, _closed_form(profile, 420), rtol=1e-10)
+    assert np.isclose(rows[11].balance, _closed_form(profile, 12), rtol=1e-12)
+
+
+def test_array_schedule_matches_lazy_schedule():
+    profile = _profile(inflation_rate=0.03)
+    rows = list(projection.iter_schedule(profile, income_growth=0.02))
+    arrays = projection.profile_schedule(profile, income_growth=0.02, columns=projection.COLUMNS, dtype=np.float64)
+    np.testing.assert_allclose(arrays['balance'], [r.balance for r in rows], rtol=1e-9)
+    np.testing.assert_allclose(arrays['real_balance'], [r.real_balance for r in rows], rtol=1e-9)
+    np.testing.assert_allclose(np.diff(arrays['contributions'], prepend=0), [r.contribution for r in rows])
+
+
+def test_zero_rate_and_sampled_records():
+    result = projection.schedule_arrays(1000, 100, 0.0, 30, every=12, dtype=np.float64)
+    assert result['month'].tolist() == [12, 24, 30]
+    assert result['balance'][0].tolist() == [2200, 3400, 4000]
+
+
+def test_past_retirement_schedules_are_empty():
+    profile = _profile(age=70)
+    assert list(projection.iter_schedule(profile)) == []
+    result = projection.profile_schedule(profile, columns=('balance', 'real_balance'))
+    assert result['month'].size == 0 and result['balance'].size == 0
+
+
+def test_batch_blocks_agree_with_single_profiles():
+    savings = np.array([0.0, 10000.0, 250000.0])
+    monthly = np.array([100.0, 500.0, 2000.0])
+    rates = np.array([0.05, 0.07, 0.09])
+    batch = projection.schedule_arrays(savings, monthly, rates, 840, every=12, block_size=2)
+    assert batch['balance'].shape == (3, 70)
+    assert batch['balance'].dtype == np.float32
+    for i in range(3):
+        expected = _closed_form(_profile(current_savings=savings[i], monthly_savings=monthly[i], expected_return=rates[i]), 840)
+        assert np.isclose(batch['balance'][i, -1], expected, rtol=1e-6)
+
+
+def test_write_csv_streams_rows():
+    buffer = io.StringIO()
+    projection.write_csv(projection.iter_schedule(_profile(), years=1), buffer)
+    lines = buffer.getvalue().splitlines()
+    assert lines[0] == "month,age,contribution,growth,balance,real_balance"
+    assert len(lines) == 13
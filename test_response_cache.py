@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from response_cache import ResponseCache, normalize_message, profile_fingerprint
+
+
+class _Profile(SimpleNamespace):
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_normalizes_message_and_tracks_profile():
+    profile = _Profile(age=30, retirement_goal=60000)
+    assert normalize_message("  Should I pay off my  Mortgage early? ") == "should i pay off my mortgage early"
+    assert ResponseCache.make_key("Should I pay off my mortgage early?", profile) == \
+        ResponseCache.make_key("should i pay off my mortgage early", profile)
+
+    changed = _Profile(age=31, retirement_goal=60000)
+    assert profile_fingerprint(profile) != profile_fingerprint(changed)
+    assert ResponseCache.make_key("hi", profile) != ResponseCache.make_key("hi", changed)
+
+
+def test_lru_eviction_and_counters():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a is now most recent
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'hit_rate': 0.75, 'entries': 2}
+
+
+def test_ttl_expiry():
+    clock = _Clock()
+    cache = ResponseCache(ttl_seconds=60, clock=clock)
+    cache.put("a", "A")
+    clock.now += 59
+    assert cache.get("a") == "A"
+    clock.now += 2
+    assert cache.get("a") is None
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = tmp_path / "responses.db"
+    first = ResponseCache(path=str(path))
+    first.put("a", "A")
+    first.close()
+
+    second = ResponseCache(path=str(path))
+    assert second.get("a") == "A"
+    assert second.stats()['hits'] == 1
+    second.close()
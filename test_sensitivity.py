@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+import numpy as np
+import formulas
+import sensitivity
+
+
+class _Profile(SimpleNamespace):
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _profile(**overrides):
+    values = dict(age=30, current_savings=10000, monthly_savings=500, retirement_age=65,
+                  expected_return=0.07, retirement_goal=60000)
+    values.update(overrides)
+    return _Profile(**values)
+
+
+def test_grid_matches_scalar_summary():
+    profile = _profile()
+    returns, savings, ages = np.array([0.0, 0.05, 0.07]), np.array([0.0, 500.0]), np.array([60.0, 65.0])
+    surplus = sensitivity.surplus_grid(profile, returns, savings, ages)
+    assert surplus.shape == (3, 2, 2)
+
+    months = (65 - 30) * 12
+    expected = (formulas.future_value(10000, 0.07 / 12, months)
+                + formulas.fv_annuity(500, 0.07 / 12, months) - 60000 / 0.04)
+    assert np.isclose(surplus[2, 1, 1], expected)
+
+
+def test_engine_caches_per_profile():
+    engine = sensitivity.SensitivityEngine()
+    profile = _profile()
+    first = engine.grid(profile)
+    assert first.surplus.shape == (50, 50, 30)
+    assert engine.grid(_profile()) is first
+    assert engine.grid(_profile(monthly_savings=600)) is not first
+    assert (engine.hits, engine.misses) == (1, 2)
+
+
+def test_smallest_change_puts_plan_on_track():
+    profile = _profile()
+    options = sensitivity.smallest_change(profile)
+
+    savings = options['monthly_savings']['value']
+    assert np.isclose(sensitivity._surplus(profile, 0.07, savings, 65), 0, atol=1e-3)
+    age = options['retirement_age']['value']
+    assert np.isclose(sensitivity._surplus(profile, 0.07, 500, age), 0, atol=1e-3)
+    rate = options['expected_return']['value']
+    assert sensitivity._surplus(profile, rate, 500, 65) >= 0 > sensitivity._surplus(profile, rate - 1e-5, 500, 65)
+    assert options['best'] in ('monthly_savings', 'retirement_age', 'expected_return')
+
+
+def test_on_track_plan_needs_no_change():
+    options = sensitivity.smallest_change(_profile(monthly_savings=5000))
+    assert options['monthly_savings']['change'] == 0
@@ -0,0 +1,138 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_community.chat_models import ChatOllama
+from advisor_agent import AdvisorAgent
+from fake_ollama import FakeOllama
+from response_cache import ResponseCache
+from server import SESSIONS, SessionManager, create_app
+from session_store import SessionStore
+
+ANSWERS = ["30", "80000", "10000", "500", "65", "moderate", "60000"]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_server(test, fake=None, **app_options):
+    fake = fake or FakeOllama(reply="Keep an emergency fund.")
+    base_url = await fake.start()
+    llm = ChatOllama(model="mistral", base_url=base_url)
+    app = create_app(lambda: AdvisorAgent(None, response_cache=ResponseCache(), llm=llm), **app_options)
+    async with TestClient(TestServer(app)) as client:
+        try:
+            await test(client, fake)
+        finally:
+            await fake.stop()
+
+
+async def _complete_questionnaire(client):
+    created = await (await client.post('/sessions')).json()
+    session_id = created['session_id']
+    for answer in ANSWERS:
+        reply = await (await client.post(f'/sessions/{session_id}/answer', json={'answer': answer})).json()
+    assert reply['is_complete']
+    return session_id
+
+
+def test_questionnaire_and_chat_against_fake_ollama():
+    async def test(client, fake):
+        session_id = await _complete_questionnaire(client)
+
+        reply = await (await client.post(f'/sessions/{session_id}/chat', json={'message': "What's the rule of 72?"})).json()
+        assert "double" in reply['response']
+        assert fake.requests == 0
+
+        reply = await (await client.post(f'/sessions/{session_id}/chat', json={'message': "Should I buy a house?"})).json()
+        assert reply['response'] == "Keep an emergency fund."
+        assert fake.requests == 1
+
+        streamed = await client.post(f'/sessions/{session_id}/chat?stream=1', json={'message': "Should I rent?"})
+        assert await streamed.text() == "Keep an emergency fund."
+
+        state = await (await client.get(f'/sessions/{session_id}')).json()
+        assert state['is_complete'] and state['profile']['age'] == 30
+
+    _run(_with_server(test))
+
+
+def test_sessions_are_isolated_and_llm_calls_run_concurrently():
+    fake = FakeOllama(reply="Diversify.", first_token_latency=0.2)
+
+    async def test(client, fake):
+        sessions = [await _complete_questionnaire(client) for _ in range(4)]
+        replies = await asyncio.gather(*(
+            client.post(f'/sessions/{s}/chat', json={'message': "Any tips?"}) for s in sessions
+        ))
+        assert [r.status for r in replies] == [200] * 4
+        assert fake.max_active == 4
+
+    _run(_with_server(test, fake, max_concurrent_llm=4))
+
+
+def test_saturated_limiter_returns_503():
+    fake = FakeOllama(reply="Diversify.", first_token_latency=0.3)
+
+    async def test(client, fake):
+        sessions = [await _complete_questionnaire(client) for _ in range(3)]
+        replies = await asyncio.gather(*(
+            client.post(f'/sessions/{s}/chat', json={'message': "Any tips?"}) for s in sessions
+        ))
+        statuses = sorted(r.status for r in replies)
+        assert statuses == [200, 200, 503]
+        busy = [r for r in replies if r.status == 503][0]
+        assert busy.headers['Retry-After'] == '1'
+        health = await (await client.get('/health')).json()
+        assert health['llm']['rejected'] == 1
+
+    _run(_with_server(test, fake, max_concurrent_llm=1, max_waiting=1))
+
+
+def test_unknown_session_and_bad_body():
+    async def test(client, fake):
+        assert (await client.post('/sessions/nope/chat', json={'message': 'hi'})).status == 404
+        session_id = (await (await client.post('/sessions')).json())['session_id']
+        assert (await client.post(f'/sessions/{session_id}/answer', data='not json')).status == 400
+
+    _run(_with_server(test))
+
+
+def test_evicted_and_restarted_sessions_resume_from_the_store(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    session_ids = []
+
+    async def first_run(client, fake):
+        session_id = await _complete_questionnaire(client)
+        await client.post(f'/sessions/{session_id}/chat', json={'message': "What's the rule of 72?"})
+        other = (await (await client.post('/sessions')).json())['session_id']
+        assert other != session_id
+        # max_sessions=1, so the first session was dropped from memory and is reloaded here
+        state = await (await client.get(f'/sessions/{session_id}')).json()
+        assert state['is_complete'] and state['question_index'] == len(ANSWERS)
+        memory = client.server.app[SESSIONS].get(session_id).agent.memory
+        assert [user for user, _ in memory.turns] == ["What's the rule of 72?"]
+        session_ids.append(session_id)
+
+    _run(_with_server(first_run, max_sessions=1, store=SessionStore(path)))
+
+    async def second_run(client, fake):
+        history = (await (await client.get(f'/sessions/{session_ids[0]}/history?limit=2')).json())['history']
+        assert history[0] == ["You", "What's the rule of 72?"]
+        assert "double" in history[1][1]
+        reply = await (await client.post(f'/sessions/{session_ids[0]}/chat', json={'message': "Any tips?"})).json()
+        assert reply['response'] == "Keep an emergency fund."
+
+    _run(_with_server(second_run, store=SessionStore(path)))
+
+
+def test_sessions_held_by_a_request_are_not_evicted():
+    async def test():
+        sessions = SessionManager(lambda: AdvisorAgent(None), max_sessions=1)
+        held_id, held = sessions.create()
+        async with held.hold():
+            sessions.create()
+            assert sessions.get(held_id) is held and len(sessions) == 2
+        sessions.create()
+        assert held_id not in sessions._sessions and len(sessions) == 1
+
+    _run(test())
@@ -0,0 +1,75 @@
+import pytest
+
+from session_store import SessionStore
+from user_profile import UserProfile
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _profile():
+    profile = UserProfile.from_dict({'age': 30, 'income': 80000.0, 'current_savings': 10000.0,
+                                     'monthly_savings': 500.0, 'retirement_age': 65,
+                                     'risk_tolerance': 'aggressive', 'expected_return': 0.09,
+                                     'retirement_goal': 60000.0})
+    profile.is_complete = True
+    return profile
+
+
+def test_profile_codecs_round_trip():
+    profile = _profile()
+    assert not hasattr(profile, '__dict__')
+    assert len(profile.to_bytes()) == 67
+    assert UserProfile.from_bytes(profile.to_bytes()) == profile
+    assert UserProfile.from_json(profile.to_json()) == profile
+
+    blank = UserProfile.from_bytes(UserProfile().to_bytes())
+    assert blank.age is None and blank.risk_tolerance == 'moderate' and not blank.is_complete
+    assert isinstance(UserProfile.from_bytes(profile.to_bytes()).age, int)
+
+
+def test_profiles_are_unhashable_and_only_take_known_risk_tolerances():
+    profile = _profile()
+    with pytest.raises(TypeError):
+        hash(profile)
+    with pytest.raises(ValueError):
+        profile.risk_tolerance = 'reckless'
+    with pytest.raises(ValueError):
+        UserProfile.from_dict({'risk_tolerance': 'high'})
+    assert profile.risk_tolerance == 'aggressive' and len(profile.to_bytes()) == 67
+
+
+def test_writes_are_batched_and_reads_see_pending(tmp_path):
+    clock = _Clock()
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(path, max_pending=4, flush_interval=60, clock=clock)
+    store.save("a", _profile(), 7)
+    store.append_message("a", "You", "hi")
+    assert store.load("a") == (_profile(), 7)
+
+    # Nothing committed yet, so another connection sees no rows
+    assert len(SessionStore(path)) == 0
+    store.append_message("a", "Advisor", "hello")
+    store.append_message("b", "You", "hey")
+    assert len(SessionStore(path)) == 1
+
+    clock.now = 61
+    store.save("a", UserProfile(), 0)
+    reopened = SessionStore(path)
+    assert reopened.load("a") == (UserProfile(), 0)
+    assert reopened.history("a") == [("You", "hi"), ("Advisor", "hello")]
+    assert reopened.history("a", limit=1) == [("Advisor", "hello")]
+
+
+def test_delete_and_missing_sessions():
+    store = SessionStore()
+    store.save("a", _profile(), 7)
+    store.append_message("a", "You", "hi")
+    store.delete("a")
+    assert store.load("a") is None and "a" not in store
+    assert store.history("a") == []
@@ -0,0 +1,109 @@
+# user_profile.py
+"""The questionnaire profile and its compact encodings.
+
+UserProfile uses __slots__, so each instance is a fixed set of fields with
+no per-instance __dict__. Profiles compare by value and are mutable, so they
+are unhashable. risk_tolerance only accepts RISK_TOLERANCES, which keeps
+every profile encodable. It can be encoded two ways:
+
+- to_bytes()/from_bytes(): a fixed 67-byte struct (numbers as float64, with
+  NaN for unanswered fields), used by session_store for SQLite rows.
+- to_json()/from_json(): the to_dict() fields plus is_complete, for logs and
+  HTTP.
+"""
+import json
+import math
+import struct
+
+RISK_TOLERANCES = ('conservative', 'moderate', 'aggressive')
+# expected_return the questionnaire assumes for each risk tolerance
+EXPECTED_RETURNS = {'conservative': 0.05, 'moderate': 0.07, 'aggressive': 0.09}
+NUMERIC_FIELDS = ('age', 'income', 'current_savings', 'monthly_savings', 'retirement_age',
+                  'expected_return', 'inflation_rate', 'retirement_goal')
+INT_FIELDS = ('age', 'retirement_age')
+
+_CODEC_VERSION = 1
+# version, the numeric fields, risk tolerance index, is_complete
+_STRUCT = struct.Struct(f"<B{len(NUMERIC_FIELDS)}dBB")
+
+
+class UserProfile:
+    __slots__ = NUMERIC_FIELDS + ('_risk_tolerance', 'is_complete')
+
+    def __init__(self):
+        self.age = None
+        self.income = None
+        self.current_savings = None
+        self.monthly_savings = None
+        self.retirement_age = None
+        self.expected_return = 0.07  # 7% default
+        self.inflation_rate = 0.03
+        self.risk_tolerance = "moderate"
+        self.retirement_goal = None
+        self.is_complete = False
+
+    def to_dict(self):
+        return {
+            'age': self.age,
+            'income': self.income,
+            'current_savings': self.current_savings,
+            'monthly_savings': self.monthly_savings,
+            'retirement_age': self.retirement_age,
+            'expected_return': self.expected_return,
+            'inflation_rate': self.inflation_rate,
+            'risk_tolerance': self.risk_tolerance,
+            'retirement_goal': self.retirement_goal
+        }
+
+    @property
+    def risk_tolerance(self):
+        return self._risk_tolerance
+
+    @risk_tolerance.setter
+    def risk_tolerance(self, value):
+        if value not in RISK_TOLERANCES:
+            raise ValueError(f"risk_tolerance must be one of {', '.join(RISK_TOLERANCES)}, not {value!r}")
+        self._risk_tolerance = value
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        for name, value in data.items():
+            setattr(profile, name, value)
+        return profile
+
+    def to_json(self) -> str:
+        data = self.to_dict()
+        data['is_complete'] = self.is_complete
+        return json.dumps(data, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def to_bytes(self) -> bytes:
+        numbers = [math.nan if getattr(self, name) is None else getattr(self, name) for name in NUMERIC_FIELDS]
+        return _STRUCT.pack(_CODEC_VERSION, *numbers, RISK_TOLERANCES.index(self.risk_tolerance), self.is_complete)
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, *numbers, risk, is_complete = _STRUCT.unpack(data)
+        if version != _CODEC_VERSION:
+            raise ValueError(f"Unsupported profile encoding version {version}")
+        profile = cls()
+        for name, value in zip(NUMERIC_FIELDS, numbers):
+            if math.isnan(value):
+                value = None
+            elif name in INT_FIELDS:
+                value = int(value)
+            setattr(profile, name, value)
+        profile.risk_tolerance = RISK_TOLERANCES[risk]
+        profile.is_complete = bool(is_complete)
+        return profile
+
+    def __eq__(self, other):
+        if not isinstance(other, UserProfile):
+            return NotImplemented
+        return self.to_dict() == other.to_dict() and self.is_complete == other.is_complete
+
+    __hash__ = None  # equal profiles can diverge once edited, so they can't be dict keys